@@ -3,6 +3,14 @@ ASGI config for edu_predict project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The notification event stream (/api/notifications/stream/) holds a
+connection open per client and is only served over ASGI, e.g.:
+
+    uvicorn edu_predict.asgi:application --workers 4
+
+With more than one worker, set NOTIFICATION_STREAM_POLL_INTERVAL so each
+worker picks up notifications created by the others.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -14,3 +22,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'edu_predict.settings')
 
 application = get_asgi_application()
+
+# Load the models while the server starts, not in the first readiness probe
+from predictions.health import warm_up  # noqa: E402
+
+warm_up()
@@ -4,6 +4,9 @@ Django settings for edu_predict project.
 Generated by 'django-admin startproject' using Django 6.0.
 """
 
+import os
+import sys
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 
@@ -47,6 +50,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'predictions.querybudget.QueryBudgetMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -74,12 +78,73 @@ WSGI_APPLICATION = 'edu_predict.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Select the profile with EDU_PREDICT_DB=sqlite (default) or EDU_PREDICT_DB=postgres.
+
+DB_PROFILE = os.environ.get('EDU_PREDICT_DB', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    # Requires psycopg[pool]. Pooled connections replace persistent ones,
+    # so CONN_MAX_AGE must stay at 0.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'edu_predict'),
+            'USER': os.environ.get('POSTGRES_USER', 'edu_predict'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', 10)),
+                    'timeout': float(os.environ.get('POSTGRES_POOL_TIMEOUT', 10)),
+                },
+            },
+        }
+    }
+else:
+    # WAL lets readers proceed while a batch upload is writing, and IMMEDIATE
+    # transactions take the write lock up front so concurrent writers wait on
+    # busy_timeout instead of failing with "database is locked".
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 20000))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'OPTIONS': {
+                'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS};'
+                    f'PRAGMA mmap_size={int(os.environ.get("SQLITE_MMAP_SIZE", 268435456))};'
+                ),
+            },
+        }
+    }
+
+
+# Cache
+# Per-user counters live in the cache. With several worker processes, point
+# REDIS_URL at a shared Redis so they all see the same values.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
 
 
 # Password validation
@@ -136,8 +201,90 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Per-user request rates for the prediction and upload endpoints, by role
+    # (<scope>_admin, <scope>_teacher, falling back to <scope>); see predictions/admission.py
+    'DEFAULT_THROTTLE_RATES': {
+        'predict': '60/min',
+        'predict_teacher': '300/min',
+        'predict_admin': '600/min',
+        'upload': '5/min',
+        'upload_teacher': '30/min',
+        'upload_admin': '60/min',
+    },
 }
 
+# Faster JSON (orjson) and MessagePack (msgpack) when the optional packages
+# are installed; clients pick MessagePack with Accept / Content-Type
+# application/msgpack (see predictions/renderers.py)
+if find_spec('orjson'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'][0] = 'predictions.renderers.ORJSONRenderer'
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'][0] = 'predictions.renderers.ORJSONParser'
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'predictions.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'predictions.renderers.MessagePackParser')
+
+
+# Background tasks (notification fan-out etc.) run in an in-process thread pool
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', 2))
+BACKGROUND_TASKS_INLINE = False
+
+# Seconds between database polls feeding /api/notifications/stream/. Leave at 0
+# for a single worker process; set it when running several ASGI workers.
+NOTIFICATION_STREAM_POLL_INTERVAL = float(os.environ.get('NOTIFICATION_STREAM_POLL_INTERVAL', 0))
+
+# Admission control for model inference (see predictions/admission.py): at most
+# INFERENCE_CONCURRENCY model calls at once per process, of which batch uploads
+# may take INFERENCE_BATCH_SLOTS. Up to INFERENCE_QUEUE_SIZE callers wait for a
+# slot, interactive ones for INFERENCE_QUEUE_TIMEOUT seconds and batch ones for
+# INFERENCE_BATCH_QUEUE_TIMEOUT, before getting a 503.
+INFERENCE_CONCURRENCY = int(os.environ.get('INFERENCE_CONCURRENCY', os.cpu_count() or 2))
+INFERENCE_BATCH_SLOTS = int(os.environ.get('INFERENCE_BATCH_SLOTS', max(1, INFERENCE_CONCURRENCY // 2)))
+INFERENCE_QUEUE_SIZE = int(os.environ.get('INFERENCE_QUEUE_SIZE', 32))
+INFERENCE_QUEUE_TIMEOUT = float(os.environ.get('INFERENCE_QUEUE_TIMEOUT', 2))
+INFERENCE_BATCH_QUEUE_TIMEOUT = float(os.environ.get('INFERENCE_BATCH_QUEUE_TIMEOUT', 30))
+
+# Score linear models (such as train_model's) in float32: their weights are
+# converted when the models load and scaled features are handed to them as
+# float32. XGBoost models, including the shipped one, are not affected (see
+# get_inference_dtype in predictions/utils.py).
+COMPACT_LINEAR_MODELS = os.environ.get('COMPACT_LINEAR_MODELS', '').lower() in ('1', 'true', 'yes')
+
+# Per-request SQL query budgets (see predictions/querybudget.py): 'log' reports
+# requests over their view's budget or repeating one statement
+# QUERY_REPEAT_THRESHOLD times, 'raise' turns those into errors, 'off' disables
+# counting. QUERY_TIMING_HEADER adds a Server-Timing header with the counts.
+# ``manage.py test`` raises, so every request made by a test is held to its budget.
+QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE', 'raise' if sys.argv[1:2] == ['test'] else 'log')
+QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5))
+QUERY_TIMING_HEADER = DEBUG
+
+# Seconds between self-test inferences reported by /readyz (see predictions/health.py)
+HEALTH_SELF_TEST_INTERVAL = float(os.environ.get('HEALTH_SELF_TEST_INTERVAL', 30))
+
+# Feature drift statistics are written to the database after this many scored
+# rows or seconds, whichever comes first (see predictions/drift.py)
+DRIFT_FLUSH_ROWS = int(os.environ.get('DRIFT_FLUSH_ROWS', 1000))
+DRIFT_FLUSH_INTERVAL = float(os.environ.get('DRIFT_FLUSH_INTERVAL', 60))
+
+# Prediction history is buffered in memory and written in batches of this
+# many entries, or at least every HISTORY_FLUSH_INTERVAL seconds
+HISTORY_FLUSH_SIZE = int(os.environ.get('HISTORY_FLUSH_SIZE', 500))
+HISTORY_FLUSH_INTERVAL = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 5))
+
+# Saved similar-student index, see predictions/similarity.py
+SIMILARITY_INDEX_PATH = os.environ.get(
+    'SIMILARITY_INDEX_PATH', str(BASE_DIR / 'predictions' / 'ml_models' / 'similarity_index.npz')
+)
+
 
 # Simple JWT Configuration
 SIMPLE_JWT = {
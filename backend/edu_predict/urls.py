@@ -8,8 +8,13 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
+from predictions import views_health
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # Orchestrator probes, outside the API so they skip authentication
+    path('livez', views_health.livez, name='livez'),
+    path('readyz', views_health.readyz, name='readyz'),
     # API endpoints
     path('api/', include('predictions.urls')),
     # JWT Authentication
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'edu_predict.settings')
 
 application = get_wsgi_application()
+
+# Load the models while the server starts, not in the first readiness probe
+from predictions.health import warm_up  # noqa: E402
+
+warm_up()
@@ -1,20 +1,186 @@
-from django.contrib import admin
-from .models import Student
+from django.contrib import admin, messages
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.utils.functional import cached_property
+
+from . import exporters
+from .models import OUTCOME_CHOICES, ArchivedStudent, PredictionLog, Student
+from .rescoring import schedule_rescore
+
+# Course codes of the source dataset, used as static filter choices so the
+# changelist never scans the table for distinct values
+COURSE_NAMES = {
+    33: 'Biofuel Production Technologies',
+    171: 'Animation and Multimedia Design',
+    8014: 'Social Service (evening)',
+    9003: 'Agronomy',
+    9070: 'Communication Design',
+    9085: 'Veterinary Nursing',
+    9119: 'Informatics Engineering',
+    9130: 'Equinculture',
+    9147: 'Management',
+    9238: 'Social Service',
+    9254: 'Tourism',
+    9500: 'Nursing',
+    9556: 'Oral Hygiene',
+    9670: 'Advertising and Marketing Management',
+    9773: 'Journalism and Communication',
+    9853: 'Basic Education',
+    9991: 'Management (evening)',
+}
+
+# Unfiltered changelists at least this large show the planner's row estimate;
+# smaller ones are counted exactly
+ESTIMATED_COUNT_THRESHOLD = 10000
+# Filtered changelists count at most this many rows
+COUNT_LIMIT = 10000
+
+
+def estimate_row_count(model):
+    """
+    The database's own row estimate for ``model``'s table, or None.
+    
+    PostgreSQL keeps one in pg_class; SQLite only after ANALYZE, in sqlite_stat1.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s AND idx IS NULL', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids COUNT(*) over large tables: unfiltered lists use the
+    database's estimate (or the highest primary key), filtered lists stop
+    counting at COUNT_LIMIT.
+
+    Deleted and archived rows leave gaps in the ids, so the estimate can run
+    past the real end. A page that comes back empty is therefore replaced by
+    the real last page, found with one exact count.
+    """
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if queryset.query.where:
+            return queryset.order_by()[:COUNT_LIMIT].count()
+        counted = queryset.order_by()[:ESTIMATED_COUNT_THRESHOLD].count()
+        if counted < ESTIMATED_COUNT_THRESHOLD:
+            return counted
+        estimate = estimate_row_count(queryset.model)
+        if estimate is None:
+            # Ids are not reused, so the highest one bounds the row count from above
+            estimate = queryset.order_by('-pk').values_list('pk', flat=True).first() or 0
+        return max(estimate, counted)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Past the end, including after page() corrected the count: show the last page
+            if int(number) > self.num_pages:
+                return self.num_pages
+            raise
+
+    def page(self, number):
+        page = super().page(number)
+        if page.number > 1 and not page.object_list:
+            self.count = self.object_list.order_by().count()
+            self.__dict__.pop('num_pages', None)
+            page = super().page(number)
+        return page
+
+
+def static_choice_filter(field_name, filter_title, choices):
+    """A list filter for ``field_name`` offering fixed ``choices`` instead of querying distinct values."""
+    
+    class StaticChoiceFilter(admin.SimpleListFilter):
+        title = filter_title
+        parameter_name = field_name
+        
+        def lookups(self, request, model_admin):
+            return choices
+        
+        def queryset(self, request, queryset):
+            if self.value() is not None:
+                return queryset.filter(**{field_name: self.value()})
+            return queryset
+    
+    return StaticChoiceFilter
+
+
+YES_NO = [(1, 'Yes'), (0, 'No')]
 
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = [
-        'id', 'course', 'gender', 'age_at_enrollment', 
+        'id', 'user', 'course', 'gender', 'age_at_enrollment', 
         'curricular_units_1st_sem_grade', 'curricular_units_2nd_sem_grade',
-        'last_prediction', 'last_dropout_probability', 'created_at'
+        'last_prediction', 'last_dropout_probability', 'outcome', 'term', 'created_at'
     ]
     list_filter = [
-        'course', 'gender', 'scholarship_holder', 
-        'last_prediction', 'created_at'
+        static_choice_filter('course', 'course', sorted(COURSE_NAMES.items())),
+        static_choice_filter('last_prediction', 'last prediction', OUTCOME_CHOICES),
+        'outcome',
+        static_choice_filter('gender', 'gender', [(1, 'Male'), (0, 'Female')]),
+        static_choice_filter('scholarship_holder', 'scholarship holder', YES_NO),
+        'created_at',
     ]
-    search_fields = ['id', 'course']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    # Sorting on other columns would sort the whole table
+    ordering = ['-id']
+    sortable_by = ['id', 'last_dropout_probability']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ['created_at', 'updated_at', 'last_prediction', 'last_dropout_probability']
+    actions = ['rescore_selected', 'export_selected']
+    search_help_text = 'Student id or course code'
+    search_fields = ['id']
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Exact id or course code matches only; a LIKE over integer columns scans the table
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if not search_term.isdigit():
+            return queryset.none(), False
+        value = int(search_term)
+        return queryset.filter(pk=value) | queryset.filter(course=value), False
+    
+    @admin.action(description='Re-score selected students in the background')
+    def rescore_selected(self, request, queryset):
+        student_ids = list(queryset.order_by().values_list('pk', flat=True))
+        schedule_rescore(student_ids)
+        self.message_user(
+            request,
+            f'Re-scoring {len(student_ids)} students in the background.',
+            messages.SUCCESS,
+        )
+    
+    @admin.action(description='Export selected students as CSV')
+    def export_selected(self, request, queryset):
+        # Streamed in chunks, so the selection is never held in memory
+        response = StreamingHttpResponse(
+            exporters.iter_csv(queryset.order_by('pk')),
+            content_type=exporters.EXPORT_FORMATS['csv'][0],
+        )
+        response['Content-Disposition'] = 'attachment; filename="students.csv"'
+        return response
     
     fieldsets = (
         ('Demographics', {
@@ -55,11 +221,51 @@ class StudentAdmin(admin.ModelAdmin):
             'fields': ('unemployment_rate', 'inflation_rate', 'gdp')
         }),
         ('Prediction Results', {
-            'fields': ('last_prediction', 'last_dropout_probability'),
+            'fields': ('last_prediction', 'last_dropout_probability', 'outcome'),
             'classes': ('collapse',)
         }),
         ('Metadata', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('term', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(ArchivedStudent)
+class ArchivedStudentAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'user', 'term', 'course', 'last_prediction',
+        'last_dropout_probability', 'outcome', 'archived_at'
+    ]
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    ordering = ['-id']
+    sortable_by = ['id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ['=id', '=term']
+    
+    def has_add_permission(self, request):
+        # Rows arrive through the archive_students command only
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PredictionLog)
+class PredictionLogAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'student', 'archived_student', 'user', 'source', 'model_version',
+        'predicted_class', 'dropout_probability', 'latency_ms', 'created_at'
+    ]
+    list_filter = ['source', 'predicted_class', 'model_version']
+    list_select_related = ['student', 'archived_student', 'user']
+    raw_id_fields = ['student', 'archived_student', 'user']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        # History is append-only
+        return False
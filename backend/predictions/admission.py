@@ -0,0 +1,218 @@
+"""
+Admission Control
+
+Two layers keep inference latency bounded under load:
+
+* ``InferenceGate`` limits how many model calls run at once in this
+  process. Callers that find every slot busy wait in a short bounded queue;
+  when the queue is full, or the wait exceeds its timeout, the request is
+  rejected with 503 and a ``Retry-After`` estimate. Interactive predictions
+  are always admitted before waiting batch work, and batch work may only
+  occupy INFERENCE_BATCH_SLOTS of the INFERENCE_CONCURRENCY slots, so a large
+  upload cannot starve single predictions.
+* ``RoleRateThrottle`` limits request rates per user, with a rate chosen by
+  the user's role, and answers 429 with ``Retry-After``.
+
+Admission and rejection counts are kept per process and served by
+``/api/monitoring/admission/``.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.settings import api_settings
+from rest_framework.throttling import UserRateThrottle
+
+from .permissions import get_group_names
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+PRIORITIES = (INTERACTIVE, BATCH)
+
+# Weight of the newest sample in the running average of slot hold times
+HOLD_TIME_SMOOTHING = 0.1
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The prediction service is at capacity. Please retry shortly.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait, detail=None):
+        super().__init__(detail)
+        # Read by DRF's exception handler to set Retry-After
+        self.wait = wait
+
+
+class InferenceGate:
+    """Counting semaphore with a bounded, two-priority FIFO wait queue."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self._active = Counter()
+        self._avg_hold = 0.05
+        self.stats = Counter()
+
+    @property
+    def concurrency(self):
+        return max(1, getattr(settings, 'INFERENCE_CONCURRENCY', os.cpu_count() or 1))
+
+    @property
+    def batch_slots(self):
+        return max(1, min(self.concurrency, getattr(settings, 'INFERENCE_BATCH_SLOTS', self.concurrency // 2)))
+
+    def _may_run(self, priority, ticket):
+        if self._queues[priority][0] is not ticket or sum(self._active.values()) >= self.concurrency:
+            return False
+        if priority == BATCH:
+            # Waiting interactive requests go first
+            return not self._queues[INTERACTIVE] and self._active[BATCH] < self.batch_slots
+        return True
+
+    def retry_after(self):
+        """Seconds until a slot is likely to be free, from the average hold time and the queue length."""
+        waiting = sum(len(queue) for queue in self._queues.values())
+        return max(1, math.ceil(self._avg_hold * (waiting + 1) / self.concurrency))
+
+    def acquire(self, priority, timeout):
+        """
+        Wait for a slot.
+
+        Args:
+            priority: INTERACTIVE or BATCH.
+            timeout: Longest wait in seconds, or None to wait as long as it
+                takes (for background jobs, which also bypass the queue limit).
+
+        Raises:
+            Overloaded: if the queue is full or the timeout expires.
+        """
+        ticket = object()
+        with self._condition:
+            waiting = sum(len(queue) for queue in self._queues.values())
+            if timeout is not None and waiting >= getattr(settings, 'INFERENCE_QUEUE_SIZE', 32):
+                self.stats[f'{priority}_rejected_queue_full'] += 1
+                raise Overloaded(self.retry_after())
+
+            queue = self._queues[priority]
+            queue.append(ticket)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            try:
+                while not self._may_run(priority, ticket):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.stats[f'{priority}_rejected_timeout'] += 1
+                        raise Overloaded(self.retry_after())
+                    self._condition.wait(remaining)
+            finally:
+                queue.remove(ticket)
+                # The head of a queue changed; let the next waiter re-check
+                self._condition.notify_all()
+            self._active[priority] += 1
+            self.stats[f'{priority}_admitted'] += 1
+
+    def release(self, priority, held_seconds):
+        with self._condition:
+            self._active[priority] -= 1
+            self._avg_hold += HOLD_TIME_SMOOTHING * (held_seconds - self._avg_hold)
+            self._condition.notify_all()
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                'concurrency': self.concurrency,
+                'batch_slots': self.batch_slots,
+                'queue_size': getattr(settings, 'INFERENCE_QUEUE_SIZE', 32),
+                'active': {priority: self._active[priority] for priority in PRIORITIES},
+                'waiting': {priority: len(self._queues[priority]) for priority in PRIORITIES},
+                'average_hold_ms': self._avg_hold * 1000,
+                'counts': dict(self.stats),
+            }
+
+
+gate = InferenceGate()
+
+
+@contextmanager
+def admit(priority, wait=True):
+    """
+    Hold an inference slot for the duration of the block.
+
+    With ``wait=False`` the caller is a background job: it waits without a
+    timeout instead of being rejected.
+    """
+    if not wait:
+        timeout = None
+    elif priority == INTERACTIVE:
+        timeout = getattr(settings, 'INFERENCE_QUEUE_TIMEOUT', 2.0)
+    else:
+        timeout = getattr(settings, 'INFERENCE_BATCH_QUEUE_TIMEOUT', 30.0)
+    gate.acquire(priority, timeout)
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        gate.release(priority, time.monotonic() - started)
+
+
+def get_role(user):
+    """'admin', 'teacher' or 'user', as used in the throttle rate names."""
+    if user.is_superuser:
+        return 'admin'
+    groups = get_group_names(user)
+    if 'Admin' in groups:
+        return 'admin'
+    if groups & {'Teacher', 'Analyst'}:
+        return 'teacher'
+    return 'user'
+
+
+throttle_stats = Counter()
+
+
+class RoleRateThrottle(UserRateThrottle):
+    """
+    Per-user rate limit whose rate depends on the user's role.
+
+    The rate is read from DEFAULT_THROTTLE_RATES under ``<scope>_<role>``,
+    falling back to ``<scope>``. Subclasses set ``scope``.
+    """
+
+    def get_rate(self):
+        # Resolved per request in allow_request, once the user is known
+        return None
+
+    def allow_request(self, request, view):
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        if not request.user or not request.user.is_authenticated:
+            role = 'user'
+        else:
+            role = get_role(request.user)
+        self.rate = rates.get(f'{self.scope}_{role}', rates.get(self.scope))
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        allowed = super().allow_request(request, view)
+        if not allowed:
+            throttle_stats[f'{self.scope}_{role}_throttled'] += 1
+        return allowed
+
+
+class PredictRateThrottle(RoleRateThrottle):
+    scope = 'predict'
+
+
+class UploadRateThrottle(RoleRateThrottle):
+    scope = 'upload'
+
+
+def admission_metrics():
+    """Gate state plus admission and rejection counts of this process."""
+    return dict(gate.snapshot(), throttled=dict(throttle_stats), pid=os.getpid())
@@ -0,0 +1,98 @@
+"""
+Term Archival
+
+Once a term closes, its Student rows are moved into ArchivedStudent so the
+table behind the API, uploads and the class averages (and its indexes) only
+holds open terms. Rows are moved in chunks, each chunk in its own
+transaction: one indexed read, one bulk_create into the archive and one
+delete, so a term of any size is archived in bounded memory and an
+interrupted run can simply be repeated.
+
+Archived students keep their id, owner and timestamps and stay readable
+through the /api/archive/ endpoints. Their notifications and prediction
+history entries are relinked to the archived copy (``archived_student``)
+before the hot rows are deleted, and training reads archived outcomes as
+well. The similar-student index only covers the hot table, so archived
+students stop appearing as matches.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .conditional import deferred_bumps
+from .models import ArchivedStudent, Notification, PredictionLog, Student, STUDENT_FEATURE_FIELDS
+
+ARCHIVE_CHUNK_SIZE = 5000
+
+# Columns copied from Student to ArchivedStudent
+ARCHIVE_FIELDS = [
+    'id', 'user_id', *STUDENT_FEATURE_FIELDS, 'term', 'created_at', 'updated_at',
+    'last_prediction', 'last_dropout_probability', 'outcome', 'content_hash',
+]
+
+
+def archive_term(term, chunk_size=ARCHIVE_CHUNK_SIZE, log=None):
+    """
+    Move every Student of ``term`` into the archive.
+
+    Returns:
+        Number of students moved.
+    """
+    log = log or (lambda message: None)
+    moved = 0
+    while True:
+        # Per-row delete signals would otherwise bump the students data version once each
+        with deferred_bumps(), transaction.atomic():
+            rows = list(
+                Student.objects.filter(term=term)
+                .order_by('pk')
+                .values(*ARCHIVE_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                return moved
+            archived_at = timezone.now()
+            ArchivedStudent.objects.bulk_create(
+                [ArchivedStudent(archived_at=archived_at, **row) for row in rows],
+                batch_size=chunk_size,
+            )
+            ids = [row['id'] for row in rows]
+            # Archived rows keep their id, so the links carry over unchanged
+            for model in (Notification, PredictionLog):
+                model.objects.filter(student_id__in=ids).update(archived_student_id=F('student_id'), student=None)
+            Student.objects.filter(pk__in=ids).delete()
+        moved += len(rows)
+        log(f'{term}: moved {moved} students')
+
+
+def export_term(term, path):
+    """
+    Write the Students of ``term`` to a zstd-compressed Parquet file.
+
+    Returns:
+        Number of bytes written.
+    """
+    from . import exporters
+
+    queryset = Student.objects.filter(term=term).order_by('pk')
+    written = 0
+    with open(path, 'wb') as f:
+        for data in exporters.iter_arrow(queryset, 'parquet'):
+            f.write(data)
+            written += len(data)
+    return written
+
+
+def term_counts():
+    """
+    Students per term in the hot table and in the archive.
+
+    Returns:
+        Dict mapping term (None for students without one) to a
+        {'active': n, 'archived': n} dict.
+    """
+    counts = {}
+    for model, key in ((Student, 'active'), (ArchivedStudent, 'archived')):
+        for row in model.objects.order_by().values('term').annotate(n=Count('id')):
+            counts.setdefault(row['term'], {'active': 0, 'archived': 0})[key] = row['n']
+    return counts
@@ -0,0 +1,455 @@
+"""
+Benchmark Harness
+
+Times the hot paths of the prediction service against a throwaway database
+seeded with synthetic students (see ``synthetic.py``). Results are plain
+dicts that serialise to JSON, so runs can be stored and compared to catch
+performance regressions.
+
+Run it through the ``benchmark`` management command.
+"""
+
+import io
+import math
+import os
+import platform
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import django
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .drift import monitor as drift_monitor
+from .history import buffer as history_buffer
+from .models import Student, STUDENT_FEATURE_FIELDS
+from .permissions import IsTeacherOrAdmin
+from .synthetic import iter_student_chunks, iter_student_rows, write_csv
+from .utils import (
+    predict_student_status,
+    get_models,
+    build_feature_vector,
+    explain_feature_matrix,
+)
+
+# Registered scenarios: name -> function(context) returning {result_name: stats}
+SCENARIOS = {}
+
+SEED_CHUNK_SIZE = 5000
+
+
+class BenchmarkError(Exception):
+    """Raised when a benchmarked endpoint does not behave as expected."""
+
+
+def scenario(name):
+    """Register a benchmark scenario under ``name``."""
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+def measure(func, repeat, warmup=1, items=1):
+    """
+    Call ``func`` ``warmup + repeat`` times and summarise the timed calls.
+
+    Args:
+        func: Zero-argument callable to time.
+        repeat: Number of timed calls.
+        warmup: Number of untimed calls made first.
+        items: Number of logical operations performed by one call,
+               used to derive throughput.
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    samples_ms = np.array(samples) * 1000
+    median_ms = float(np.median(samples_ms))
+    return {
+        'repeat': repeat,
+        'items': items,
+        'min_ms': float(samples_ms.min()),
+        'median_ms': median_ms,
+        'mean_ms': float(samples_ms.mean()),
+        'p95_ms': float(np.percentile(samples_ms, 95)),
+        'max_ms': float(samples_ms.max()),
+        'items_per_sec': items / (median_ms / 1000) if median_ms else None,
+    }
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """
+    Create a migrated throwaway database for the duration of the block.
+
+    SQLite test databases default to in-memory; the benchmark database is put
+    in a temporary file instead so journal mode and locking behave as they do
+    in a real deployment.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    tmpdir = None
+    if connection.vendor == 'sqlite':
+        tmpdir = tempfile.mkdtemp(prefix='edupredict-bench-')
+        test_settings['NAME'] = os.path.join(tmpdir, 'benchmark.sqlite3')
+
+    try:
+        connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            # Synthetic traffic must not reach the real database's statistics or history
+            drift_monitor.discard()
+            history_buffer.discard()
+            connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+    finally:
+        # settings_dict is shared with settings.DATABASES; later test runs must not inherit the path
+        test_settings['NAME'] = old_test_name
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def create_role_users():
+    """Create one user per RBAC group and return them keyed by role."""
+    users = {}
+    for role in ('Admin', 'Teacher', 'Student'):
+        group, _ = Group.objects.get_or_create(name=role)
+        user = User.objects.create_user(username=f'bench_{role.lower()}', password='bench-password')
+        user.groups.add(group)
+        users[role] = user
+    return users
+
+
+def seed_students(total, seed, owner=None, chunk_size=SEED_CHUNK_SIZE):
+    """Bulk insert ``total`` synthetic students, every 100th one owned by ``owner``."""
+    created = 0
+    for columns in iter_student_chunks(total, seed=seed, chunk_size=chunk_size):
+        values = [columns[field].tolist() for field in STUDENT_FEATURE_FIELDS]
+        students = []
+        for row in zip(*values):
+            student = Student(**dict(zip(STUDENT_FEATURE_FIELDS, row)))
+            if owner is not None and created % 100 == 0:
+                student.user = owner
+            students.append(student)
+            created += 1
+        Student.objects.bulk_create(students, batch_size=chunk_size)
+    return created
+
+
+class BenchmarkContext:
+    """Shared state handed to every scenario."""
+
+    def __init__(self, scale, seed, repeat, batch_size, upload_rows, writers=4):
+        self.scale = scale
+        self.seed = seed
+        self.repeat = repeat
+        self.batch_size = batch_size
+        self.upload_rows = upload_rows
+        self.writers = writers
+        self.users = {}
+        # Prediction inputs in the format expected by predict_student_status
+        self.model_rows = [
+            Student(**row).get_feature_dict()
+            for row in iter_student_rows(batch_size, seed=seed + 1)
+        ]
+
+    def client(self, role):
+        client = APIClient()
+        client.force_authenticate(user=self.users[role])
+        return client
+
+
+def _expect(response, status_code):
+    if response.status_code != status_code:
+        raise BenchmarkError(
+            f'{response.request["PATH_INFO"]} returned {response.status_code}, expected {status_code}'
+        )
+    return response
+
+
+@scenario('predict_single')
+def bench_predict_single(ctx):
+    row = ctx.model_rows[0]
+    return {'predict_single': measure(lambda: predict_student_status(row), ctx.repeat * 10)}
+
+
+@scenario('predict_batch')
+def bench_predict_batch(ctx):
+    rows = ctx.model_rows
+
+    def run():
+        for row in rows:
+            predict_student_status(row)
+
+    return {'predict_batch': measure(run, ctx.repeat, items=len(rows))}
+
+
+@scenario('predict_explain')
+def bench_predict_explain(ctx):
+    """Extra cost of explain=true, for one prediction and for a whole batch."""
+    row = ctx.model_rows[0]
+    features = np.array([build_feature_vector(r) for r in ctx.model_rows])
+    return {
+        'predict_single_explain': measure(lambda: predict_student_status(row, explain=True), ctx.repeat * 10),
+        'explain_batch': measure(lambda: explain_feature_matrix(features), ctx.repeat, items=len(features)),
+    }
+
+
+def _csv_payload(rows, seed):
+    buffer = io.StringIO()
+    write_csv(buffer, rows, seed=seed)
+    return buffer.getvalue().encode('utf-8')
+
+
+@scenario('upload')
+def bench_upload(ctx):
+    # Uploads skip rows already stored, so every timed call gets fresh rows
+    payloads = [_csv_payload(ctx.upload_rows, ctx.seed + 2 + i) for i in range(ctx.repeat + 1)]
+    fresh = iter(payloads)
+    client = ctx.client('Teacher')
+
+    def post(payload):
+        upload = SimpleUploadedFile('students.csv', payload, content_type='text/csv')
+        _expect(client.post('/api/upload/', {'file': upload}, format='multipart'), 201)
+
+    return {
+        'upload': measure(lambda: post(next(fresh)), ctx.repeat, items=ctx.upload_rows),
+        # Re-uploading a file that is already stored: hash checks only
+        'upload_duplicate': measure(lambda: post(payloads[0]), ctx.repeat, items=ctx.upload_rows),
+    }
+
+
+@scenario('upload_parquet')
+def bench_upload_parquet(ctx):
+    from .importers import pa, pq
+    if pa is None:
+        return {}
+
+    payloads = []
+    for i in range(ctx.repeat + 1):
+        columns = next(iter_student_chunks(ctx.upload_rows, seed=ctx.seed + 100 + i, chunk_size=ctx.upload_rows))
+        buffer = io.BytesIO()
+        pq.write_table(pa.table(columns), buffer)
+        payloads.append(buffer.getvalue())
+    fresh = iter(payloads)
+    client = ctx.client('Teacher')
+
+    def run():
+        upload = SimpleUploadedFile('students.parquet', next(fresh), content_type='application/vnd.apache.parquet')
+        _expect(client.post('/api/upload/', {'file': upload}, format='multipart'), 201)
+
+    return {'upload_parquet': measure(run, ctx.repeat, items=ctx.upload_rows)}
+
+
+@scenario('students_list')
+def bench_students_list(ctx):
+    client = ctx.client('Teacher')
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 20
+    last_page = max(1, math.ceil(Student.objects.count() / page_size))
+    results = {}
+    for label, page in (('first', 1), ('middle', max(1, last_page // 2)), ('last', last_page)):
+        results[f'students_list_{label}_page'] = measure(
+            lambda page=page: _expect(client.get('/api/students/', {'page': page}), 200),
+            ctx.repeat,
+        )
+    return results
+
+
+@scenario('class_average')
+def bench_class_average(ctx):
+    client = ctx.client('Teacher')
+    return {
+        'class_average': measure(lambda: _expect(client.get('/api/class-average/'), 200), ctx.repeat),
+    }
+
+
+@scenario('at_risk')
+def bench_at_risk(ctx):
+    client = ctx.client('Teacher')
+    course = Student.objects.values_list('course', flat=True).first()
+    return {
+        'at_risk_top': measure(lambda: _expect(client.get('/api/students/at-risk/'), 200), ctx.repeat),
+        'at_risk_course': measure(
+            lambda: _expect(client.get('/api/students/at-risk/', {'course': course}), 200),
+            ctx.repeat,
+        ),
+    }
+
+
+@scenario('permissions')
+def bench_permissions(ctx):
+    permission = IsTeacherOrAdmin()
+    results = {}
+    for role, user in ctx.users.items():
+        request = SimpleNamespace(user=user)
+
+        def check(request=request):
+            # Each request gets a fresh user; drop the group names cached by the previous call
+            request.user.__dict__.pop('_group_names', None)
+            return permission.has_permission(request, None)
+
+        results[f'permission_{role.lower()}'] = measure(check, ctx.repeat * 10)
+    return results
+
+
+def _concurrent_writes(writers, rows_per_writer, seed, bulk):
+    """Insert rows from ``writers`` threads at once; returns the number of failed writes."""
+    errors = []
+
+    def write(index):
+        rows = [Student(**row) for row in iter_student_rows(rows_per_writer, seed=seed + index)]
+        try:
+            if bulk:
+                Student.objects.bulk_create(rows)
+            else:
+                for student in rows:
+                    try:
+                        student.save()
+                    except OperationalError:
+                        errors.append(1)
+        except OperationalError:
+            errors.append(len(rows))
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(errors)
+
+
+@scenario('db_writes')
+def bench_db_writes(ctx):
+    """
+    Concurrent write throughput of the configured database profile.
+
+    Several threads insert at once, either one row per statement (as
+    single-record saves do) or with a single bulk_create each.
+    """
+    results = {}
+    rows_per_writer = max(1, ctx.upload_rows // ctx.writers)
+    for label, bulk in (('row', False), ('bulk', True)):
+        failures = []
+        stats = measure(
+            lambda bulk=bulk: failures.append(_concurrent_writes(ctx.writers, rows_per_writer, ctx.seed, bulk)),
+            ctx.repeat,
+            warmup=0,
+            items=rows_per_writer * ctx.writers,
+        )
+        stats['writers'] = ctx.writers
+        stats['failed_writes'] = sum(failures)
+        results[f'db_writes_{label}'] = stats
+    return results
+
+
+def environment_info():
+    """Describe the software and hardware a run was made on."""
+    info = {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'database': connection.vendor,
+        'database_profile': getattr(settings, 'DB_PROFILE', None),
+    }
+    try:
+        import sklearn
+        info['sklearn'] = sklearn.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def run_benchmarks(scenarios, scale, seed=0, repeat=10, batch_size=1000, upload_rows=500, writers=4, log=None):
+    """
+    Seed a throwaway database and run the given scenarios.
+
+    Returns:
+        Dict with 'meta' (parameters and environment) and 'results'
+        (result name -> timing summary from ``measure``).
+    """
+    log = log or (lambda message: None)
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise BenchmarkError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+
+    results = {}
+    with benchmark_database():
+        # Loading bumps the 'models' data version, which needs a connection
+        get_models()
+        ctx = BenchmarkContext(scale, seed, repeat, batch_size, upload_rows, writers)
+        ctx.users = create_role_users()
+
+        log(f'Seeding {scale} synthetic students...')
+        start = time.perf_counter()
+        seed_students(scale, seed, owner=ctx.users['Student'])
+        seed_seconds = time.perf_counter() - start
+
+        # Measure the server's cost, not the production rate limits
+        no_throttling = dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={})
+        with override_settings(REST_FRAMEWORK=no_throttling):
+            for name in scenarios:
+                log(f'Running {name}...')
+                results.update(SCENARIOS[name](ctx))
+
+        meta = {
+            'timestamp': timezone.now().isoformat(),
+            'scale': scale,
+            'seed': seed,
+            'repeat': repeat,
+            'batch_size': batch_size,
+            'upload_rows': upload_rows,
+            'writers': writers,
+            'seed_seconds': seed_seconds,
+            'environment': environment_info(),
+        }
+    return {'meta': meta, 'results': results}
+
+
+def compare_results(current, baseline, threshold=0.2):
+    """
+    Compare the median timings of two runs.
+
+    Args:
+        current: Output of ``run_benchmarks``.
+        baseline: Output of an earlier ``run_benchmarks``.
+        threshold: Relative slowdown above which a result counts as a regression.
+
+    Returns:
+        List of dicts, one per result present in both runs.
+    """
+    comparison = []
+    for name, stats in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or not base.get('median_ms'):
+            continue
+        ratio = stats['median_ms'] / base['median_ms']
+        comparison.append({
+            'name': name,
+            'baseline_median_ms': base['median_ms'],
+            'current_median_ms': stats['median_ms'],
+            'ratio': ratio,
+            'regressed': ratio > 1 + threshold,
+        })
+    return comparison
@@ -0,0 +1,125 @@
+"""
+Conditional GET
+
+Read-heavy endpoints answer ``If-None-Match`` from a version token per data
+set ('students', 'models') kept in the cache, so an unchanged dashboard
+refresh gets a 304 without aggregating or serializing anything. The token
+is replaced after every committed change: Student signals cover single
+saves and deletes, bulk operations call ``bump_data_version`` themselves.
+
+The ETag also covers the user, the URL and the Accept header, since each of
+them changes the response.
+
+Only ETags are used, never ``Last-Modified``. A modification date is shared
+by every user and every filter of a data set, so a client sending
+``If-Modified-Since`` alone could be answered 304 for a response it has
+never seen, such as another user's student list. Browsers and the dashboard
+send ``If-None-Match`` whenever they have an ETag, so nothing is lost.
+
+A token that falls out of the cache is recreated with a new value, which
+costs one full response per client; with a per-process cache,
+DATA_VERSION_TIMEOUT bounds how long a change made in another process can
+go unnoticed.
+"""
+
+import hashlib
+import threading
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+DATA_VERSION_KEY = 'data-version:{name}'
+DATA_VERSION_TIMEOUT = 5 * 60
+
+_deferred = threading.local()
+
+
+def _new_version():
+    return {'token': uuid.uuid4().hex}
+
+
+def get_data_versions(names):
+    """The current version of each named data set, creating missing ones."""
+    keys = {name: DATA_VERSION_KEY.format(name=name) for name in names}
+    stored = cache.get_many(keys.values())
+    versions = {}
+    for name, key in keys.items():
+        version = stored.get(key)
+        if version is None:
+            # Another process may have created it in the meantime; keep whichever won
+            cache.add(key, _new_version(), DATA_VERSION_TIMEOUT)
+            version = cache.get(key) or _new_version()
+        versions[name] = version
+    return versions
+
+
+def bump_data_version(name):
+    """
+    Give ``name`` a new version once the current transaction commits.
+
+    Bumping after the commit means a response built from the old data can
+    never carry the new version.
+    """
+    deferred = getattr(_deferred, 'names', None)
+    if deferred is not None:
+        deferred.add(name)
+        return
+    key = DATA_VERSION_KEY.format(name=name)
+    transaction.on_commit(lambda: cache.set(key, _new_version(), DATA_VERSION_TIMEOUT))
+
+
+@contextmanager
+def deferred_bumps():
+    """
+    Collect the ``bump_data_version`` calls made in the block, for example by
+    the signals of a bulk delete, and bump each data set once at the end.
+    """
+    if getattr(_deferred, 'names', None) is not None:
+        yield
+        return
+    _deferred.names = set()
+    try:
+        yield
+    finally:
+        names, _deferred.names = _deferred.names, None
+        for name in names:
+            bump_data_version(name)
+
+
+def conditional_on(*names, vary_on=None):
+    """
+    Decorator for GET handlers whose response depends only on the named
+    data sets, the requesting user and the request URL.
+
+    ``vary_on(request)`` can return a string describing any other state the
+    response depends on, such as in-memory health; it becomes part of the
+    ETag. Use ``method_decorator`` for class-based views.
+    """
+
+    def etag(request, *args, **kwargs):
+        versions = get_data_versions(names)
+        parts = [versions[name]['token'] for name in names]
+        parts += [str(request.user.pk), request.get_full_path(), request.META.get('HTTP_ACCEPT', '')]
+        if vary_on is not None:
+            parts.append(vary_on(request))
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Per-user data: browsers must revalidate, shared caches must not store it
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,241 @@
+"""
+Feature Drift Monitoring
+
+Every scored row is folded into running per-feature statistics in the
+scaler's standardised space: count, mean and sum of squared deviations
+(Welford's method, merged batch-wise with Chan's formula) plus a fixed-bin
+histogram. Each update costs O(1) per row and memory does not grow.
+
+Statistics accumulate in process and are merged into FeatureDriftStatistic
+rows by a background task every DRIFT_FLUSH_INTERVAL seconds or
+DRIFT_FLUSH_ROWS rows, and once more at shutdown. Because the scaler maps
+the training data to mean 0 and variance 1, a live mean far from 0 or a
+variance far from 1 means incoming students no longer look like the
+training data.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import FeatureDriftStatistic
+from .tasks import submit
+
+logger = logging.getLogger(__name__)
+
+# Histogram bins span -HISTOGRAM_RANGE..+HISTOGRAM_RANGE standard deviations,
+# with one extra bin on each side for values outside it
+HISTOGRAM_BINS = 20
+HISTOGRAM_RANGE = 5.0
+HISTOGRAM_EDGES = np.linspace(-HISTOGRAM_RANGE, HISTOGRAM_RANGE, HISTOGRAM_BINS + 1)
+
+# A feature drifts when its mean moves this many training standard
+# deviations, or its variance changes by more than this factor
+MEAN_SHIFT_THRESHOLD = 0.25
+VARIANCE_RATIO_THRESHOLD = 2.0
+
+
+def merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """Combine two sets of (count, mean, sum of squared deviations) into one."""
+    count = count_a + count_b
+    if not count:
+        return 0, mean_a, m2_a
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (count_b / count)
+    m2 = m2_a + m2_b + delta ** 2 * (count_a * count_b / count)
+    return count, mean, m2
+
+
+class FeatureStatistics:
+    """Running moments and histograms for a fixed number of features."""
+
+    def __init__(self, n_features):
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.histogram = np.zeros((n_features, HISTOGRAM_BINS + 2), dtype=np.int64)
+
+    def update(self, features_scaled):
+        """Fold a (n_rows, n_features) batch in."""
+        batch = np.asarray(features_scaled, dtype=np.float64)
+        n_rows, n_features = batch.shape
+        if not n_rows:
+            return
+        batch_mean = batch.mean(axis=0)
+        batch_m2 = ((batch - batch_mean) ** 2).sum(axis=0)
+        self.count, self.mean, self.m2 = merge_moments(
+            self.count, self.mean, self.m2, n_rows, batch_mean, batch_m2
+        )
+
+        # Bin 0 is underflow, bin HISTOGRAM_BINS + 1 overflow; one bincount covers all features
+        width = 2 * HISTOGRAM_RANGE / HISTOGRAM_BINS
+        bins = np.clip(np.floor((batch + HISTOGRAM_RANGE) / width) + 1, 0, HISTOGRAM_BINS + 1).astype(np.int64)
+        offsets = np.arange(n_features) * (HISTOGRAM_BINS + 2)
+        self.histogram += np.bincount(
+            (bins + offsets).ravel(), minlength=n_features * (HISTOGRAM_BINS + 2)
+        ).reshape(n_features, HISTOGRAM_BINS + 2)
+
+    def merge(self, other):
+        self.count, self.mean, self.m2 = merge_moments(
+            self.count, self.mean, self.m2, other.count, other.mean, other.m2
+        )
+        self.histogram += other.histogram
+
+
+class DriftMonitor:
+    """Process-wide accumulator, keyed by the fingerprint of the scaler in use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}  # scaler fingerprint -> FeatureStatistics
+        self._last_flush = time.monotonic()
+        self._flush_scheduled_at = None
+
+    def record(self, fingerprint, features_scaled):
+        """Add scored rows; schedules a flush when the size or time threshold is reached."""
+        with self._lock:
+            stats = self._pending.get(fingerprint)
+            if stats is None:
+                stats = self._pending[fingerprint] = FeatureStatistics(features_scaled.shape[1])
+            stats.update(features_scaled)
+
+            now = time.monotonic()
+            interval = getattr(settings, 'DRIFT_FLUSH_INTERVAL', 60)
+            due = (
+                sum(s.count for s in self._pending.values()) >= getattr(settings, 'DRIFT_FLUSH_ROWS', 1000)
+                or now - self._last_flush >= interval
+            )
+            # A flush queued inside a transaction that rolled back never runs; retry after an interval
+            if not due or (self._flush_scheduled_at is not None and now - self._flush_scheduled_at < interval):
+                return
+            self._flush_scheduled_at = now
+        submit(self.flush)
+
+    def pending(self, fingerprint):
+        """Copy of the statistics not yet written to the database."""
+        with self._lock:
+            stats = self._pending.get(fingerprint)
+            if stats is None:
+                return None
+            copy = FeatureStatistics(len(stats.mean))
+            copy.merge(stats)
+            return copy
+
+    def discard(self):
+        """Drop pending statistics without saving them."""
+        with self._lock:
+            self._pending = {}
+            self._flush_scheduled_at = None
+
+    def flush(self):
+        """Merge pending statistics into the database."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            self._flush_scheduled_at = None
+
+        for fingerprint, stats in pending.items():
+            try:
+                save_statistics(fingerprint, stats)
+            except Exception:
+                logger.exception('Could not save feature drift statistics')
+                # Keep them for the next flush
+                with self._lock:
+                    current = self._pending.setdefault(fingerprint, FeatureStatistics(len(stats.mean)))
+                    current.merge(stats)
+
+
+monitor = DriftMonitor()
+atexit.register(monitor.flush)
+
+
+def save_statistics(fingerprint, stats):
+    """Merge ``stats`` into the stored FeatureDriftStatistic rows, one per feature."""
+    with transaction.atomic():
+        stored = {
+            row.feature_index: row
+            for row in FeatureDriftStatistic.objects.select_for_update().filter(scaler_fingerprint=fingerprint)
+        }
+        created, updated = [], []
+        now = timezone.now()
+        for i in range(len(stats.mean)):
+            row = stored.get(i)
+            if row is None:
+                created.append(FeatureDriftStatistic(
+                    scaler_fingerprint=fingerprint,
+                    feature_index=i,
+                    count=stats.count,
+                    mean=float(stats.mean[i]),
+                    m2=float(stats.m2[i]),
+                    histogram=stats.histogram[i].tolist(),
+                ))
+                continue
+            row.count, mean, m2 = merge_moments(row.count, row.mean, row.m2, stats.count, stats.mean[i], stats.m2[i])
+            row.mean, row.m2 = float(mean), float(m2)
+            row.histogram = (np.asarray(row.histogram, dtype=np.int64) + stats.histogram[i]).tolist()
+            row.updated_at = now
+            updated.append(row)
+        FeatureDriftStatistic.objects.bulk_create(created)
+        FeatureDriftStatistic.objects.bulk_update(updated, ['count', 'mean', 'm2', 'histogram', 'updated_at'])
+
+
+def load_statistics(fingerprint, n_features):
+    """Stored plus pending statistics for the given scaler."""
+    stats = FeatureStatistics(n_features)
+    for row in FeatureDriftStatistic.objects.filter(scaler_fingerprint=fingerprint, feature_index__lt=n_features):
+        stats.count = row.count
+        stats.mean[row.feature_index] = row.mean
+        stats.m2[row.feature_index] = row.m2
+        stats.histogram[row.feature_index] = row.histogram
+    pending = monitor.pending(fingerprint)
+    if pending is not None:
+        stats.merge(pending)
+    return stats
+
+
+def drift_report(scaler, fingerprint, feature_names,
+                 mean_threshold=MEAN_SHIFT_THRESHOLD, variance_threshold=VARIANCE_RATIO_THRESHOLD):
+    """
+    Compare live statistics with the scaler's training mean_ and var_.
+
+    Returns:
+        Dictionary with the number of rows observed, the names of drifting
+        features and per-feature details in both raw and standardised units.
+    """
+    stats = load_statistics(fingerprint, len(feature_names))
+    live_variance = stats.m2 / (stats.count - 1) if stats.count > 1 else np.full(len(feature_names), np.nan)
+    # StandardScaler divides by scale_, which is sqrt(var_) except for constant features
+    training_scale = scaler.scale_
+
+    features = []
+    for i, name in enumerate(feature_names):
+        mean_shift = float(stats.mean[i]) if stats.count else None
+        variance_ratio = float(live_variance[i]) if stats.count > 1 else None
+        drifting = bool(
+            (mean_shift is not None and abs(mean_shift) > mean_threshold)
+            or (variance_ratio is not None and not 1 / variance_threshold <= variance_ratio <= variance_threshold)
+        )
+        features.append({
+            'feature': name,
+            'training_mean': float(scaler.mean_[i]),
+            'training_variance': float(scaler.var_[i]),
+            'live_mean': float(scaler.mean_[i] + stats.mean[i] * training_scale[i]) if stats.count else None,
+            'live_variance': variance_ratio * float(training_scale[i]) ** 2 if variance_ratio is not None else None,
+            'mean_shift': mean_shift,
+            'variance_ratio': variance_ratio,
+            'drifting': drifting,
+            'histogram': stats.histogram[i].tolist(),
+        })
+
+    return {
+        'count': int(stats.count),
+        'histogram_edges': HISTOGRAM_EDGES.tolist(),
+        'drifting_features': [feature['feature'] for feature in features if feature['drifting']],
+        'features': features,
+    }
@@ -0,0 +1,198 @@
+"""
+Server-Push Event Hub
+
+An in-process broadcast hub that delivers events (new notifications, batch
+job progress) to the server-sent-event streams of connected users.
+
+``publish`` is thread-safe and may be called from request threads or
+background tasks; each subscriber is an asyncio queue owned by the event
+loop serving its stream.
+
+Browsers open a stream with EventSource, which cannot send an
+Authorization header. Clients therefore exchange their access token for a
+stream ticket at /api/notifications/stream-ticket/ and pass it as
+``?ticket=``. A ticket is signed, names one user, only opens the event
+stream, expires after STREAM_TICKET_MAX_AGE seconds and is accepted once, so
+the access token itself never appears in a URL.
+
+With several worker processes a notification created in one process never
+reaches subscribers in another. Setting NOTIFICATION_STREAM_POLL_INTERVAL
+enables a database polling bridge instead: one query per interval fetches new
+notifications for every user subscribed to this process.
+"""
+
+import asyncio
+import logging
+import secrets
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+# Events a slow client may fall behind by before older ones are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+STREAM_TICKET_SALT = 'predictions.events.stream-ticket'
+STREAM_TICKET_MAX_AGE = 30
+STREAM_TICKET_USED_KEY = 'stream-ticket-used:{nonce}'
+
+
+def _put_dropping_oldest(queue, event):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class BroadcastHub:
+    """Fan events out to the asyncio queues of subscribed users."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> set of (loop, queue)
+
+    def subscribe(self, user_id):
+        """Register a queue for ``user_id``; must be called from the stream's event loop."""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(entry)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            entries = self._subscribers.get(user_id, set())
+            entries.difference_update({entry for entry in entries if entry[1] is queue})
+            if not entries:
+                self._subscribers.pop(user_id, None)
+
+    def subscriber_ids(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def publish(self, user_id, event):
+        """Deliver ``event`` to every stream of ``user_id``. Safe to call from any thread."""
+        with self._lock:
+            entries = list(self._subscribers.get(user_id, ()))
+        for loop, queue in entries:
+            try:
+                loop.call_soon_threadsafe(_put_dropping_oldest, queue, event)
+            except RuntimeError:
+                # The loop has been closed; its stream is gone
+                self.unsubscribe(user_id, queue)
+
+
+hub = BroadcastHub()
+
+
+def notification_event(notification):
+    return {
+        'event': 'notification',
+        'id': notification.id,
+        'data': {
+            'id': notification.id,
+            'title': notification.title,
+            'message': notification.message,
+            'type': notification.type,
+            'student': notification.student_id,
+            'created_at': notification.created_at.isoformat() if notification.created_at else None,
+        },
+    }
+
+
+def issue_stream_ticket(user_id):
+    """A ticket that opens one notification stream for ``user_id``."""
+    return signing.dumps({'user_id': user_id, 'nonce': secrets.token_hex(16)}, salt=STREAM_TICKET_SALT)
+
+
+def redeem_stream_ticket(ticket):
+    """
+    The user id of a valid ticket, or None if it is forged, expired or was
+    already used. Reuse is detected through the cache, so across processes
+    only with a shared cache; the expiry applies everywhere.
+    """
+    try:
+        payload = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=STREAM_TICKET_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if not cache.add(STREAM_TICKET_USED_KEY.format(nonce=payload['nonce']), True, STREAM_TICKET_MAX_AGE):
+        return None
+    return payload['user_id']
+
+
+def polling_bridge_enabled():
+    return bool(getattr(settings, 'NOTIFICATION_STREAM_POLL_INTERVAL', 0))
+
+
+def publish_notifications(notifications):
+    """
+    Push newly created notifications to their users once the transaction commits.
+
+    Does nothing when the polling bridge is enabled, since the bridge picks
+    the rows up from the database instead.
+    """
+    if polling_bridge_enabled():
+        return
+    events = [(n.user_id, notification_event(n)) for n in notifications]
+    transaction.on_commit(lambda: [hub.publish(user_id, event) for user_id, event in events])
+
+
+def publish_batch_progress(user_id, job_id, processed, total, state='running'):
+    """Report batch upload progress to the uploading user's streams."""
+    hub.publish(user_id, {
+        'event': 'batch_progress',
+        'data': {'job': job_id, 'processed': processed, 'total': total, 'state': state},
+    })
+
+
+class DatabasePollingBridge:
+    """
+    Periodically load new notifications for all subscribed users with a single query.
+
+    Runs as one asyncio task per process, started with the first stream.
+    """
+
+    def __init__(self, hub):
+        self.hub = hub
+        self.last_id = None
+        self._task = None
+
+    def ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def _fetch(self, user_ids):
+        if self.last_id is None:
+            self.last_id = Notification.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            return []
+        rows = list(
+            Notification.objects.filter(id__gt=self.last_id, user_id__in=user_ids).order_by('id')
+        )
+        if rows:
+            self.last_id = rows[-1].id
+        return rows
+
+    async def run(self):
+        interval = settings.NOTIFICATION_STREAM_POLL_INTERVAL
+        while True:
+            user_ids = self.hub.subscriber_ids()
+            if not user_ids:
+                # Nobody is listening; stop until the next stream starts the bridge
+                self._task = None
+                self.last_id = None
+                return
+            try:
+                for notification in await sync_to_async(self._fetch)(user_ids):
+                    self.hub.publish(notification.user_id, notification_event(notification))
+            except Exception:
+                logger.exception('Notification polling bridge failed')
+            await asyncio.sleep(interval)
+
+
+bridge = DatabasePollingBridge(hub)
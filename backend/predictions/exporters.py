@@ -0,0 +1,146 @@
+"""
+Streaming Exporters for Student Data
+
+Turn a Student queryset into a stream of CSV, Parquet or Arrow IPC bytes.
+Rows are read with ``values_list().iterator(chunk_size=...)`` and encoded one
+chunk at a time, so memory use stays constant regardless of table size.
+
+Parquet and Arrow output need the optional ``pyarrow`` package.
+"""
+
+import csv
+import io
+
+from django.db import models
+
+from .models import Student
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+# Internal columns that are not part of a student's data
+EXCLUDED_FIELDS = {'content_hash'}
+
+
+def _export_model_fields():
+    return [field for field in Student._meta.concrete_fields if field.attname not in EXCLUDED_FIELDS]
+
+
+def export_fields():
+    """Exported Student columns in declaration order, using ``user_id`` for the owner."""
+    return [field.attname for field in _export_model_fields()]
+
+
+def arrow_available():
+    return pa is not None
+
+
+class _ByteSink(io.RawIOBase):
+    """
+    Write-only sink that hands out everything written since the last drain.
+
+    ``tell()`` keeps counting across drains because the Parquet writer
+    records absolute file offsets in the footer.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _iter_row_chunks(queryset, fields, chunk_size):
+    chunk = []
+    for row in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the queryset as CSV, one encoded chunk of rows at a time."""
+    fields = export_fields()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in _iter_row_chunks(queryset, fields, chunk_size):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def arrow_schema():
+    """Arrow schema matching the exported Student columns."""
+    types = []
+    for field in _export_model_fields():
+        if isinstance(field, models.FloatField):
+            arrow_type = pa.float64()
+        elif isinstance(field, models.DateTimeField):
+            arrow_type = pa.timestamp('us', tz='UTC')
+        elif isinstance(field, (models.CharField, models.TextField)):
+            arrow_type = pa.string()
+        else:
+            arrow_type = pa.int64()
+        types.append(pa.field(field.attname, arrow_type, nullable=field.null))
+    return pa.schema(types)
+
+
+def iter_arrow(queryset, file_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the queryset as a Parquet file or an Arrow IPC stream.
+
+    Each chunk of rows becomes one Parquet row group or one Arrow record batch.
+    """
+    fields = export_fields()
+    schema = arrow_schema()
+    sink = _ByteSink()
+    if file_format == 'parquet':
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema)
+
+    for rows in _iter_row_chunks(queryset, fields, chunk_size):
+        columns = [pa.array(values, type=schema.field(i).type) for i, values in enumerate(zip(*rows))]
+        writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+        data = sink.drain()
+        if data:
+            yield data
+
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,116 @@
+"""
+Liveness and Readiness
+
+``/livez`` only proves the process answers requests. ``/readyz`` reports
+whether the model is loaded, read from the in-memory state kept by
+``load_models()``, plus the outcome and latency of a self-test inference.
+The self-test scores one row at the scaler's training mean and checks that
+the probabilities are finite and sum to one. It is repeated every
+HEALTH_SELF_TEST_INTERVAL seconds in the background, so a probe never waits
+on the model or the disk. A model that failed to load is retried at the
+same interval.
+
+The WSGI and ASGI entry points call ``warm_up()``, which loads the models and
+runs the first self-test in a background thread as the process starts.
+Until it finishes ``/readyz`` answers 503 instead of loading the models
+itself. Without a warm-up (management commands, tests) the first probe runs
+the self-test inline.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from django.conf import settings
+
+from .tasks import submit
+from .utils import get_model_state, get_models, predict_feature_matrix
+
+logger = logging.getLogger(__name__)
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat() if timestamp else None
+
+
+class SelfTest:
+    """Periodic self-test inference whose last result is kept in memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = False
+        self._last_attempt = None
+        self.result = None
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            _, scaler, _ = get_models()
+            # Time the inference alone, not a model load the first run may trigger
+            started = time.perf_counter()
+            result = predict_feature_matrix(scaler.mean_.reshape(1, -1), monitor=False)
+            probabilities = result['probabilities']
+            ok = bool(np.isfinite(probabilities).all() and abs(probabilities.sum() - 1) < 1e-3)
+            error = None if ok else 'Self-test returned invalid probabilities'
+        except Exception as e:
+            ok, error = False, str(e)
+            logger.warning('Model self-test failed: %s', e)
+        self.result = {
+            'ok': ok,
+            'latency_ms': (time.perf_counter() - started) * 1000,
+            'checked_at': time.time(),
+            'error': error,
+        }
+        with self._lock:
+            self._running = False
+
+    def current(self):
+        """The last result, running a new self-test first if none exists and in the background if it is stale."""
+        interval = getattr(settings, 'HEALTH_SELF_TEST_INTERVAL', 30)
+        now = time.monotonic()
+        with self._lock:
+            due = not self._running and (self._last_attempt is None or now - self._last_attempt >= interval)
+            if due:
+                self._running = True
+                self._last_attempt = now
+            first = self.result is None
+        if due:
+            if first:
+                self.run()
+            else:
+                submit(self.run)
+        return self.result
+
+
+self_test = SelfTest()
+
+
+def warm_up():
+    """Load the models and run the first self-test off the request path. Returns the thread."""
+    thread = threading.Thread(target=self_test.current, name='edupredict-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness():
+    """
+    Whether this process can serve predictions.
+
+    Returns:
+        Tuple of (ready, details dictionary).
+    """
+    result = self_test.current()
+    state = get_model_state()
+    ready = bool(state['loaded'] and result and result['ok'])
+    return ready, {
+        'status': 'ready' if ready else 'unavailable',
+        'model': {
+            'loaded': state['loaded'],
+            'version': state['version'],
+            'loaded_at': _isoformat(state['loaded_at']),
+            'error': state['error'],
+        },
+        'self_test': result and dict(result, checked_at=_isoformat(result['checked_at'])),
+    }
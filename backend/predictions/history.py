@@ -0,0 +1,164 @@
+"""
+Prediction History
+
+Every prediction is appended to PredictionLog without a database round trip
+on the request path: entries are collected in an in-process write-behind
+buffer and written with bulk_create once HISTORY_FLUSH_SIZE entries are
+waiting, every HISTORY_FLUSH_INTERVAL seconds, and at shutdown.
+
+Entries still buffered when a process is killed without a clean shutdown
+are lost; the buffer trades that for request latency.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connections
+from django.utils import timezone
+
+from .models import ArchivedStudent, PredictionLog, Student
+from .tasks import submit
+from .utils import get_model_version
+
+logger = logging.getLogger(__name__)
+
+HISTORY_BATCH_SIZE = 1000
+
+# Entries kept while the database is unavailable; older ones are dropped beyond this
+HISTORY_MAX_BUFFERED = 100000
+
+
+class WriteBehindBuffer:
+    """Collect PredictionLog rows in memory and write them in batches."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._flush_queued = False
+        self._timer = None
+        self._stopped = threading.Event()
+
+    def add(self, entries):
+        with self._lock:
+            self._entries.extend(entries)
+            overflow = len(self._entries) - HISTORY_MAX_BUFFERED
+            if overflow > 0:
+                del self._entries[:overflow]
+                logger.warning('Prediction history buffer full, dropped %d entries', overflow)
+            self._ensure_timer()
+            if len(self._entries) < getattr(settings, 'HISTORY_FLUSH_SIZE', 500) or self._flush_queued:
+                return
+            self._flush_queued = True
+        submit(self.flush)
+
+    def _ensure_timer(self):
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Thread(target=self._run_timer, name='edupredict-history', daemon=True)
+            self._timer.start()
+
+    def _run_timer(self):
+        while not self._stopped.wait(getattr(settings, 'HISTORY_FLUSH_INTERVAL', 5)):
+            try:
+                self.flush()
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        """Write all buffered entries. Returns the number written."""
+        with self._lock:
+            entries, self._entries = self._entries, []
+            self._flush_queued = False
+        if not entries:
+            return 0
+
+        try:
+            try:
+                PredictionLog.objects.bulk_create(entries, batch_size=HISTORY_BATCH_SIZE)
+            except IntegrityError:
+                # A student was archived or deleted while its entry waited; link the archived copy, if any
+                student_ids = {e.student_id for e in entries if e.student_id}
+                existing = set(Student.objects.filter(pk__in=student_ids).values_list('pk', flat=True))
+                archived = set(
+                    ArchivedStudent.objects.filter(pk__in=student_ids - existing).values_list('pk', flat=True)
+                )
+                for entry in entries:
+                    if entry.student_id not in existing:
+                        if entry.student_id in archived:
+                            entry.archived_student_id = entry.student_id
+                        entry.student_id = None
+                PredictionLog.objects.bulk_create(entries, batch_size=HISTORY_BATCH_SIZE)
+        except Exception:
+            logger.exception('Could not write %d prediction history entries', len(entries))
+            with self._lock:
+                self._entries[:0] = entries
+            return 0
+        return len(entries)
+
+    def discard(self):
+        with self._lock:
+            self._entries = []
+            self._flush_queued = False
+
+    def shutdown(self):
+        self._stopped.set()
+        self.flush()
+
+
+buffer = WriteBehindBuffer()
+atexit.register(buffer.shutdown)
+
+
+def _probabilities(class_names, row):
+    return {str(name): float(probability) for name, probability in zip(class_names, row)}
+
+
+def log_prediction(result, latency_ms, user_id=None, student_id=None, source='predict'):
+    """Buffer one result of ``predict_student_status``."""
+    buffer.add([PredictionLog(
+        student_id=student_id,
+        user_id=user_id,
+        source=source,
+        model_version=get_model_version(),
+        predicted_class=result['predicted_class'],
+        dropout_probability=result['dropout_probability'],
+        probabilities={str(k): v for k, v in result['all_probabilities'].items()},
+        latency_ms=latency_ms,
+    )])
+
+
+def log_batch(result, latency_ms, student_ids, user_id=None, source='upload'):
+    """
+    Buffer the rows of a ``predict_feature_matrix`` result.
+
+    Args:
+        result: Output of predict_feature_matrix.
+        latency_ms: Time spent scoring the whole batch.
+        student_ids: Saved student per row, in row order.
+    """
+    count = len(student_ids)
+    if not count:
+        return
+    version = get_model_version()
+    now = timezone.now()
+    class_names = result['class_names']
+    buffer.add([
+        PredictionLog(
+            student_id=student_id,
+            user_id=user_id,
+            source=source,
+            model_version=version,
+            predicted_class=predicted_class,
+            dropout_probability=dropout_probability,
+            probabilities=_probabilities(class_names, row),
+            latency_ms=latency_ms / count,
+            created_at=now,
+        )
+        for student_id, predicted_class, dropout_probability, row in zip(
+            student_ids,
+            result['predicted_class'].tolist(),
+            result['dropout_probability'].tolist(),
+            result['probabilities'].tolist(),
+        )
+    ])
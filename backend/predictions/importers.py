@@ -0,0 +1,120 @@
+"""
+Columnar Importers for Batch Scoring
+
+Read Parquet and Arrow IPC uploads into whole NumPy columns that map
+straight into the model's feature matrix. Types are checked once per column
+against the Student schema instead of converting every cell in Python.
+CSV uploads are validated row by row and then put into the same column
+form with ``rows_to_columns``, so one code path saves both.
+
+Needs the optional ``pyarrow`` package.
+"""
+
+import numpy as np
+from django.db import models
+
+from .models import FEATURE_RANGES, Student, STUDENT_FEATURE_FIELDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.arrows', '.feather', '.ipc')
+COLUMNAR_EXTENSIONS = PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+
+class ColumnarImportError(Exception):
+    """Raised when an uploaded file cannot be used for batch scoring."""
+
+    def __init__(self, errors):
+        self.errors = errors if isinstance(errors, list) else [errors]
+        super().__init__('; '.join(self.errors))
+
+
+def is_columnar_upload(filename):
+    return filename.lower().endswith(COLUMNAR_EXTENSIONS)
+
+
+def read_table(file_obj, filename):
+    """Read an uploaded Parquet file, Arrow IPC file or Arrow IPC stream into a Table."""
+    if pa is None:
+        raise ColumnarImportError('Parquet and Arrow uploads require pyarrow to be installed on the server.')
+
+    source = pa.py_buffer(file_obj.read())
+    try:
+        if filename.lower().endswith(PARQUET_EXTENSIONS):
+            parquet_file = pq.ParquetFile(pa.BufferReader(source))
+            # Only decode the columns the model needs
+            names = set(parquet_file.schema_arrow.names)
+            return parquet_file.read(columns=[name for name in STUDENT_FEATURE_FIELDS if name in names])
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            table = pa.ipc.open_stream(source).read_all()
+    except (pa.ArrowException, OSError) as e:
+        raise ColumnarImportError(f'Could not read {filename}: {e}')
+    return table
+
+
+def table_to_columns(table):
+    """
+    Validate the feature columns of ``table`` and return them as NumPy arrays.
+
+    Every Student feature field must be present, numeric and free of nulls,
+    and every value must lie within FEATURE_RANGES, as the input serializers
+    require; integer fields must hold whole numbers. The whole table is
+    checked before anything is saved, so a bad value rejects the upload
+    instead of failing part-way through it.
+
+    Returns:
+        Dict mapping each name in STUDENT_FEATURE_FIELDS to a 1-D array.
+
+    Raises:
+        ColumnarImportError: listing every offending column.
+    """
+    errors = []
+    columns = {}
+    for name in STUDENT_FEATURE_FIELDS:
+        if name not in table.column_names:
+            errors.append(f'{name}: column is missing')
+            continue
+
+        column = table.column(name)
+        if not (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+            errors.append(f'{name}: expected a numeric column, got {column.type}')
+            continue
+        if column.null_count:
+            errors.append(f'{name}: {column.null_count} empty value(s)')
+            continue
+
+        values = column.to_numpy()
+        whole_numbers = False
+        if pa.types.is_floating(column.type):
+            if not np.isfinite(values).all():
+                errors.append(f'{name}: contains NaN or infinite values')
+                continue
+            whole_numbers = isinstance(Student._meta.get_field(name), models.IntegerField)
+            if whole_numbers and not (values == np.round(values)).all():
+                errors.append(f'{name}: expected whole numbers')
+                continue
+
+        min_value, max_value = FEATURE_RANGES[name]
+        out_of_range = int(np.count_nonzero((values < min_value) | (values > max_value)))
+        if out_of_range:
+            errors.append(f'{name}: {out_of_range} value(s) outside {min_value} to {max_value}')
+            continue
+        # In range, so the cast cannot overflow
+        columns[name] = values.astype(np.int64) if whole_numbers else values
+
+    if errors:
+        raise ColumnarImportError(errors)
+    return columns
+
+
+def rows_to_columns(rows):
+    """Turn validated rows (dicts of Student feature fields) into the column form of ``table_to_columns``."""
+    return {field: np.array([row[field] for row in rows]) for field in STUDENT_FEATURE_FIELDS}
@@ -0,0 +1,257 @@
+"""
+REST API Load Generator
+
+Drives a weighted mix of concurrent requests against a locally running
+server and summarises latency percentiles, error rates and throughput per
+endpoint. Only the standard library HTTP client is used, so no external
+services or tools are required.
+
+Run it through the ``loadtest`` management command.
+"""
+
+import http.client
+import io
+import json
+import random
+import secrets
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+from django.contrib.auth.models import Group, User
+
+from .synthetic import iter_student_rows, write_csv
+
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+USERNAME_PREFIX = 'loadtest'
+
+
+class LoadTestError(Exception):
+    """Raised when the load test cannot be set up."""
+
+
+def parse_mix(spec):
+    """
+    Parse a traffic mix such as ``"predict=8,upload=1"`` into weights.
+
+    Returns:
+        Dict mapping endpoint name to a positive integer weight.
+    """
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in ENDPOINTS:
+            raise LoadTestError(f'Unknown endpoint "{name}". Choose from: {", ".join(sorted(ENDPOINTS))}')
+        try:
+            mix[name] = int(weight or 1)
+        except ValueError:
+            raise LoadTestError(f'Invalid weight for "{name}": {weight}')
+        if mix[name] < 1:
+            raise LoadTestError(f'Weight for "{name}" must be positive')
+    return mix
+
+
+def generate_password():
+    """A random password for one run's users, so provisioned accounts never share a known one."""
+    return secrets.token_urlsafe(24)
+
+
+def provision_users(count, password):
+    """
+    Create (or reset) ``count`` Teacher and ``count`` Student users.
+
+    Pass a password from ``generate_password`` and delete the users with
+    ``remove_users`` when the run ends.
+
+    Returns:
+        Dict mapping role name to a list of usernames.
+    """
+    usernames = {}
+    for role in ('Teacher', 'Student'):
+        group, _ = Group.objects.get_or_create(name=role)
+        usernames[role] = []
+        for i in range(count):
+            username = f'{USERNAME_PREFIX}_{role.lower()}_{i}'
+            user, _ = User.objects.get_or_create(username=username)
+            user.set_password(password)
+            user.save()
+            user.groups.add(group)
+            usernames[role].append(username)
+    return usernames
+
+
+def remove_users():
+    """Delete every user created by ``provision_users`` and return the count."""
+    deleted, _ = User.objects.filter(username__startswith=f'{USERNAME_PREFIX}_').delete()
+    return deleted
+
+
+class Endpoint:
+    """A request template for one API endpoint."""
+
+    def __init__(self, method, path, role, body=None):
+        self.method = method
+        self.path = path
+        self.role = role
+        # Callable(context) -> (body bytes, content type), or None for GET
+        self.body = body
+
+
+def _predict_body(ctx):
+    row = dict(random.choice(ctx.student_rows))
+    return json.dumps(row).encode('utf-8'), 'application/json'
+
+
+def _upload_body(ctx):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        'Content-Disposition: form-data; name="file"; filename="students.csv"\r\n'
+        'Content-Type: text/csv\r\n\r\n'
+    ).encode('utf-8') + ctx.upload_csv + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+ENDPOINTS = {
+    'predict': Endpoint('POST', '/api/predict/', 'Teacher', _predict_body),
+    # The same file every time: after the first request this exercises duplicate skipping
+    'upload': Endpoint('POST', '/api/upload/', 'Teacher', _upload_body),
+    'students': Endpoint('GET', '/api/students/', 'Teacher'),
+    'own_students': Endpoint('GET', '/api/students/', 'Student'),
+    'class_average': Endpoint('GET', '/api/class-average/', 'Student'),
+    'notifications': Endpoint('GET', '/api/notifications/', 'Student'),
+    'health': Endpoint('GET', '/api/health/', 'Student'),
+}
+
+
+class LoadTestContext:
+    """Target server, credentials and pre-generated payloads shared by all workers."""
+
+    def __init__(self, base_url, upload_rows=100, seed=0):
+        parts = urlsplit(base_url)
+        if parts.scheme != 'http' or parts.hostname not in LOCAL_HOSTS:
+            raise LoadTestError(f'Refusing to load test {base_url}: only http://localhost targets are allowed')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.tokens = {}
+        self.student_rows = list(iter_student_rows(1000, seed=seed))
+        buffer = io.StringIO()
+        write_csv(buffer, upload_rows, seed=seed + 1)
+        self.upload_csv = buffer.getvalue().encode('utf-8')
+
+    def connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def obtain_tokens(self, usernames, password):
+        """Log every user in through /api/token/ and keep their access tokens per role."""
+        conn = self.connect()
+        try:
+            for role, names in usernames.items():
+                self.tokens[role] = []
+                for username in names:
+                    body = json.dumps({'username': username, 'password': password})
+                    conn.request('POST', f'{self.prefix}/api/token/', body=body,
+                                 headers={'Content-Type': 'application/json'})
+                    response = conn.getresponse()
+                    payload = response.read()
+                    if response.status != 200:
+                        raise LoadTestError(f'Could not obtain a token for {username}: HTTP {response.status}')
+                    self.tokens[role].append(json.loads(payload)['access'])
+        except (OSError, http.client.HTTPException) as e:
+            raise LoadTestError(f'Could not reach http://{self.host}:{self.port}: {e}')
+        finally:
+            conn.close()
+
+
+def _worker(ctx, mix, deadline, max_requests, counter, samples, lock):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    conn = ctx.connect()
+    try:
+        while time.monotonic() < deadline:
+            with lock:
+                if max_requests and counter[0] >= max_requests:
+                    return
+                counter[0] += 1
+
+            name = random.choices(names, weights)[0]
+            endpoint = ENDPOINTS[name]
+            headers = {'Authorization': f'Bearer {random.choice(ctx.tokens[endpoint.role])}'}
+            body = None
+            if endpoint.body:
+                body, headers['Content-Type'] = endpoint.body(ctx)
+
+            start = time.perf_counter()
+            try:
+                conn.request(endpoint.method, ctx.prefix + endpoint.path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                status = None
+                conn.close()
+                conn = ctx.connect()
+            samples.append((name, time.perf_counter() - start, status))
+    finally:
+        conn.close()
+
+
+def run_load(ctx, mix, concurrency, duration, max_requests=None):
+    """
+    Run ``concurrency`` worker threads until ``duration`` seconds have passed
+    or ``max_requests`` requests have been sent.
+
+    Returns:
+        Tuple of (samples, elapsed seconds), where each sample is
+        (endpoint name, latency in seconds, HTTP status or None on connection error).
+    """
+    samples = []
+    counter = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(ctx, mix, deadline, max_requests, counter, samples, lock))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed):
+    """Aggregate raw samples into per-endpoint latency, error and throughput figures."""
+    by_endpoint = {}
+    for name, latency, status in samples:
+        by_endpoint.setdefault(name, []).append((latency, status))
+    by_endpoint['all'] = [(latency, status) for _, latency, status in samples]
+
+    summary = {}
+    for name, rows in by_endpoint.items():
+        if not rows:
+            continue
+        latencies_ms = np.array([latency for latency, _ in rows]) * 1000
+        errors = sum(1 for _, status in rows if status is None or status >= 400)
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        summary[name] = {
+            'requests': len(rows),
+            'errors': errors,
+            'error_rate': errors / len(rows),
+            'throughput_rps': len(rows) / elapsed if elapsed else None,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'mean_ms': float(latencies_ms.mean()),
+            'max_ms': float(latencies_ms.max()),
+            'status_codes': {
+                str(code): sum(1 for _, status in rows if status == code)
+                for code in sorted({status for _, status in rows}, key=lambda s: (s is None, s))
+            },
+        }
+    return summary
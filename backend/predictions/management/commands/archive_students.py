@@ -0,0 +1,48 @@
+"""
+Management command to move the students of closed terms to the archive table.
+"""
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predictions import archive, exporters
+
+
+class Command(BaseCommand):
+    help = 'Moves the students of closed terms from the Student table to ArchivedStudent, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', action='append', dest='terms', default=[],
+                            help='Term to archive (repeatable)')
+        parser.add_argument('--list', action='store_true',
+                            help='Show active and archived student counts per term and exit')
+        parser.add_argument('--chunk-size', type=int, default=archive.ARCHIVE_CHUNK_SIZE,
+                            help='Students moved per transaction')
+        parser.add_argument('--export-dir',
+                            help='Also write each term to <dir>/students-<term>.parquet before moving it')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for term, counts in sorted(archive.term_counts().items(), key=lambda item: item[0] or ''):
+                self.stdout.write(f"{term or '(no term)'}: {counts['active']} active, {counts['archived']} archived")
+            return
+
+        if not options['terms']:
+            raise CommandError('Give at least one --term, or --list to see the terms')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        export_dir = None
+        if options['export_dir']:
+            if not exporters.arrow_available():
+                raise CommandError('--export-dir requires pyarrow to be installed')
+            export_dir = Path(options['export_dir'])
+            export_dir.mkdir(parents=True, exist_ok=True)
+
+        for term in options['terms']:
+            if export_dir is not None:
+                path = export_dir / f'students-{term}.parquet'
+                written = archive.export_term(term, path)
+                self.stdout.write(f'Exported {term} to {path} ({written / 1e6:.1f} MB)')
+            moved = archive.archive_term(term, chunk_size=options['chunk_size'], log=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS(f'Archived {moved} students of term {term}'))
@@ -0,0 +1,74 @@
+"""
+Management command to benchmark prediction, upload and listing performance.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predictions.benchmarks import SCENARIOS, BenchmarkError, run_benchmarks, compare_results
+
+
+class Command(BaseCommand):
+    help = 'Runs the benchmark suite against a throwaway database seeded with synthetic students'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1000,
+                            help='Number of synthetic students to seed (1k-10M)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the data generator')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed repetitions per scenario')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows scored by the batch prediction scenario')
+        parser.add_argument('--upload-rows', type=int, default=500,
+                            help='Rows in each CSV posted by the upload scenario')
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Concurrent writer threads in the db_writes scenario')
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                            help='Scenario to run (repeatable, default: all)')
+        parser.add_argument('--output', default='-', help='File to write JSON results to (default: stdout)')
+        parser.add_argument('--compare', help='Earlier JSON results to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Relative slowdown reported as a regression (default: 0.2)')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit with an error if any regression is found')
+
+    def handle(self, *args, **options):
+        if options['scale'] < 1:
+            raise CommandError('--scale must be at least 1')
+
+        scenarios = options['scenario'] or list(SCENARIOS)
+        try:
+            report = run_benchmarks(
+                scenarios,
+                scale=options['scale'],
+                seed=options['seed'],
+                repeat=options['repeat'],
+                batch_size=options['batch_size'],
+                upload_rows=options['upload_rows'],
+                writers=options['writers'],
+                log=self.stderr.write,
+            )
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        regressions = []
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            report['comparison'] = compare_results(report, baseline, options['threshold'])
+            regressions = [c for c in report['comparison'] if c['regressed']]
+
+        output = json.dumps(report, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+
+        for regression in regressions:
+            self.stderr.write(self.style.WARNING(
+                f'{regression["name"]}: {regression["baseline_median_ms"]:.2f}ms -> '
+                f'{regression["current_median_ms"]:.2f}ms ({regression["ratio"]:.2f}x)'
+            ))
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} benchmark regression(s) found')
@@ -0,0 +1,90 @@
+"""
+Management command to load test a locally running API server.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predictions.loadtest import (
+    USERNAME_PREFIX,
+    LoadTestContext,
+    LoadTestError,
+    generate_password,
+    parse_mix,
+    provision_users,
+    remove_users,
+    run_load,
+    summarize,
+)
+
+
+class Command(BaseCommand):
+    help = 'Drives concurrent API traffic against a local server and reports latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000',
+                            help='Server to target (localhost only)')
+        parser.add_argument('--mix', default='predict=8,upload=1,students=2,class_average=1',
+                            help='Weighted endpoint mix, e.g. "predict=8,upload=1"')
+        parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent clients')
+        parser.add_argument('--duration', type=float, default=30, help='Test duration in seconds')
+        parser.add_argument('--requests', type=int, help='Stop after this many requests')
+        parser.add_argument('--users', type=int, default=4, help='Test users to provision per role')
+        parser.add_argument('--password', help='Password for provisioned users (default: random per run)')
+        parser.add_argument('--upload-rows', type=int, default=100, help='Rows in each uploaded CSV')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for generated payloads')
+        parser.add_argument('--output', help='File to write the JSON summary to')
+        parser.add_argument('--keep-users', action='store_true',
+                            help='Keep the provisioned users afterwards instead of deleting them')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['users'] < 1:
+            raise CommandError('--concurrency and --users must be at least 1')
+
+        try:
+            mix = parse_mix(options['mix'])
+            ctx = LoadTestContext(options['base_url'], options['upload_rows'], options['seed'])
+        except LoadTestError as e:
+            raise CommandError(str(e))
+
+        password = options['password'] or generate_password()
+        try:
+            usernames = provision_users(options['users'], password)
+            self.stdout.write(f'Provisioned {options["users"]} Teacher and Student users')
+            try:
+                ctx.obtain_tokens(usernames, password)
+            except LoadTestError as e:
+                raise CommandError(str(e))
+
+            self.stdout.write(
+                f'Running {options["concurrency"]} clients for {options["duration"]}s against {options["base_url"]}...'
+            )
+            samples, elapsed = run_load(
+                ctx, mix, options['concurrency'], options['duration'], options['requests'],
+            )
+        finally:
+            if options['keep_users']:
+                self.stdout.write(f'Kept the {USERNAME_PREFIX}_* users')
+            else:
+                remove_users()
+
+        summary = summarize(samples, elapsed)
+        self.stdout.write(f'\n{"endpoint":<16}{"reqs":>8}{"err%":>8}{"rps":>9}{"p50":>9}{"p95":>9}{"p99":>9}')
+        for name, stats in summary.items():
+            self.stdout.write(
+                f'{name:<16}{stats["requests"]:>8}{stats["error_rate"] * 100:>7.1f}%'
+                f'{stats["throughput_rps"]:>9.1f}{stats["p50_ms"]:>8.1f}ms'
+                f'{stats["p95_ms"]:>7.1f}ms{stats["p99_ms"]:>7.1f}ms'
+            )
+
+        if options['output']:
+            report = {
+                'base_url': options['base_url'],
+                'mix': mix,
+                'concurrency': options['concurrency'],
+                'elapsed_seconds': elapsed,
+                'endpoints': summary,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Summary written to {options["output"]}'))
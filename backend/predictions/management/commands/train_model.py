@@ -0,0 +1,60 @@
+"""
+Management command to retrain the dropout model from live and archived students.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from predictions.training import (
+    TRAINING_CHUNK_SIZE,
+    TrainingError,
+    activate_version,
+    save_artifacts,
+    train_model,
+)
+
+
+class Command(BaseCommand):
+    help = 'Trains a new model version from students with a recorded outcome, streaming rows in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--epochs', type=int, default=5, help='Passes over the training rows')
+        parser.add_argument('--chunk-size', type=int, default=TRAINING_CHUNK_SIZE,
+                            help='Rows read and fitted at a time')
+        parser.add_argument('--alpha', type=float, default=1e-4, help='L2 regularisation strength')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--jobs', type=int, default=-1, help='Cores to use (-1 for all)')
+        parser.add_argument('--activate', action='store_true',
+                            help='Install the new version as the model served by the API')
+
+    def handle(self, *args, **options):
+        if options['epochs'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--epochs and --chunk-size must be at least 1')
+
+        try:
+            model, scaler, label_encoder, metadata = train_model(
+                epochs=options['epochs'],
+                chunk_size=options['chunk_size'],
+                alpha=options['alpha'],
+                seed=options['seed'],
+                n_jobs=options['jobs'],
+                log=self.stdout.write,
+            )
+        except TrainingError as e:
+            raise CommandError(str(e))
+
+        version_dir = save_artifacts(model, scaler, label_encoder, metadata)
+        self.stdout.write(self.style.SUCCESS(f'Saved model version {version_dir.name} to {version_dir}'))
+        self.stdout.write(
+            f"Trained on {metadata['train_rows']} rows in {metadata['wall_seconds']:.1f}s "
+            f"({metadata['fit_rows_per_sec']:.0f} rows/s fitting)"
+        )
+        if metadata['validation_accuracy'] is not None:
+            self.stdout.write(
+                f"Validation accuracy: {metadata['validation_accuracy']:.3f} "
+                f"on {metadata['validation_rows']} rows"
+            )
+
+        if options['activate']:
+            backup_dir = activate_version(version_dir)
+            if backup_dir is not None:
+                self.stdout.write(f'Previous model saved to {backup_dir}')
+            self.stdout.write(self.style.SUCCESS('Activated; restart the API processes to load it'))
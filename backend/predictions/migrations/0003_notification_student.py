@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0002_notification_supportticket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='student',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='predictions.student'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0004_notification_user_read_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-last_dropout_probability', '-id'], name='student_risk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['course', '-last_dropout_probability', '-id'], name='student_course_risk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['user', '-last_dropout_probability', '-id'], name='student_user_risk_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0005_student_risk_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='outcome',
+            field=models.CharField(blank=True, choices=[('Dropout', 'Dropout'), ('Enrolled', 'Enrolled'), ('Graduate', 'Graduate')], max_length=20, null=True),
+        ),
+    ]
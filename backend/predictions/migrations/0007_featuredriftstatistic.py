@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0006_student_outcome'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeatureDriftStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scaler_fingerprint', models.CharField(max_length=40)),
+                ('feature_index', models.PositiveSmallIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('mean', models.FloatField(default=0)),
+                ('m2', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scaler_fingerprint', 'feature_index'), name='unique_drift_feature')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:00
+# The RunPython steps that backfill and de-duplicate content_hash were written by hand.
+
+import hashlib
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+# Frozen copies of STUDENT_FEATURE_FIELDS and compute_content_hash as of this migration
+FEATURE_FIELDS = [
+    'marital_status', 'application_mode', 'application_order', 'course',
+    'daytime_evening_attendance', 'previous_qualification', 'nationality', 'gender',
+    'age_at_enrollment', 'international', 'displaced', 'educational_special_needs',
+    'mothers_qualification', 'fathers_qualification', 'mothers_occupation', 'fathers_occupation',
+    'scholarship_holder', 'debtor', 'tuition_fees_up_to_date', 'admission_grade',
+    'curricular_units_1st_sem_credited', 'curricular_units_1st_sem_enrolled',
+    'curricular_units_1st_sem_evaluations', 'curricular_units_1st_sem_approved',
+    'curricular_units_1st_sem_grade', 'curricular_units_1st_sem_without_evaluations',
+    'curricular_units_2nd_sem_credited', 'curricular_units_2nd_sem_enrolled',
+    'curricular_units_2nd_sem_evaluations', 'curricular_units_2nd_sem_approved',
+    'curricular_units_2nd_sem_grade', 'curricular_units_2nd_sem_without_evaluations',
+    'unemployment_rate', 'inflation_rate', 'gdp',
+]
+
+BATCH_SIZE = 2000
+
+
+def content_hash(values, user_id):
+    normalized = '|'.join(format(float(value), '.12g') for value in values)
+    return hashlib.sha256(f'{user_id or ""}|{normalized}'.encode()).hexdigest()
+
+
+def backfill_content_hash(apps, schema_editor):
+    Student = apps.get_model('predictions', 'Student')
+    last_id = 0
+    while True:
+        students = list(
+            Student.objects.filter(pk__gt=last_id).order_by('pk')
+            .only('pk', 'user_id', *FEATURE_FIELDS)[:BATCH_SIZE]
+        )
+        if not students:
+            return
+        for student in students:
+            student.content_hash = content_hash(
+                [getattr(student, field) for field in FEATURE_FIELDS], student.user_id
+            )
+        Student.objects.bulk_update(students, ['content_hash'])
+        last_id = students[-1].pk
+
+
+def clear_duplicate_hashes(apps, schema_editor):
+    # Identical rows stored before uploads were deduplicated keep their data; only
+    # the oldest one keeps the hash, so the unique constraint can be added
+    Student = apps.get_model('predictions', 'Student')
+    duplicates = (
+        Student.objects.exclude(content_hash=None).values('content_hash')
+        .annotate(n=Count('id'), first_id=Min('id')).filter(n__gt=1)
+    )
+    for row in duplicates.iterator():
+        Student.objects.filter(content_hash=row['content_hash']).exclude(pk=row['first_id']).update(content_hash=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0008_predictionlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+        migrations.RunPython(clear_duplicate_hashes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='student',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
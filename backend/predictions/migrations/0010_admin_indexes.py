@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0009_student_content_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='predictionlog',
+            name='source',
+            field=models.CharField(choices=[('predict', 'Predict'), ('upload', 'Upload'), ('rescore', 'Re-score')], default='predict', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-created_at'], name='student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['last_prediction', '-id'], name='student_prediction_idx'),
+        ),
+    ]
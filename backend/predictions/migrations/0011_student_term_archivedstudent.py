@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0010_admin_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedStudent',
+            fields=[
+                ('marital_status', models.IntegerField(verbose_name='Marital Status')),
+                ('application_mode', models.IntegerField(verbose_name='Application Mode')),
+                ('application_order', models.IntegerField(verbose_name='Application Order')),
+                ('course', models.IntegerField(verbose_name='Course')),
+                ('daytime_evening_attendance', models.IntegerField(verbose_name='Daytime/Evening Attendance')),
+                ('previous_qualification', models.IntegerField(verbose_name='Previous Qualification')),
+                ('nationality', models.IntegerField(verbose_name='Nationality')),
+                ('gender', models.IntegerField(verbose_name='Gender')),
+                ('age_at_enrollment', models.IntegerField(verbose_name='Age at Enrollment')),
+                ('international', models.IntegerField(verbose_name='International')),
+                ('displaced', models.IntegerField(verbose_name='Displaced')),
+                ('educational_special_needs', models.IntegerField(verbose_name='Educational Special Needs')),
+                ('mothers_qualification', models.IntegerField(verbose_name="Mother's Qualification")),
+                ('fathers_qualification', models.IntegerField(verbose_name="Father's Qualification")),
+                ('mothers_occupation', models.IntegerField(verbose_name="Mother's Occupation")),
+                ('fathers_occupation', models.IntegerField(verbose_name="Father's Occupation")),
+                ('scholarship_holder', models.IntegerField(verbose_name='Scholarship Holder')),
+                ('debtor', models.IntegerField(verbose_name='Debtor')),
+                ('tuition_fees_up_to_date', models.IntegerField(verbose_name='Tuition Fees Up to Date')),
+                ('admission_grade', models.FloatField(verbose_name='Admission Grade')),
+                ('curricular_units_1st_sem_credited', models.IntegerField(verbose_name='1st Sem Units Credited')),
+                ('curricular_units_1st_sem_enrolled', models.IntegerField(verbose_name='1st Sem Units Enrolled')),
+                ('curricular_units_1st_sem_evaluations', models.IntegerField(verbose_name='1st Sem Units Evaluations')),
+                ('curricular_units_1st_sem_approved', models.IntegerField(verbose_name='1st Sem Units Approved')),
+                ('curricular_units_1st_sem_grade', models.FloatField(verbose_name='1st Sem Grade')),
+                ('curricular_units_1st_sem_without_evaluations', models.IntegerField(verbose_name='1st Sem Units Without Evaluations')),
+                ('curricular_units_2nd_sem_credited', models.IntegerField(verbose_name='2nd Sem Units Credited')),
+                ('curricular_units_2nd_sem_enrolled', models.IntegerField(verbose_name='2nd Sem Units Enrolled')),
+                ('curricular_units_2nd_sem_evaluations', models.IntegerField(verbose_name='2nd Sem Units Evaluations')),
+                ('curricular_units_2nd_sem_approved', models.IntegerField(verbose_name='2nd Sem Units Approved')),
+                ('curricular_units_2nd_sem_grade', models.FloatField(verbose_name='2nd Sem Grade')),
+                ('curricular_units_2nd_sem_without_evaluations', models.IntegerField(verbose_name='2nd Sem Units Without Evaluations')),
+                ('unemployment_rate', models.FloatField(verbose_name='Unemployment Rate')),
+                ('inflation_rate', models.FloatField(verbose_name='Inflation Rate')),
+                ('gdp', models.FloatField(verbose_name='GDP')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('term', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('last_prediction', models.CharField(blank=True, max_length=20, null=True)),
+                ('last_dropout_probability', models.FloatField(blank=True, null=True)),
+                ('outcome', models.CharField(blank=True, choices=[('Dropout', 'Dropout'), ('Enrolled', 'Enrolled'), ('Graduate', 'Graduate')], max_length=20, null=True)),
+                ('content_hash', models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='term',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_records', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['term', 'id'], name='student_term_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedstudent',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_records', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedstudent',
+            index=models.Index(fields=['term', '-id'], name='archived_term_idx'),
+        ),
+    ]
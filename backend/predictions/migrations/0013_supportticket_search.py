@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:00
+# The RunSQL steps that maintain the full-text index were written by hand.
+
+from django.db import migrations, models
+
+# Frozen copy of the search schema as of this migration, see predictions/search.py
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE predictions_supportticket_fts USING fts5(
+        subject, message,
+        content='predictions_supportticket', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER predictions_supportticket_fts_ai AFTER INSERT ON predictions_supportticket BEGIN
+        INSERT INTO predictions_supportticket_fts (rowid, subject, message) VALUES (new.id, new.subject, new.message);
+    END
+    """,
+    """
+    CREATE TRIGGER predictions_supportticket_fts_ad AFTER DELETE ON predictions_supportticket BEGIN
+        INSERT INTO predictions_supportticket_fts (predictions_supportticket_fts, rowid, subject, message)
+        VALUES ('delete', old.id, old.subject, old.message);
+    END
+    """,
+    """
+    CREATE TRIGGER predictions_supportticket_fts_au AFTER UPDATE OF subject, message ON predictions_supportticket BEGIN
+        INSERT INTO predictions_supportticket_fts (predictions_supportticket_fts, rowid, subject, message)
+        VALUES ('delete', old.id, old.subject, old.message);
+        INSERT INTO predictions_supportticket_fts (rowid, subject, message) VALUES (new.id, new.subject, new.message);
+    END
+    """,
+    "INSERT INTO predictions_supportticket_fts (predictions_supportticket_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS predictions_supportticket_fts_ai',
+    'DROP TRIGGER IF EXISTS predictions_supportticket_fts_ad',
+    'DROP TRIGGER IF EXISTS predictions_supportticket_fts_au',
+    'DROP TABLE IF EXISTS predictions_supportticket_fts',
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE predictions_supportticket ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(subject, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(message, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX predictions_supportticket_search_idx ON predictions_supportticket USING gin (search_vector)',
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS predictions_supportticket_search_idx',
+    'ALTER TABLE predictions_supportticket DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0012_archived_student_links'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='supportticket',
+            options={'ordering': ['-created_at']},
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['user', '-created_at'], name='ticket_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportticket',
+            index=models.Index(fields=['status', '-created_at'], name='ticket_status_created_idx'),
+        ),
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run_for_vendor({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
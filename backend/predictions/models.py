@@ -1,13 +1,124 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
 
-class Student(models.Model):
-    """Model representing a student with all 36 features for dropout prediction."""
+# Feature fields of the Student model, in declaration order
+STUDENT_FEATURE_FIELDS = [
+    'marital_status',
+    'application_mode',
+    'application_order',
+    'course',
+    'daytime_evening_attendance',
+    'previous_qualification',
+    'nationality',
+    'gender',
+    'age_at_enrollment',
+    'international',
+    'displaced',
+    'educational_special_needs',
+    'mothers_qualification',
+    'fathers_qualification',
+    'mothers_occupation',
+    'fathers_occupation',
+    'scholarship_holder',
+    'debtor',
+    'tuition_fees_up_to_date',
+    'admission_grade',
+    'curricular_units_1st_sem_credited',
+    'curricular_units_1st_sem_enrolled',
+    'curricular_units_1st_sem_evaluations',
+    'curricular_units_1st_sem_approved',
+    'curricular_units_1st_sem_grade',
+    'curricular_units_1st_sem_without_evaluations',
+    'curricular_units_2nd_sem_credited',
+    'curricular_units_2nd_sem_enrolled',
+    'curricular_units_2nd_sem_evaluations',
+    'curricular_units_2nd_sem_approved',
+    'curricular_units_2nd_sem_grade',
+    'curricular_units_2nd_sem_without_evaluations',
+    'unemployment_rate',
+    'inflation_rate',
+    'gdp',
+]
+
+
+# Integer columns hold 32-bit values on every supported database
+INTEGER_FIELD_MIN, INTEGER_FIELD_MAX = -2 ** 31, 2 ** 31 - 1
+
+_CODE = (0, INTEGER_FIELD_MAX)
+_FLAG = (0, 1)
+_UNITS = (0, 100)
+_GRADE = (0.0, 20.0)
+
+# Accepted (min, max) of each feature field, checked by the input serializers
+# and by columnar uploads. Flags are 0/1 and grades use the 0-20 scale of the
+# source dataset. Coded fields only exclude negative codes, so codes missing
+# from the dataset are still accepted.
+FEATURE_RANGES = {
+    'marital_status': _CODE,
+    'application_mode': _CODE,
+    'application_order': (0, 9),
+    'course': _CODE,
+    'daytime_evening_attendance': _FLAG,
+    'previous_qualification': _CODE,
+    'nationality': _CODE,
+    'gender': _FLAG,
+    'age_at_enrollment': (14, 100),
+    'international': _FLAG,
+    'displaced': _FLAG,
+    'educational_special_needs': _FLAG,
+    'mothers_qualification': _CODE,
+    'fathers_qualification': _CODE,
+    'mothers_occupation': _CODE,
+    'fathers_occupation': _CODE,
+    'scholarship_holder': _FLAG,
+    'debtor': _FLAG,
+    'tuition_fees_up_to_date': _FLAG,
+    'admission_grade': (0.0, 200.0),
+    'curricular_units_1st_sem_credited': _UNITS,
+    'curricular_units_1st_sem_enrolled': _UNITS,
+    'curricular_units_1st_sem_evaluations': _UNITS,
+    'curricular_units_1st_sem_approved': _UNITS,
+    'curricular_units_1st_sem_grade': _GRADE,
+    'curricular_units_1st_sem_without_evaluations': _UNITS,
+    'curricular_units_2nd_sem_credited': _UNITS,
+    'curricular_units_2nd_sem_enrolled': _UNITS,
+    'curricular_units_2nd_sem_evaluations': _UNITS,
+    'curricular_units_2nd_sem_approved': _UNITS,
+    'curricular_units_2nd_sem_grade': _GRADE,
+    'curricular_units_2nd_sem_without_evaluations': _UNITS,
+    # Percentages
+    'unemployment_rate': (0.0, 100.0),
+    'inflation_rate': (-100.0, 100.0),
+    'gdp': (-100.0, 100.0),
+}
+
+
+def compute_content_hash(values, user_id):
+    """
+    SHA-256 over a student's feature values (in STUDENT_FEATURE_FIELDS order)
+    and owner. Values are normalised through float, so 1, 1.0 and "1" hash alike.
+    """
+    normalized = '|'.join(format(float(value), '.12g') for value in values)
+    return hashlib.sha256(f'{user_id or ""}|{normalized}'.encode()).hexdigest()
+
+
+OUTCOME_CHOICES = [
+    ('Dropout', 'Dropout'),
+    ('Enrolled', 'Enrolled'),
+    ('Graduate', 'Graduate'),
+]
+
+
+class StudentRecord(models.Model):
+    """Owner and the 36 prediction features, shared by live and archived student records."""
     
     # Foreign key to Django's built-in User model (optional, for linking student data to user accounts)
-    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='student_records')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='%(class)s_records')
     
     # Demographic Features
     marital_status = models.IntegerField(verbose_name="Marital Status")
@@ -56,21 +167,8 @@ class Student(models.Model):
     inflation_rate = models.FloatField(verbose_name="Inflation Rate")
     gdp = models.FloatField(verbose_name="GDP")
     
-    # Metadata
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-    
-    # Prediction result (optional, to store latest prediction)
-    last_prediction = models.CharField(max_length=20, blank=True, null=True)
-    last_dropout_probability = models.FloatField(blank=True, null=True)
-    
     class Meta:
-        ordering = ['-created_at']
-        verbose_name = "Student Record"
-        verbose_name_plural = "Student Records"
-    
-    def __str__(self):
-        return f"Student {self.id} - Course {self.course}"
+        abstract = True
     
     def get_feature_dict(self):
         """Returns a dictionary of all 36 features for prediction."""
@@ -113,6 +211,91 @@ class Student(models.Model):
         }
 
 
+
+class Student(StudentRecord):
+    """Model representing a student with all 36 features for dropout prediction."""
+    
+    # Metadata
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    # Prediction result (optional, to store latest prediction)
+    last_prediction = models.CharField(max_length=20, blank=True, null=True)
+    last_dropout_probability = models.FloatField(blank=True, null=True)
+    
+    # Identifies rows with the same features and owner, so re-uploads can be skipped.
+    # Unique, so two uploads of one file running at once cannot both insert it
+    content_hash = models.CharField(max_length=64, blank=True, null=True, editable=False, unique=True)
+    
+    # Actual final status, recorded once known
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, blank=True, null=True)
+    
+    # Academic term or cohort, e.g. "2025-S1"; closed terms are moved to ArchivedStudent
+    term = models.CharField(max_length=20, blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Top-K at-risk rankings: overall, per course and per owner
+            models.Index(fields=['-last_dropout_probability', '-id'], name='student_risk_idx'),
+            models.Index(fields=['course', '-last_dropout_probability', '-id'], name='student_course_risk_idx'),
+            models.Index(fields=['user', '-last_dropout_probability', '-id'], name='student_user_risk_idx'),
+            # Default ordering of the API list, and the admin's prediction filter
+            models.Index(fields=['-created_at'], name='student_created_idx'),
+            models.Index(fields=['last_prediction', '-id'], name='student_prediction_idx'),
+            # Term filters and chunked archival
+            models.Index(fields=['term', 'id'], name='student_term_idx'),
+        ]
+        verbose_name = "Student Record"
+        verbose_name_plural = "Student Records"
+    
+    def __str__(self):
+        return f"Student {self.id} - Course {self.course}"
+    
+    def get_content_hash(self):
+        return compute_content_hash([getattr(self, field) for field in STUDENT_FEATURE_FIELDS], self.user_id)
+    
+    def clean(self):
+        super().clean()
+        if Student.objects.filter(content_hash=self.get_content_hash()).exclude(pk=self.pk).exists():
+            raise ValidationError('An identical student record already exists for this owner.')
+    
+    def save(self, *args, **kwargs):
+        self.content_hash = self.get_content_hash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content_hash' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['content_hash']
+        super().save(*args, **kwargs)
+
+
+
+class ArchivedStudent(StudentRecord):
+    """
+    A Student moved out of the hot table by ``archive_students`` once its
+    term closed. Keeps the original id and timestamps.
+    """
+    
+    id = models.BigIntegerField(primary_key=True)
+    term = models.CharField(max_length=20)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    last_prediction = models.CharField(max_length=20, blank=True, null=True)
+    last_dropout_probability = models.FloatField(blank=True, null=True)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, blank=True, null=True)
+    # Carried over from Student, so uploads also skip rows that were archived
+    content_hash = models.CharField(max_length=64, blank=True, null=True, editable=False, db_index=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['term', '-id'], name='archived_term_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Archived student {self.id} - {self.term}"
+
+
 class SupportTicket(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tickets')
     subject = models.CharField(max_length=200)
@@ -126,12 +309,26 @@ class SupportTicket(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        ordering = ['-created_at']
+        # Full-text search uses a separate index, see search.py
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='ticket_user_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='ticket_status_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.subject} - {self.status}"
 
 
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    # Student the alert is about, used to avoid duplicate high-risk alerts
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications')
+    # Takes over from ``student`` when the student is archived
+    archived_student = models.ForeignKey(
+        ArchivedStudent, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications'
+    )
     title = models.CharField(max_length=200)
     message = models.TextField()
     is_read = models.BooleanField(default=False)
@@ -145,6 +342,63 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read'], name='notification_user_read_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class FeatureDriftStatistic(models.Model):
+    """Running statistics of one model feature in standardised units, see drift.py."""
+    # Scaler the statistics were computed with; a retrained model starts afresh
+    scaler_fingerprint = models.CharField(max_length=40)
+    feature_index = models.PositiveSmallIntegerField()
+    count = models.BigIntegerField(default=0)
+    mean = models.FloatField(default=0)
+    # Sum of squared deviations from the mean (Welford's M2)
+    m2 = models.FloatField(default=0)
+    histogram = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scaler_fingerprint', 'feature_index'], name='unique_drift_feature'),
+        ]
+
+    def __str__(self):
+        return f"Feature {self.feature_index} ({self.count} rows)"
+
+
+class PredictionLog(models.Model):
+    """One scored prediction, kept as an append-only audit trail. Written in batches by history.py."""
+    student = models.ForeignKey(Student, on_delete=models.SET_NULL, null=True, blank=True, related_name='prediction_logs')
+    # Takes over from ``student`` when the student is archived
+    archived_student = models.ForeignKey(
+        ArchivedStudent, on_delete=models.SET_NULL, null=True, blank=True, related_name='prediction_logs'
+    )
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='prediction_logs')
+    source = models.CharField(max_length=20, default='predict', choices=[
+        ('predict', 'Predict'),
+        ('upload', 'Upload'),
+        ('rescore', 'Re-score'),
+    ])
+    model_version = models.CharField(max_length=64)
+    predicted_class = models.CharField(max_length=20)
+    dropout_probability = models.FloatField()
+    probabilities = models.JSONField(default=dict)
+    # Model scoring time; rows of a batch record their share of the batch
+    latency_ms = models.FloatField()
+    # Set when the prediction is made, not when the buffered row is written
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['student', '-created_at'], name='predictionlog_student_idx'),
+            models.Index(fields=['-created_at'], name='predictionlog_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.predicted_class} ({self.dropout_probability:.2f}) at {self.created_at}"
@@ -0,0 +1,158 @@
+"""
+Notification Services
+
+High-risk fan-out: after students are scored, every high-risk student
+produces a warning notification for its owning user and for all Teacher and
+Admin accounts. Recipients are resolved once per batch, existing unread
+alerts are looked up with one query per chunk, and new rows are written with
+bulk_create.
+
+Unread counters: each user's unread count is kept in the cache and adjusted
+on every change, so reading it costs no database query. A missing counter is
+recomputed from an indexed COUNT.
+"""
+
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .events import publish_notifications
+from .models import Notification, Student
+from .tasks import submit
+from .utils import HIGH_RISK_THRESHOLD
+
+FANOUT_CHUNK_SIZE = 500
+
+STAFF_GROUPS = ['Teacher', 'Admin']
+
+UNREAD_COUNT_KEY = 'notifications:unread:{user_id}'
+# Bounds how long a change made outside these helpers (e.g. in the admin) can go unnoticed
+UNREAD_COUNT_TIMEOUT = 10 * 60
+
+
+def get_unread_count(user_id):
+    """Return the user's unread notification count, recomputing it if it is not cached."""
+    key = UNREAD_COUNT_KEY.format(user_id=user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.add(key, count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def adjust_unread_count(user_id, delta):
+    """
+    Add ``delta`` to a cached unread counter.
+
+    A counter that is not cached is left alone; it will be recomputed on
+    the next read.
+    """
+    if not delta:
+        return
+    try:
+        cache.incr(UNREAD_COUNT_KEY.format(user_id=user_id), delta)
+    except ValueError:
+        pass
+
+
+def mark_read(queryset):
+    """
+    Mark the unread notifications in ``queryset`` as read and update the counters.
+
+    Returns:
+        Number of notifications changed.
+    """
+    unread = queryset.filter(is_read=False)
+    per_user = dict(unread.order_by().values('user_id').annotate(n=Count('id')).values_list('user_id', 'n'))
+    updated = unread.update(is_read=True)
+    if updated == sum(per_user.values()):
+        for user_id, count in per_user.items():
+            adjust_unread_count(user_id, -count)
+    else:
+        # Rows changed between the two queries; fall back to recomputing
+        for user_id in per_user:
+            cache.delete(UNREAD_COUNT_KEY.format(user_id=user_id))
+    return updated
+
+
+def get_staff_recipient_ids():
+    """IDs of active users who receive every high-risk alert."""
+    return set(
+        User.objects.filter(Q(groups__name__in=STAFF_GROUPS) | Q(is_superuser=True), is_active=True)
+        .values_list('id', flat=True)
+        .distinct()
+    )
+
+
+def build_high_risk_notification(user_id, student):
+    return Notification(
+        user_id=user_id,
+        student_id=student['id'],
+        title=f"High dropout risk: Student {student['id']}",
+        message=(
+            f"Student {student['id']} (course {student['course']}) has a predicted dropout "
+            f"probability of {student['last_dropout_probability']:.0%}. Intervention is recommended."
+        ),
+        type='warning',
+    )
+
+
+def fan_out_high_risk(student_ids, chunk_size=FANOUT_CHUNK_SIZE):
+    """
+    Create high-risk notifications for the given students.
+
+    Students that are no longer above the threshold are ignored, and no
+    recipient gets a second unread alert for the same student.
+
+    Returns:
+        Number of notifications created.
+    """
+    staff_ids = get_staff_recipient_ids()
+    student_ids = list(student_ids)
+    created = 0
+
+    for start in range(0, len(student_ids), chunk_size):
+        students = list(
+            Student.objects.filter(
+                pk__in=student_ids[start:start + chunk_size],
+                last_dropout_probability__gt=HIGH_RISK_THRESHOLD,
+            ).values('id', 'user_id', 'course', 'last_dropout_probability')
+        )
+        if not students:
+            continue
+
+        existing = set(
+            Notification.objects.filter(
+                student_id__in=[student['id'] for student in students],
+                is_read=False,
+            ).values_list('user_id', 'student_id')
+        )
+
+        notifications = []
+        for student in students:
+            recipients = set(staff_ids)
+            if student['user_id']:
+                recipients.add(student['user_id'])
+            notifications.extend(
+                build_high_risk_notification(user_id, student)
+                for user_id in recipients
+                if (user_id, student['id']) not in existing
+            )
+
+        Notification.objects.bulk_create(notifications, batch_size=chunk_size)
+        # bulk_create sends no post_save signals, so update the counters here
+        for user_id, count in Counter(n.user_id for n in notifications).items():
+            adjust_unread_count(user_id, count)
+        publish_notifications(notifications)
+        created += len(notifications)
+
+    return created
+
+
+def schedule_high_risk_fan_out(student_ids):
+    """Queue ``fan_out_high_risk`` to run in the background after the current transaction."""
+    student_ids = list(student_ids)
+    if student_ids:
+        submit(fan_out_high_risk, student_ids)
@@ -1,5 +1,28 @@
 from rest_framework import permissions
 
+STAFF_ROLES = {'Admin', 'Teacher', 'Analyst'}
+
+
+def get_group_names(user):
+    """
+    The names of the user's groups.
+
+    Loaded with one query and kept on the user object, so the permission
+    classes, throttles and querysets of a request share it instead of each
+    running their own ``groups.filter(...).exists()``.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+    names = getattr(user, '_group_names', None)
+    if names is None:
+        names = user._group_names = frozenset(user.groups.values_list('name', flat=True))
+    return names
+
+
+def has_staff_role(user):
+    """Whether ``user`` is a superuser or a Teacher, Analyst or Admin."""
+    return bool(user and user.is_authenticated and (user.is_superuser or get_group_names(user) & STAFF_ROLES))
+
 
 class IsAdminUser(permissions.BasePermission):
     """
@@ -9,7 +32,7 @@ class IsAdminUser(permissions.BasePermission):
         return (
             request.user and
             request.user.is_authenticated and
-            (request.user.groups.filter(name='Admin').exists() or request.user.is_superuser)
+            (request.user.is_superuser or 'Admin' in get_group_names(request.user))
         )
 
 
@@ -18,13 +41,7 @@ class IsTeacherOrAdmin(permissions.BasePermission):
     Custom permission to only allow teachers, analysts, or admins to access view.
     """
     def has_permission(self, request, view):
-        if not request.user or not request.user.is_authenticated:
-            return False
-        
-        return (
-            request.user.is_superuser or
-            request.user.groups.filter(name__in=['Admin', 'Teacher', 'Analyst']).exists()
-        )
+        return has_staff_role(request.user)
 
 
 class IsOwnerOrTeacherOrAdmin(permissions.BasePermission):
@@ -42,7 +59,8 @@ class IsOwnerOrTeacherOrAdmin(permissions.BasePermission):
         if request.user.is_superuser:
             return True
             
-        if request.user.groups.filter(name__in=['Admin', 'Teacher', 'Analyst']).exists():
+        if get_group_names(request.user) & STAFF_ROLES:
             return True
             
-        return obj.user == request.user
+        # Compare ids: obj.user would load the owner just to compare it
+        return obj.user_id == request.user.pk
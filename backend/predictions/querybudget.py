@@ -0,0 +1,248 @@
+"""
+Query Budgets
+
+``QueryBudgetMiddleware`` counts the SQL queries a request runs and the time
+spent in them, using Django's ``connection.execute_wrapper``. Views declare
+how many queries they may run with a ``query_budget`` attribute (an int, or
+a dict keyed by HTTP method); function views use the ``query_budget``
+decorator. A request over budget is logged, and so is any SQL statement
+repeated QUERY_REPEAT_THRESHOLD times or more in one request, the usual
+sign of an N+1 loop. Statements are compared with their parameters left out
+and ``IN (%s, %s, ...)`` lists collapsed, so the same query with different
+ids counts as a repeat. Views that repeat a statement once per chunk of
+input set ``query_repeat_threshold`` instead.
+
+Budgets count every query of the request, token authentication included.
+
+The middleware runs natively under ASGI too. Database connections belong to
+a thread, and async views reach the database through ``sync_to_async``,
+which runs every call of one request in the same worker thread; the
+recorder is installed on that thread's connections for the request. Event
+streams (async streaming responses) stay open indefinitely, so they are
+checked when the response starts: the queries that open the stream count,
+the ones made while it is open do not.
+
+QUERY_BUDGET_MODE chooses what happens on a violation: 'log' (default),
+'raise' (the default under ``manage.py test``, so a regression fails the
+test that caused it) or 'off'. With QUERY_TIMING_HEADER set, non-streaming responses
+carry a ``Server-Timing: db;dur=...;desc="N queries"`` header.
+
+``QueryCountAssertions`` gives test cases ``assertMaxQueries``.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Placeholder lists of any length compare equal
+IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)*\s*%s\s*\)')
+LOGGED_SQL_LENGTH = 300
+
+NOT_SET = object()
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in 'raise' mode when a request breaks its budget or repeats a query."""
+
+
+def normalize_sql(sql):
+    return IN_LIST_RE.sub('(...)', sql)
+
+
+class QueryRecorder:
+    """Execute wrapper that counts and times queries and tallies statement patterns."""
+
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.duration = 0.0
+        self.patterns = Counter()
+        self.queries = [] if keep_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.patterns[normalize_sql(sql)] += 1
+            if self.queries is not None:
+                self.queries.append(sql)
+
+    def repeated(self, threshold):
+        """(pattern, count) pairs run at least ``threshold`` times, most frequent first."""
+        return [(pattern, n) for pattern, n in self.patterns.most_common() if n >= threshold]
+
+    @contextmanager
+    def installed(self):
+        """Record the queries run on every database connection of this thread during the block."""
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+
+def query_budget(budget, repeat_threshold=NOT_SET):
+    """
+    Declare the query budget of a function view; class views set
+    ``query_budget`` and ``query_repeat_threshold`` attributes instead.
+    """
+    def decorator(view_func):
+        view_func.query_budget = budget
+        if repeat_threshold is not NOT_SET:
+            view_func.query_repeat_threshold = repeat_threshold
+        return view_func
+    return decorator
+
+
+def _declarations(view_func):
+    """The function, then its class: as_view() sets view_class on Django and DRF views, cls on viewsets."""
+    return view_func, getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+
+
+def get_query_budget(view_func, method):
+    """The budget declared for ``view_func`` and ``method``, or None."""
+    budget = None
+    for source in _declarations(view_func):
+        budget = getattr(source, 'query_budget', None)
+        if budget is not None:
+            break
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget
+
+
+def get_repeat_threshold(view_func):
+    """
+    How often one statement may run before it is reported as an N+1 pattern.
+
+    Views that work in chunks, and therefore repeat a statement once per
+    chunk, can raise it with a ``query_repeat_threshold`` attribute, or
+    disable the check with None.
+    """
+    for source in _declarations(view_func):
+        if hasattr(source, 'query_repeat_threshold'):
+            return source.query_repeat_threshold
+    return getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+
+
+def find_violations(recorder, budget, repeat_threshold):
+    """Human-readable descriptions of everything wrong with the recorded queries."""
+    violations = []
+    if budget is not None and recorder.count > budget:
+        violations.append(f'{recorder.count} queries, budget {budget}')
+    if repeat_threshold is None:
+        return violations
+    for pattern, n in recorder.repeated(repeat_threshold):
+        violations.append(f'{n} repeats of: {pattern[:LOGGED_SQL_LENGTH]}')
+    return violations
+
+
+class QueryBudgetMiddleware:
+    """Count each request's queries and check them against the view's budget."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if getattr(settings, 'QUERY_BUDGET_MODE', 'log') == 'off':
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with recorder.installed():
+            response = self.get_response(request)
+        return self.finish(request, response, recorder)
+
+    async def __acall__(self, request):
+        if getattr(settings, 'QUERY_BUDGET_MODE', 'log') == 'off':
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        # Installed in the thread sync_to_async runs this request's queries in
+        installed = ExitStack()
+        await sync_to_async(installed.enter_context)(recorder.installed())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(installed.close)()
+        return self.finish(request, response, recorder)
+
+    def finish(self, request, response, recorder):
+        if response.streaming and not getattr(response, 'is_async', False):
+            # Streamed bodies query while they are sent; check once the stream is exhausted
+            response.streaming_content = self.record_stream(request, response.streaming_content, recorder)
+            return response
+        if response.streaming:
+            # Event streams stay open indefinitely; only the queries made before streaming count
+            self.check(request, recorder)
+            return response
+
+        self.check(request, recorder)
+        if getattr(settings, 'QUERY_TIMING_HEADER', settings.DEBUG):
+            response['Server-Timing'] = f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries"'
+        return response
+
+    def record_stream(self, request, content, recorder):
+        with recorder.installed():
+            yield from content
+        self.check(request, recorder)
+
+    def check(self, request, recorder):
+        match = request.resolver_match
+        if match:
+            budget = get_query_budget(match.func, request.method)
+            repeat_threshold = get_repeat_threshold(match.func)
+        else:
+            budget, repeat_threshold = None, getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+        session = getattr(request, 'session', None)
+        if budget is not None and session is not None and session.accessed:
+            # Budgets assume token authentication; a session login reads the session as well as the user
+            budget += 1
+        view_name = (match.view_name if match else None) or request.path
+        logger.debug('%s %s: %d queries in %.1f ms', request.method, view_name, recorder.count, recorder.duration * 1000)
+
+        violations = find_violations(recorder, budget, repeat_threshold)
+        if not violations:
+            return
+        message = f'{request.method} {view_name}: ' + '; '.join(violations)
+        if getattr(settings, 'QUERY_BUDGET_MODE', 'log') == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class QueryCountAssertions:
+    """TestCase mixin for query-count regression tests."""
+
+    @contextmanager
+    def assertMaxQueries(self, limit, repeat_threshold=None):
+        """
+        Fail if the block runs more than ``limit`` queries, or repeats one
+        statement ``repeat_threshold`` times (default QUERY_REPEAT_THRESHOLD).
+
+        Unlike ``assertNumQueries`` the count is an upper bound, so removing a
+        query does not break the test.
+        """
+        if repeat_threshold is None:
+            repeat_threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+        recorder = QueryRecorder(keep_sql=True)
+        with recorder.installed():
+            yield recorder
+        violations = find_violations(recorder, limit, repeat_threshold)
+        if violations:
+            queries = '\n'.join(f'{i}. {sql}' for i, sql in enumerate(recorder.queries, start=1))
+            self.fail('; '.join(violations) + f'\nQueries:\n{queries}')
@@ -0,0 +1,78 @@
+"""
+Bulk Re-scoring
+
+Recomputes the stored prediction of many students, for example after a new
+model is activated. Students are read in chunks, scored with one model call
+per chunk and written back with bulk_update, instead of one save() each.
+"""
+
+import time
+
+import numpy as np
+
+from .admission import BATCH, admit
+from .conditional import bump_data_version
+from .history import log_batch
+from .models import Student
+from .notifications import schedule_high_risk_fan_out
+from .tasks import submit
+from .utils import FEATURE_FIELDS, HIGH_RISK_THRESHOLD, build_feature_matrix, predict_feature_matrix
+
+RESCORE_CHUNK_SIZE = 2000
+
+
+def rescore_students(student_ids, chunk_size=RESCORE_CHUNK_SIZE):
+    """
+    Re-score the given students with the loaded model.
+
+    Returns:
+        Number of students updated.
+    """
+    fields = list(FEATURE_FIELDS.values())
+    student_ids = list(student_ids)
+    high_risk_ids = []
+    updated = 0
+
+    for start in range(0, len(student_ids), chunk_size):
+        rows = list(
+            Student.objects.filter(pk__in=student_ids[start:start + chunk_size])
+            .order_by()
+            .values_list('pk', *fields)
+        )
+        if not rows:
+            continue
+        values = np.array(rows, dtype=np.float64)
+        ids = values[:, 0].astype(np.int64).tolist()
+
+        # A background job: it waits for a batch slot rather than being rejected
+        with admit(BATCH, wait=False):
+            started = time.perf_counter()
+            # Stored students are not new traffic, so they stay out of drift monitoring
+            result = predict_feature_matrix(
+                build_feature_matrix({field: values[:, i + 1] for i, field in enumerate(fields)}),
+                monitor=False,
+            )
+            latency_ms = (time.perf_counter() - started) * 1000
+
+        students = [
+            Student(pk=student_id, last_prediction=predicted_class, last_dropout_probability=probability)
+            for student_id, predicted_class, probability in zip(
+                ids, result['predicted_class'].tolist(), result['dropout_probability'].tolist()
+            )
+        ]
+        Student.objects.bulk_update(students, ['last_prediction', 'last_dropout_probability'], batch_size=chunk_size)
+        log_batch(result, latency_ms, ids, source='rescore')
+        high_risk_ids.extend(s.pk for s in students if s.last_dropout_probability > HIGH_RISK_THRESHOLD)
+        updated += len(students)
+
+    if updated:
+        bump_data_version('students')
+    schedule_high_risk_fan_out(high_risk_ids)
+    return updated
+
+
+def schedule_rescore(student_ids):
+    """Queue ``rescore_students`` to run in the background after the current transaction."""
+    student_ids = list(student_ids)
+    if student_ids:
+        submit(rescore_students, student_ids)
@@ -0,0 +1,131 @@
+"""
+Support Ticket Search
+
+Full-text search over ticket subjects and messages, served from a real
+full-text index on both database profiles:
+
+* SQLite: an external-content FTS5 table, ``predictions_supportticket_fts``,
+  kept in sync by triggers on the ticket table, so bulk inserts, queryset
+  updates and cascaded deletes are covered as well as ``save()``. All words
+  of the query must match; results are ranked with bm25.
+* PostgreSQL: a stored generated ``tsvector`` column, ``search_vector``,
+  with a GIN index. The query is parsed with ``websearch_to_tsquery``, so
+  quoted phrases, ``or`` and ``-word`` work; results are ranked with
+  ``ts_rank_cd``.
+
+Both are created by migration 0013. Subjects weigh more than messages.
+SQLite drops a table's triggers when a migration rebuilds the table, so
+``ensure_search_index`` re-creates them after every ``migrate`` and
+rebuilds the index if they were missing.
+"""
+
+import logging
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+TICKET_TABLE = 'predictions_supportticket'
+FTS_TABLE = 'predictions_supportticket_fts'
+
+# bm25 weights of the subject and message columns
+SUBJECT_WEIGHT = 4.0
+MESSAGE_WEIGHT = 1.0
+
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TICKET_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, subject, message) VALUES (new.id, new.subject, new.message);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TICKET_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, subject, message)
+            VALUES ('delete', old.id, old.subject, old.message);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF subject, message ON {TICKET_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, subject, message)
+            VALUES ('delete', old.id, old.subject, old.message);
+            INSERT INTO {FTS_TABLE} (rowid, subject, message) VALUES (new.id, new.subject, new.message);
+        END
+    """,
+}
+
+WORD_RE = re.compile(r'\w+')
+
+
+def fts5_query(text):
+    """
+    An FTS5 MATCH expression requiring every word of ``text``, or None if it
+    has no words. Words are quoted, so operators and punctuation in user
+    input cannot cause syntax errors.
+    """
+    words = WORD_RE.findall(text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def search_tickets(queryset, text):
+    """
+    Restrict ``queryset`` to tickets matching ``text``, best matches first.
+
+    Each ticket gets a ``search_rank`` annotation, higher meaning more
+    relevant.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        query = fts5_query(text)
+        if query is None:
+            return queryset.none()
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query])
+        # bm25 is negative, lower meaning better, and only defined inside a MATCH query
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, {SUBJECT_WEIGHT}, {MESSAGE_WEIGHT}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {TICKET_TABLE}.id',
+            [query], output_field=FloatField(),
+        )
+    elif vendor == 'postgresql':
+        matches = RawSQL(
+            f"SELECT id FROM {TICKET_TABLE} WHERE search_vector @@ websearch_to_tsquery('english', %s)", [text]
+        )
+        rank = RawSQL(
+            f"ts_rank_cd({TICKET_TABLE}.search_vector, websearch_to_tsquery('english', %s))",
+            [text], output_field=FloatField(),
+        )
+    else:
+        # No full-text index on other backends
+        return queryset.filter(Q(subject__icontains=text) | Q(message__icontains=text))
+    return (
+        queryset.filter(pk__in=matches)
+        .annotate(search_rank=rank)
+        .order_by('-search_rank', '-id')
+    )
+
+
+def ensure_search_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Re-create missing SQLite search triggers and rebuild the index if any
+    were missing. Connected to post_migrate; a no-op elsewhere, or before
+    migration 0013 has created the FTS table.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name = %s OR type = 'trigger'", [FTS_TABLE])
+        existing = {row[0] for row in cursor.fetchall()}
+        if FTS_TABLE not in existing:
+            return
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        if not missing:
+            return
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+    logger.info('Re-created support ticket search triggers %s and rebuilt the index', ', '.join(missing))
@@ -1,25 +1,88 @@
+import numpy as np
+from django.core.validators import MaxValueValidator, MinValueValidator
 from rest_framework import serializers
-from .models import Student
+from .models import ArchivedStudent, FEATURE_RANGES, STUDENT_FEATURE_FIELDS, Student, compute_content_hash
+from .permissions import has_staff_role
+from .utils import FEATURE_FIELDS
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class FeatureRangeMixin:
+    """Limit the writable Student feature fields to FEATURE_RANGES."""
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        for name, (min_value, max_value) in FEATURE_RANGES.items():
+            field = fields.get(name)
+            if field is not None and not field.read_only:
+                field.validators = [*field.validators, MinValueValidator(min_value), MaxValueValidator(max_value)]
+        return fields
+
+
+class StudentRecordMixin:
+    """
+    Checks shared by the serializers that write Student records.
+
+    The outcome label is what training learns from, so only staff may set
+    it. A record identical to another of the same owner is rejected, as
+    uploads skip such rows (see Student.content_hash).
+    """
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if 'outcome' in fields and not (request and has_staff_role(request.user)):
+            fields['outcome'].read_only = True
+        return fields
+    
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        instance = self.instance
+        owner_id = instance.user_id if instance is not None else self.context['request'].user.id
+        values = [attrs[field] if field in attrs else getattr(instance, field) for field in STUDENT_FEATURE_FIELDS]
+        duplicates = Student.objects.filter(content_hash=compute_content_hash(values, owner_id))
+        if instance is not None:
+            duplicates = duplicates.exclude(pk=instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError('An identical student record already exists.')
+        return attrs
+
+
+class StudentSerializer(StudentRecordMixin, FeatureRangeMixin, serializers.ModelSerializer):
     """Serializer for the Student model."""
     
     class Meta:
         model = Student
-        fields = '__all__'
+        exclude = ['content_hash']
         read_only_fields = ['id', 'created_at', 'updated_at', 'last_prediction', 'last_dropout_probability', 'user']
 
 
-class StudentCreateSerializer(serializers.ModelSerializer):
+class AtRiskStudentSerializer(serializers.ModelSerializer):
+    """Compact student summary for at-risk rankings."""
+    
+    class Meta:
+        model = Student
+        fields = ['id', 'user', 'course', 'term', 'last_prediction', 'last_dropout_probability', 'created_at']
+        read_only_fields = fields
+
+
+class ArchivedStudentSerializer(serializers.ModelSerializer):
+    """Read-only serializer for archived student records."""
+    
+    class Meta:
+        model = ArchivedStudent
+        exclude = ['content_hash']
+        read_only_fields = [field.name for field in ArchivedStudent._meta.fields if field.name != 'content_hash']
+
+
+class StudentCreateSerializer(StudentRecordMixin, FeatureRangeMixin, serializers.ModelSerializer):
     """Serializer for creating new student records."""
     
     class Meta:
         model = Student
-        exclude = ['user', 'created_at', 'updated_at', 'last_prediction', 'last_dropout_probability']
+        exclude = ['user', 'created_at', 'updated_at', 'last_prediction', 'last_dropout_probability', 'content_hash']
 
 
-class PredictionInputSerializer(serializers.Serializer):
+class PredictionInputSerializer(FeatureRangeMixin, serializers.Serializer):
     """Serializer for prediction input data."""
     
     # Demographic Features
@@ -72,9 +135,23 @@ class PredictionInputSerializer(serializers.Serializer):
     # Optional: save the record after prediction
     save_record = serializers.BooleanField(default=False, required=False)
     
+    # Optional: include the features contributing most to the prediction
+    explain = serializers.BooleanField(default=False, required=False)
+    
+    # Request options that are not Student model fields
+    option_fields = ('save_record', 'explain')
+    
+    def get_student_data(self):
+        """Validated data limited to Student model fields."""
+        return {k: v for k, v in self.validated_data.items() if k not in self.option_fields}
+    
     def to_model_format(self):
         """Convert serializer data to format expected by the ML model."""
-        data = self.validated_data
+        return self.to_model_format_from(self.validated_data)
+    
+    @staticmethod
+    def to_model_format_from(data):
+        """Convert validated prediction fields to the format expected by the ML model."""
         return {
             'Marital status': data['marital_status'],
             'Application mode': data['application_mode'],
@@ -124,3 +201,54 @@ class PredictionOutputSerializer(serializers.Serializer):
     high_risk = serializers.BooleanField()
     intervention_recommended = serializers.BooleanField()
     saved_record_id = serializers.IntegerField(allow_null=True, required=False)
+    explanation = serializers.DictField(required=False)
+
+
+# What-if limits: scenarios per request and values per axis
+MAX_WHATIF_SCENARIOS = 10000
+MAX_WHATIF_AXIS_VALUES = 500
+
+
+class WhatIfAxisSerializer(serializers.Serializer):
+    """One varied feature: explicit values, or a start/stop/step range (stop inclusive)."""
+    
+    feature = serializers.ChoiceField(choices=sorted(FEATURE_FIELDS.values()))
+    values = serializers.ListField(child=serializers.FloatField(), required=False, allow_empty=False)
+    start = serializers.FloatField(required=False)
+    stop = serializers.FloatField(required=False)
+    step = serializers.FloatField(required=False, default=1)
+    
+    def validate(self, attrs):
+        if 'values' not in attrs:
+            if 'start' not in attrs or 'stop' not in attrs:
+                raise serializers.ValidationError('Provide either values or start and stop.')
+            if attrs['step'] <= 0 or attrs['stop'] < attrs['start']:
+                raise serializers.ValidationError('start must not exceed stop and step must be positive.')
+            count = int(np.floor((attrs['stop'] - attrs['start']) / attrs['step'] + 1e-9)) + 1
+            if count > MAX_WHATIF_AXIS_VALUES:
+                raise serializers.ValidationError(f'At most {MAX_WHATIF_AXIS_VALUES} values per feature.')
+            attrs['values'] = (attrs['start'] + attrs['step'] * np.arange(count)).round(6).tolist()
+        elif len(attrs['values']) > MAX_WHATIF_AXIS_VALUES:
+            raise serializers.ValidationError(f'At most {MAX_WHATIF_AXIS_VALUES} values per feature.')
+        return attrs
+
+
+class WhatIfSerializer(serializers.Serializer):
+    """Serializer for what-if scenario sweeps over one or two features."""
+    
+    student_id = serializers.IntegerField(required=False)
+    student = PredictionInputSerializer(required=False)
+    vary = WhatIfAxisSerializer(many=True)
+    
+    def validate(self, attrs):
+        if ('student_id' in attrs) == ('student' in attrs):
+            raise serializers.ValidationError('Provide either student_id or student.')
+        
+        axes = attrs['vary']
+        if not 1 <= len(axes) <= 2:
+            raise serializers.ValidationError({'vary': 'Vary one or two features.'})
+        if len({axis['feature'] for axis in axes}) != len(axes):
+            raise serializers.ValidationError({'vary': 'Each feature can only be varied once.'})
+        if int(np.prod([len(axis['values']) for axis in axes])) > MAX_WHATIF_SCENARIOS:
+            raise serializers.ValidationError({'vary': f'At most {MAX_WHATIF_SCENARIOS} scenarios per request.'})
+        return attrs
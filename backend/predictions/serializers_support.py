@@ -10,5 +10,5 @@ class SupportTicketSerializer(serializers.ModelSerializer):
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['id', 'title', 'message', 'is_read', 'type', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'title', 'message', 'is_read', 'type', 'student', 'archived_student', 'created_at']
+        read_only_fields = ['student', 'archived_student', 'created_at']
@@ -0,0 +1,48 @@
+"""
+Model signal handlers.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .conditional import bump_data_version
+from .events import publish_notifications
+from .models import Notification, Student
+from .notifications import adjust_unread_count
+from .similarity import refresh_student, remove_students
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        adjust_unread_count(instance.user_id, 1)
+        publish_notifications([instance])
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread_count(instance.user_id, -1)
+
+
+@receiver(post_save, sender=Student)
+def student_saved(sender, instance, created, **kwargs):
+    bump_data_version('students')
+    # New students are appended by the similarity index itself on its next query
+    if not created:
+        refresh_student(instance)
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    bump_data_version('students')
+    remove_students([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, **kwargs):
+    # Group membership decides which students a user can see
+    bump_data_version('students')
+    if isinstance(instance, User):
+        # Drop the group names cached by get_group_names
+        instance.__dict__.pop('_group_names', None)
@@ -0,0 +1,312 @@
+"""
+Similar Student Search
+
+Keeps every Student's feature vector, passed through the loaded scaler, in a
+float32 matrix and answers nearest-neighbour queries by blocked brute force:
+the matrix is scanned in fixed-size blocks with one matrix-vector product
+each, keeping the best candidates per block. At 35 dimensions this stays in
+the low milliseconds for a million rows and needs no extra dependencies.
+
+The index is saved to SIMILARITY_INDEX_PATH so workers start without reading
+the whole table. Before each query, students created since the last sync are
+appended with one indexed query; edits made through ``Student.save()`` refresh
+their row in place, and deleted students (archived ones included) are dropped
+by the delete signal. A query that comes across students deleted in another
+process drops them and searches again, so it still returns ``k`` students
+while there are that many. Edits made with ``QuerySet.update()`` or in another
+process are picked up on the next rebuild (``manage.py build_similarity_index``).
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .models import Student
+from .tasks import submit
+from .utils import FEATURE_FIELDS, ML_MODELS_DIR, build_feature_matrix, get_models, scaler_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Rows scored per matrix-vector product; 64k x 35 float32 is about 9 MB
+SEARCH_BLOCK_ROWS = 65536
+
+# Extra candidates per block re-ranked with exact distances
+RERANK_MARGIN = 32
+
+# Rows read from the database per query while building or syncing
+LOAD_CHUNK_SIZE = 20000
+
+# Appended or refreshed rows after which the index is written back to disk
+SAVE_THRESHOLD = 5000
+
+# Student fields read for each vector, in build_feature_matrix's input form
+VECTOR_FIELDS = list(FEATURE_FIELDS.values())
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index_path():
+    return Path(getattr(settings, 'SIMILARITY_INDEX_PATH', ML_MODELS_DIR / 'similarity_index.npz'))
+
+
+def scale_features(features):
+    """Scale a raw feature matrix with the loaded scaler and return float32 vectors."""
+    _, scaler, _ = get_models()
+    return scaler.transform(features).astype(np.float32)
+
+
+def student_vector(student):
+    """The scaled feature vector of one Student instance."""
+    columns = {field: [getattr(student, field)] for field in VECTOR_FIELDS}
+    return scale_features(build_feature_matrix(columns))[0]
+
+
+def iter_student_vectors(after_id=0, chunk_size=LOAD_CHUNK_SIZE):
+    """
+    Yield (ids, vectors) for students with a primary key above ``after_id``.
+
+    Rows are read in primary key order with keyset pagination, so memory
+    stays bounded by ``chunk_size`` however large the table is.
+    """
+    while True:
+        rows = list(
+            Student.objects.filter(pk__gt=after_id)
+            .order_by('pk')
+            .values_list('pk', *VECTOR_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            return
+        values = np.array(rows, dtype=np.float64)
+        columns = {field: values[:, i + 1] for i, field in enumerate(VECTOR_FIELDS)}
+        ids = values[:, 0].astype(np.int64)
+        yield ids, scale_features(build_feature_matrix(columns))
+        after_id = int(ids[-1])
+
+
+class SimilarityIndex:
+    """
+    A growable float32 matrix of scaled student vectors, ordered by student id.
+
+    Removed rows stay in place with an infinite squared norm, so they rank
+    last in every block and are left out of results and saved files.
+    """
+
+    def __init__(self, fingerprint, dims):
+        self.fingerprint = fingerprint
+        self.unsaved = 0
+        self._lock = threading.Lock()
+        self._size = 0
+        self._removed = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, dims), dtype=np.float32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+
+    def __len__(self):
+        return self._size - self._removed
+
+    @property
+    def dims(self):
+        return self._vectors.shape[1]
+
+    @property
+    def last_id(self):
+        return int(self._ids[self._size - 1]) if self._size else 0
+
+    def _reserve(self, capacity):
+        if capacity <= len(self._ids):
+            return
+        # Grow geometrically so repeated appends stay amortised O(1) per row
+        capacity = max(capacity, 2 * len(self._ids), 1024)
+        ids = np.empty(capacity, dtype=np.int64)
+        vectors = np.empty((capacity, self.dims), dtype=np.float32)
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        ids[:self._size] = self._ids[:self._size]
+        vectors[:self._size] = self._vectors[:self._size]
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        self._ids, self._vectors, self._sq_norms = ids, vectors, sq_norms
+
+    def append(self, ids, vectors):
+        """Add rows; ``ids`` must be ascending and above ``last_id``."""
+        with self._lock:
+            start, stop = self._size, self._size + len(ids)
+            self._reserve(stop)
+            self._ids[start:stop] = ids
+            self._vectors[start:stop] = vectors
+            self._sq_norms[start:stop] = np.einsum('ij,ij->i', vectors, vectors)
+            self._size = stop
+            self.unsaved += len(ids)
+
+    def update(self, student_id, vector):
+        """Replace the vector of an indexed student. Returns False if it is not indexed."""
+        with self._lock:
+            position = np.searchsorted(self._ids[:self._size], student_id)
+            if position == self._size or self._ids[position] != student_id or np.isinf(self._sq_norms[position]):
+                return False
+            self._vectors[position] = vector
+            self._sq_norms[position] = vector @ vector
+            self.unsaved += 1
+            return True
+
+    def remove(self, student_ids):
+        """Drop indexed students from the results. Returns the number removed."""
+        student_ids = np.asarray(student_ids, dtype=np.int64)
+        with self._lock:
+            if not self._size or not len(student_ids):
+                return 0
+            ids = self._ids[:self._size]
+            positions = np.minimum(np.searchsorted(ids, student_ids), self._size - 1)
+            positions = np.unique(positions[(ids[positions] == student_ids) & np.isfinite(self._sq_norms[positions])])
+            self._sq_norms[positions] = np.inf
+            self._removed += len(positions)
+            self.unsaved += len(positions)
+            return len(positions)
+
+    def search(self, vector, k):
+        """
+        Find the ``k`` nearest indexed students by Euclidean distance.
+
+        Returns:
+            Tuple of (ids, distances) arrays, nearest first.
+        """
+        with self._lock:
+            size = self._size
+            ids, vectors, sq_norms = self._ids, self._vectors, self._sq_norms
+        query = np.asarray(vector, dtype=np.float32)
+        if not size or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2; |q|^2 is constant per query, so
+        # blocks are ranked on the first two terms alone. In float32 these
+        # lose precision when features sit far from the scaler's mean (large
+        # course codes do), so a wider pool is kept and re-ranked exactly.
+        pool = max(4 * k, k + RERANK_MARGIN)
+        candidates = []
+        for start in range(0, size, SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, size)
+            scores = sq_norms[start:stop] - 2 * (vectors[start:stop] @ query)
+            take = min(pool, len(scores))
+            candidates.append(np.argpartition(scores, take - 1)[:take] + start)
+
+        positions = np.concatenate(candidates)
+        positions = positions[np.isfinite(sq_norms[positions])]
+        differences = vectors[positions].astype(np.float64) - query.astype(np.float64)
+        distances = np.sqrt(np.einsum('ij,ij->i', differences, differences))
+        order = np.argsort(distances, kind='stable')[:k]
+        return ids[positions[order]], distances[order]
+
+    def save(self, path):
+        """Write the index atomically, so readers never see a partial file."""
+        with self._lock:
+            live = np.isfinite(self._sq_norms[:self._size])
+            ids, vectors = self._ids[:self._size][live], self._vectors[:self._size][live]
+            self.unsaved = 0
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as f:
+            np.savez(f, ids=ids, vectors=vectors, fingerprint=np.array(self.fingerprint))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            vectors = data['vectors']
+            index = cls(str(data['fingerprint']), vectors.shape[1])
+            index.append(data['ids'], vectors)
+        index.unsaved = 0
+        return index
+
+
+def build_index(chunk_size=LOAD_CHUNK_SIZE):
+    """Build a fresh index from every Student row."""
+    _, scaler, _ = get_models()
+    index = SimilarityIndex(scaler_fingerprint(scaler), scaler.n_features_in_)
+    for ids, vectors in iter_student_vectors(chunk_size=chunk_size):
+        index.append(ids, vectors)
+    return index
+
+
+def _load_or_build():
+    _, scaler, _ = get_models()
+    path = get_index_path()
+    if path.exists():
+        try:
+            index = SimilarityIndex.load(path)
+        except (OSError, ValueError, KeyError):
+            logger.warning('Could not read similarity index at %s, rebuilding it', path)
+        else:
+            if index.fingerprint == scaler_fingerprint(scaler):
+                return index
+            logger.info('Similarity index at %s was built with another scaler, rebuilding it', path)
+
+    started = time.perf_counter()
+    index = build_index()
+    index.save(path)
+    logger.info('Built similarity index of %d students in %.1fs', len(index), time.perf_counter() - started)
+    return index
+
+
+def _save_index():
+    if _index is not None:
+        _index.save(get_index_path())
+
+
+def get_index():
+    """Return the process-wide index, loading or building it first and appending new students."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = _load_or_build()
+        for ids, vectors in iter_student_vectors(after_id=_index.last_id):
+            _index.append(ids, vectors)
+        if _index.unsaved >= SAVE_THRESHOLD:
+            _index.unsaved = 0
+            submit(_save_index)
+        return _index
+
+
+def refresh_student(student):
+    """Update an edited student's vector, if the index is loaded in this process."""
+    if _index is not None and student.pk <= _index.last_id:
+        _index.update(student.pk, student_vector(student))
+
+
+def remove_students(student_ids):
+    """Drop deleted students from the index, if it is loaded in this process."""
+    if _index is not None:
+        _index.remove(student_ids)
+
+
+def find_similar(student, k):
+    """
+    The ``k`` students closest to ``student``, excluding the student itself.
+
+    Returns:
+        List of (Student, distance) pairs, nearest first. Students found
+        to be deleted are removed from the index and the search is widened
+        until ``k`` remain or the index runs out.
+    """
+    index = get_index()
+    vector = student_vector(student)
+    fetch = k + 1
+    while True:
+        ids, distances = index.search(vector, fetch)
+        records = Student.objects.in_bulk(ids.tolist())
+        deleted = [student_id for student_id in ids.tolist() if student_id not in records]
+        matches = [
+            (records[student_id], float(distance))
+            for student_id, distance in zip(ids.tolist(), distances)
+            if student_id != student.pk and student_id in records
+        ]
+        if deleted:
+            index.remove(deleted)
+        if len(matches) >= k or len(ids) < fetch:
+            return matches[:k]
+        # Fetch at least as many again, so a term archived elsewhere costs a few queries
+        fetch = max(2 * fetch, k + 1 + len(deleted))
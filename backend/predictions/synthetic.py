@@ -0,0 +1,167 @@
+"""
+Synthetic Student Data Generator
+
+Produces realistic student records across all model features, following the
+value codes and rough marginal distributions of the Kaggle "Higher Education
+Predictors of Student Retention" dataset. Output is fully determined by the
+seed, so benchmark runs at the same scale are comparable.
+
+Rows are generated column-wise with NumPy in fixed-size chunks, which keeps
+memory flat from a thousand rows up to tens of millions.
+"""
+
+import csv
+
+import numpy as np
+
+from .models import STUDENT_FEATURE_FIELDS
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+# (code, relative frequency) pairs taken from the source dataset
+MARITAL_STATUS = [(1, 88.6), (2, 8.6), (4, 2.1), (5, 0.6), (6, 0.1), (3, 0.1)]
+APPLICATION_MODES = [
+    (1, 38.6), (17, 19.7), (39, 17.7), (43, 7.1), (44, 4.0), (7, 3.2),
+    (18, 2.8), (42, 1.8), (51, 1.4), (16, 0.9), (53, 0.8), (15, 0.7),
+    (5, 0.4), (10, 0.2), (2, 0.1), (57, 0.1), (26, 0.05), (27, 0.05),
+]
+APPLICATION_ORDER = [(1, 68.0), (2, 12.0), (3, 7.0), (4, 5.0), (5, 4.0), (6, 3.0), (0, 0.5), (9, 0.5)]
+COURSES = [
+    (9500, 17.3), (9147, 8.6), (9238, 8.0), (9085, 7.6), (9773, 7.2),
+    (9670, 6.2), (9991, 6.0), (9254, 5.8), (9070, 5.1), (171, 4.8),
+    (8014, 4.9), (9003, 4.9), (9119, 3.9), (9853, 3.6), (9130, 3.3),
+    (9556, 1.9), (33, 0.3),
+]
+PREVIOUS_QUALIFICATIONS = [
+    (1, 84.0), (39, 5.0), (19, 3.7), (3, 2.8), (12, 1.0), (40, 0.9),
+    (42, 0.8), (2, 0.5), (6, 0.4), (9, 0.3), (4, 0.3), (38, 0.2),
+    (43, 0.2), (10, 0.1), (15, 0.1),
+]
+NATIONALITIES = [
+    (1, 97.5), (41, 0.8), (26, 0.3), (6, 0.3), (22, 0.3), (24, 0.1),
+    (100, 0.1), (11, 0.1), (103, 0.1), (21, 0.1), (101, 0.1),
+]
+PARENT_QUALIFICATIONS = [
+    (1, 24.0), (37, 24.0), (19, 21.0), (38, 12.0), (3, 8.0), (34, 3.0),
+    (2, 2.0), (12, 1.0), (4, 1.5), (5, 1.0), (39, 1.0), (40, 0.5),
+]
+PARENT_OCCUPATIONS = [
+    (9, 35.0), (4, 18.0), (5, 12.0), (7, 8.0), (3, 8.0), (0, 3.0),
+    (10, 6.0), (8, 3.0), (6, 2.5), (2, 2.0), (1, 1.0), (90, 1.0), (99, 0.5),
+]
+# Unemployment rate, inflation rate and GDP move together per intake year
+MACRO_YEARS = [
+    (10.8, 1.4, 1.74), (13.9, -0.3, 0.79), (9.4, -0.8, -3.12),
+    (16.2, 0.3, -0.92), (15.5, 2.8, -4.06), (8.9, 1.4, 3.51),
+    (12.7, 3.7, -1.70), (11.1, 0.6, 2.02), (7.6, 2.6, 0.32),
+    (12.4, 0.5, 1.79),
+]
+
+
+def _categorical(rng, pairs, n):
+    codes = np.array([code for code, _ in pairs])
+    weights = np.array([weight for _, weight in pairs], dtype=float)
+    return rng.choice(codes, size=n, p=weights / weights.sum())
+
+
+def _semester(rng, ability, n):
+    """Generate one semester of curricular unit data driven by a latent ability."""
+    enrolled = np.clip(rng.poisson(6, n), 0, 26)
+    credited = np.where(rng.random(n) < 0.1, rng.poisson(3, n), 0)
+    credited = np.minimum(credited, enrolled)
+    evaluations = enrolled + rng.poisson(2, n) * (enrolled > 0)
+    approved = rng.binomial(enrolled, ability)
+    grade = np.where(
+        approved > 0,
+        np.clip(rng.normal(10.5 + 4.0 * ability, 1.2, n), 10.0, 18.9),
+        0.0,
+    )
+    without_evaluations = np.where(rng.random(n) < 0.05, rng.poisson(1, n), 0)
+    return credited, enrolled, evaluations, approved, np.round(grade, 2), without_evaluations
+
+
+def generate_columns(n, rng):
+    """
+    Generate ``n`` synthetic students as a dict of NumPy columns.
+
+    Args:
+        n: Number of rows to generate.
+        rng: A ``numpy.random.Generator``.
+
+    Returns:
+        Dict mapping each name in STUDENT_FEATURE_FIELDS to an array of length n.
+    """
+    nationality = _categorical(rng, NATIONALITIES, n)
+    age = np.clip(17 + rng.gamma(1.3, 3.5, n).astype(int), 17, 70)
+    # Older students and debtors are less likely to pass their units
+    debtor = (rng.random(n) < 0.11).astype(int)
+    ability = np.clip(rng.beta(4, 1.6, n) - 0.15 * debtor - 0.004 * (age - 17), 0.0, 1.0)
+    first = _semester(rng, ability, n)
+    # The second semester tracks the first with some drift
+    second = _semester(rng, np.clip(ability + rng.normal(0, 0.08, n), 0.0, 1.0), n)
+    macro = np.array(MACRO_YEARS)[rng.integers(0, len(MACRO_YEARS), n)]
+
+    columns = {
+        'marital_status': _categorical(rng, MARITAL_STATUS, n),
+        'application_mode': _categorical(rng, APPLICATION_MODES, n),
+        'application_order': _categorical(rng, APPLICATION_ORDER, n),
+        'course': _categorical(rng, COURSES, n),
+        'daytime_evening_attendance': (rng.random(n) < 0.89).astype(int),
+        'previous_qualification': _categorical(rng, PREVIOUS_QUALIFICATIONS, n),
+        'nationality': nationality,
+        'gender': (rng.random(n) < 0.35).astype(int),
+        'age_at_enrollment': age,
+        'international': (nationality != 1).astype(int),
+        'displaced': (rng.random(n) < 0.55).astype(int),
+        'educational_special_needs': (rng.random(n) < 0.012).astype(int),
+        'mothers_qualification': _categorical(rng, PARENT_QUALIFICATIONS, n),
+        'fathers_qualification': _categorical(rng, PARENT_QUALIFICATIONS, n),
+        'mothers_occupation': _categorical(rng, PARENT_OCCUPATIONS, n),
+        'fathers_occupation': _categorical(rng, PARENT_OCCUPATIONS, n),
+        'scholarship_holder': (rng.random(n) < 0.25).astype(int),
+        'debtor': debtor,
+        'tuition_fees_up_to_date': ((rng.random(n) < 0.92) & (ability > 0.2)).astype(int),
+        'admission_grade': np.round(np.clip(rng.normal(127, 14.5, n), 95.0, 190.0), 1),
+        'unemployment_rate': macro[:, 0],
+        'inflation_rate': macro[:, 1],
+        'gdp': macro[:, 2],
+    }
+    for prefix, semester in (('curricular_units_1st_sem', first), ('curricular_units_2nd_sem', second)):
+        for suffix, values in zip(
+            ('credited', 'enrolled', 'evaluations', 'approved', 'grade', 'without_evaluations'),
+            semester,
+        ):
+            columns[f'{prefix}_{suffix}'] = values
+
+    return {field: columns[field] for field in STUDENT_FEATURE_FIELDS}
+
+
+def iter_student_chunks(total, seed=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield column dicts of at most ``chunk_size`` rows until ``total`` rows are produced."""
+    rng = np.random.default_rng(seed)
+    remaining = total
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        yield generate_columns(n, rng)
+        remaining -= n
+
+
+def iter_student_rows(total, seed=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield ``total`` synthetic students as dicts keyed by Student field name.
+
+    The dicts can be passed straight to ``Student(**row)`` or to
+    ``PredictionInputSerializer(data=row)``.
+    """
+    for columns in iter_student_chunks(total, seed=seed, chunk_size=chunk_size):
+        values = [columns[field].tolist() for field in STUDENT_FEATURE_FIELDS]
+        for row in zip(*values):
+            yield dict(zip(STUDENT_FEATURE_FIELDS, row))
+
+
+def write_csv(fileobj, total, seed=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write ``total`` synthetic students as CSV in the format accepted by /api/upload/."""
+    writer = csv.writer(fileobj)
+    writer.writerow(STUDENT_FEATURE_FIELDS)
+    for columns in iter_student_chunks(total, seed=seed, chunk_size=chunk_size):
+        writer.writerows(zip(*(columns[field].tolist() for field in STUDENT_FEATURE_FIELDS)))
@@ -0,0 +1,48 @@
+"""
+In-Process Background Tasks
+
+A small thread pool for work that should not hold up the request, such as
+notification fan-out. Tasks are handed to the pool only after the current
+transaction commits, so they always see the rows the request wrote.
+
+Set BACKGROUND_TASKS_INLINE = True to run tasks synchronously on commit,
+which keeps tests deterministic.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 2),
+            thread_name_prefix='edupredict-task',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', func.__name__)
+    finally:
+        # Worker threads own their connections; release them between tasks
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` off the request path once the transaction commits."""
+    if getattr(settings, 'BACKGROUND_TASKS_INLINE', False):
+        transaction.on_commit(lambda: func(*args, **kwargs))
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run, func, args, kwargs))
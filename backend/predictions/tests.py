@@ -1,3 +1,1310 @@
-from django.test import TestCase
+import datetime
+import decimal
+import io
+import math
+import pickle
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from sklearn.linear_model import SGDClassifier
+
+from . import (
+    admission,
+    drift,
+    events,
+    exporters,
+    health,
+    history,
+    importers,
+    notifications,
+    renderers,
+    similarity,
+    training,
+    utils,
+)
+from .admin import EstimatedCountPaginator, StudentAdmin
+from .benchmarks import _csv_payload, create_role_users, seed_students
+from .models import ArchivedStudent, Notification, PredictionLog, STUDENT_FEATURE_FIELDS, Student, SupportTicket
+from .querybudget import QueryBudgetExceeded, QueryBudgetMiddleware, QueryCountAssertions, normalize_sql
+from .synthetic import iter_student_chunks, iter_student_rows
+from .views import BatchUploadView, StudentListCreateView
+from .views_stream import _authenticate, notification_stream
+from .views_support import NotificationViewSet
+
+
+def api_client(user):
+    """An API client authenticated with a JWT for ``user``, as the frontend is."""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+@override_settings(BACKGROUND_TASKS_INLINE=True)
+class StudentApiTests(TestCase):
+    """Behaviour of the student endpoints."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_role_users()
+        seed_students(20, seed=1)
+
+    def tearDown(self):
+        history.buffer.discard()
+        drift.monitor.discard()
+
+    def export(self, role, **params):
+        response = api_client(self.users[role]).get('/api/students/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_export_streams_visible_students(self):
+        lines = self.export('Teacher').decode().splitlines()
+        header = lines[0].split(',')
+        self.assertEqual(header, exporters.export_fields())
+        self.assertIn('curricular_units_2nd_sem_grade', header)
+        self.assertNotIn('content_hash', header)
+        self.assertEqual(len(lines), 21)
+        # Only the header for a student without a record
+        self.assertEqual(len(self.export('Student').splitlines()), 1)
+
+        # The list view filters apply
+        course = Student.objects.order_by('pk').first().course
+        lines = self.export('Teacher', course=course).decode().splitlines()
+        self.assertEqual(len(lines) - 1, Student.objects.filter(course=course).count())
+
+    @skipUnless(exporters.arrow_available(), 'needs pyarrow')
+    def test_parquet_export(self):
+        table = exporters.pq.read_table(io.BytesIO(self.export('Teacher', file_format='parquet')))
+        self.assertEqual(table.column_names, exporters.export_fields())
+        ids = Student.objects.order_by('pk').values_list('pk', flat=True)
+        self.assertEqual(table.column('id').to_pylist(), list(ids))
+
+    def test_out_of_range_values_are_rejected(self):
+        row = dict(next(iter_student_rows(1, seed=2)), curricular_units_1st_sem_grade=21)
+        teacher = api_client(self.users['Teacher'])
+        for url in ('/api/predict/', '/api/students/'):
+            response = teacher.post(url, row, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('curricular_units_1st_sem_grade', response.data)
+
+    def test_responses_omit_content_hash(self):
+        teacher = api_client(self.users['Teacher'])
+        response = teacher.get('/api/students/')
+        self.assertEqual(len(response.data['results']), 20)
+        for record in response.data['results']:
+            self.assertNotIn('content_hash', record)
+        response = teacher.get(f"/api/students/{response.data['results'][0]['id']}/")
+        self.assertIn('curricular_units_2nd_sem_grade', response.data)
+        self.assertNotIn('content_hash', response.data)
+
+    def test_only_staff_set_the_outcome(self):
+        student = Student.objects.create(user=self.users['Student'], **next(iter_student_rows(1, seed=7)))
+        url = f'/api/students/{student.pk}/'
+        response = api_client(self.users['Student']).patch(url, {'outcome': 'Graduate', 'course': 9119}, format='json')
+        self.assertEqual(response.status_code, 200)
+        student.refresh_from_db()
+        self.assertEqual((student.outcome, student.course), (None, 9119))
+
+        response = api_client(self.users['Teacher']).patch(url, {'outcome': 'Dropout'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        student.refresh_from_db()
+        self.assertEqual(student.outcome, 'Dropout')
+
+    def test_identical_record_is_rejected(self):
+        client = api_client(self.users['Student'])
+        row = next(iter_student_rows(1, seed=8))
+        self.assertEqual(client.post('/api/students/', row, format='json').status_code, 201)
+        response = client.post('/api/students/', row, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('identical', str(response.data['non_field_errors'][0]))
+        # Another owner may store the same values
+        self.assertEqual(api_client(self.users['Teacher']).post('/api/students/', row, format='json').status_code, 201)
+
+    def test_unchanged_list_is_not_modified(self):
+        teacher = api_client(self.users['Teacher'])
+        response = teacher.get('/api/students/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(teacher.get('/api/students/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # The ETag is scoped to the user and the URL
+        student = api_client(self.users['Student'])
+        self.assertEqual(student.get('/api/students/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(teacher.get('/api/students/?course=9500', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        # A date alone never validates a per-user response
+        self.assertEqual(
+            teacher.get('/api/students/', HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT').status_code, 200
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.order_by('pk').first().save()
+        self.assertEqual(teacher.get('/api/students/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_health_etag_follows_readiness(self):
+        client = api_client(self.users['Student'])
+        with mock.patch('predictions.views.readiness', return_value=(True, {})):
+            etag = client.get('/api/health/')['ETag']
+            self.assertEqual(client.get('/api/health/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with mock.patch('predictions.views.readiness', return_value=(False, {})):
+            response = client.get('/api/health/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['ml_models_loaded'])
+
+
+@override_settings(BACKGROUND_TASKS_INLINE=True)
+class UploadTests(TestCase):
+    """Batch uploads of CSV and columnar files."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_role_users()
+
+    def tearDown(self):
+        history.buffer.discard()
+        drift.monitor.discard()
+
+    def post(self, name, payload, content_type):
+        upload = SimpleUploadedFile(name, payload, content_type=content_type)
+        return api_client(self.users['Teacher']).post('/api/upload/', {'file': upload}, format='multipart')
+
+    def parquet_payload(self, rows, seed, **overrides):
+        columns = next(iter_student_chunks(rows, seed=seed, chunk_size=rows))
+        for field, values in overrides.items():
+            columns[field] = np.asarray(values)
+        buffer = io.BytesIO()
+        importers.pq.write_table(importers.pa.table(columns), buffer)
+        return buffer.getvalue()
+
+    def post_parquet(self, payload):
+        return self.post('students.parquet', payload, 'application/vnd.apache.parquet')
+
+    @skipUnless(importers.pa, 'needs pyarrow')
+    def test_columnar_upload_rejects_out_of_range_values(self):
+        ages = np.full(30, 20)
+        ages[25] = -3
+        grades = np.full(30, 12.5)
+        grades[3] = 35.0
+        payload = self.parquet_payload(
+            30, seed=1, age_at_enrollment=ages, curricular_units_2nd_sem_grade=grades,
+            # Overflows the 32-bit integer column
+            course=np.full(30, 2 ** 40),
+        )
+        with mock.patch.object(BatchUploadView, 'save_chunk_size', 10):
+            response = self.post_parquet(payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['errors']), 3)
+        self.assertIn('age_at_enrollment: 1 value(s) outside', response.data['errors'][1])
+        # Validation runs before the first chunk, so nothing was saved
+        self.assertFalse(Student.objects.exists())
+
+    @skipUnless(importers.pa, 'needs pyarrow')
+    def test_uploads_skip_stored_and_repeated_rows(self):
+        columns = next(iter_student_chunks(12, seed=3, chunk_size=12))
+        # Whole numbers as floats hash the same as the integers of a CSV upload
+        columns['age_at_enrollment'] = columns['age_at_enrollment'].astype(np.float64)
+        doubled = {field: np.concatenate([values, values[:4]]) for field, values in columns.items()}
+        buffer = io.BytesIO()
+        importers.pq.write_table(importers.pa.table(doubled), buffer)
+
+        with mock.patch.object(BatchUploadView, 'save_chunk_size', 5):
+            response = self.post_parquet(buffer.getvalue())
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['inserted_count'], response.data['skipped_duplicate_count']), (12, 4))
+        self.assertEqual(
+            list(Student.objects.order_by('pk').values_list('age_at_enrollment', flat=True)),
+            columns['age_at_enrollment'].astype(int).tolist(),
+        )
+        expected = utils.predict_feature_matrix(utils.build_feature_matrix(columns), monitor=False)
+        np.testing.assert_allclose(
+            list(Student.objects.order_by('pk').values_list('last_dropout_probability', flat=True)),
+            expected['dropout_probability'],
+        )
+
+        # The same students as CSV, plus two new ones
+        rows = [
+            dict(zip(STUDENT_FEATURE_FIELDS, row))
+            for row in zip(*(columns[field].tolist() for field in STUDENT_FEATURE_FIELDS))
+        ]
+        rows += list(iter_student_rows(2, seed=4))
+        csv_payload = io.StringIO()
+        csv_payload.write(','.join(STUDENT_FEATURE_FIELDS) + '\n')
+        for row in rows:
+            csv_payload.write(','.join(str(row[field]) for field in STUDENT_FEATURE_FIELDS) + '\n')
+        response = self.post('students.csv', csv_payload.getvalue().encode(), 'text/csv')
+        self.assertEqual((response.data['inserted_count'], response.data['skipped_duplicate_count']), (2, 12))
+
+    def test_archived_rows_are_not_uploaded_again(self):
+        payload = _csv_payload(8, seed=6)
+        upload = SimpleUploadedFile('students.csv', payload, content_type='text/csv')
+        response = api_client(self.users['Teacher']).post(
+            '/api/upload/', {'file': upload, 'term': '2024-S1'}, format='multipart'
+        )
+        self.assertEqual(response.data['inserted_count'], 8)
+        call_command('archive_students', term=['2024-S1'], stdout=io.StringIO())
+        self.assertFalse(Student.objects.exists())
+
+        response = self.post('students.csv', payload, 'text/csv')
+        self.assertEqual((response.data['inserted_count'], response.data['skipped_duplicate_count']), (0, 8))
+        self.assertFalse(Student.objects.exists())
+
+    def test_rows_stored_by_a_concurrent_upload_are_skipped(self):
+        insert_students = BatchUploadView.insert_students
+
+        def racing_insert(view, students):
+            # Another upload of the same file stores a row after the hash lookup
+            Student.objects.create(
+                user=students[1].user, **{field: getattr(students[1], field) for field in STUDENT_FEATURE_FIELDS}
+            )
+            return insert_students(view, students)
+
+        with mock.patch.object(BatchUploadView, 'insert_students', racing_insert):
+            response = self.post('students.csv', _csv_payload(5, seed=7), 'text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['inserted_count'], response.data['skipped_duplicate_count']), (4, 1))
+        self.assertEqual(Student.objects.count(), 5)
+        self.assertEqual(Student.objects.values('content_hash').distinct().count(), 5)
+
+    @override_settings(INFERENCE_CONCURRENCY=1, INFERENCE_BATCH_QUEUE_TIMEOUT=0)
+    def test_upload_at_capacity_is_rejected_with_retry_after(self):
+        payload = _csv_payload(5, seed=5)
+        with admission.admit(admission.BATCH):
+            response = self.post('students.csv', payload, 'text/csv')
+            self.assertEqual(response.status_code, 503)
+            self.assertGreaterEqual(int(response['Retry-After']), 1)
+            if importers.pa:
+                response = self.post_parquet(self.parquet_payload(5, seed=5))
+                self.assertEqual(response.status_code, 503)
+                self.assertIn('Retry-After', response)
+        self.assertFalse(Student.objects.exists())
+
+        # Once the slot is free the same file goes through
+        response = self.post('students.csv', payload, 'text/csv')
+        self.assertEqual((response.status_code, response.data['inserted_count']), (201, 5))
+
+    def test_csv_rows_out_of_range_fail_individually(self):
+        rows = list(iter_student_rows(3, seed=2))
+        rows[1]['curricular_units_1st_sem_grade'] = 21
+        buffer = io.StringIO()
+        buffer.write(','.join(STUDENT_FEATURE_FIELDS) + '\n')
+        for row in rows:
+            buffer.write(','.join(str(row[field]) for field in STUDENT_FEATURE_FIELDS) + '\n')
+        response = self.post('students.csv', buffer.getvalue().encode(), 'text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['inserted_count'], response.data['failed_count']), (2, 1))
+        self.assertIn('curricular_units_1st_sem_grade', response.data['errors'][0])
+
+
+class NotificationTests(TestCase):
+    """High-risk fan-out and the cached unread counters."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_role_users()
+        seed_students(10, seed=1)
+        Student.objects.update(user=cls.users['Student'])
+        cls.students = list(Student.objects.order_by('pk'))
+
+    def setUp(self):
+        cache.clear()
+
+    def set_risk(self, students, probability):
+        Student.objects.filter(pk__in=[student.pk for student in students]).update(
+            last_dropout_probability=probability
+        )
+
+    def test_fan_out_alerts_owner_and_staff_once(self):
+        high, low = self.students[:3], self.students[3:]
+        self.set_risk(high, 0.9)
+        self.set_risk(low, 0.1)
+
+        created = notifications.fan_out_high_risk([student.pk for student in self.students])
+        # Admin, Teacher and the owning Student, per high-risk student
+        self.assertEqual(created, 9)
+        for user in self.users.values():
+            self.assertEqual(
+                set(Notification.objects.filter(user=user).values_list('student_id', flat=True)),
+                {student.pk for student in high},
+            )
+        # Unread alerts are not repeated
+        self.assertEqual(notifications.fan_out_high_risk([student.pk for student in high]), 0)
+
+        Notification.objects.filter(user=self.users['Teacher']).update(is_read=True)
+        self.assertEqual(notifications.fan_out_high_risk([high[0].pk]), 1)
+
+    def test_unread_count_follows_changes(self):
+        user = self.users['Student']
+        client = api_client(user)
+
+        def unread_count():
+            response = client.get('/api/notifications/unread_count/')
+            self.assertEqual(
+                response.data['unread_count'], Notification.objects.filter(user=user, is_read=False).count()
+            )
+            return response.data['unread_count']
+
+        self.assertEqual(unread_count(), 0)
+        self.set_risk(self.students[:4], 0.9)
+        notifications.fan_out_high_risk([student.pk for student in self.students])
+        self.assertEqual(unread_count(), 4)
+
+        # Served from the cache once computed
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.get_unread_count(user.id), 4)
+
+        Notification.objects.create(user=user, title='Note', message='Hello')
+        Notification.objects.filter(user=user, student=self.students[0]).get().delete()
+        self.assertEqual(unread_count(), 4)
+
+        notification = Notification.objects.filter(user=user).first()
+        client.post(f'/api/notifications/{notification.pk}/mark_read/')
+        self.assertEqual(unread_count(), 3)
+        client.post(f'/api/notifications/{notification.pk}/mark_read/')
+        self.assertEqual(unread_count(), 3)
+        client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(unread_count(), 0)
+
+    def test_stream_ticket_opens_one_stream(self):
+        user = self.users['Student']
+        ticket = api_client(user).post('/api/notifications/stream-ticket/').json()['ticket']
+
+        def stream_user(**params):
+            request = RequestFactory().get('/api/notifications/stream/', params)
+            request.user = AnonymousUser()
+            return _authenticate(request)
+
+        self.assertEqual(stream_user(ticket=ticket), user)
+        self.assertIsNone(stream_user(ticket=ticket))
+        self.assertIsNone(stream_user(ticket=ticket[:-1] + 'x'))
+        # The general access token is no longer accepted in the URL
+        self.assertIsNone(stream_user(token=str(RefreshToken.for_user(user).access_token)))
+
+        with mock.patch('django.core.signing.time.time', return_value=0):
+            stale = events.issue_stream_ticket(user.id)
+        self.assertIsNone(stream_user(ticket=stale))
+
+
+class ExplainTests(TestCase):
+    """Per-feature contributions towards the Dropout class."""
+
+    def setUp(self):
+        self.features = utils.build_feature_matrix(next(iter_student_chunks(50, seed=3, chunk_size=50)))
+
+    def test_contributions_add_up_to_the_log_odds(self):
+        model, scaler, label_encoder = utils.get_models()
+        explanations = utils.explain_feature_matrix(self.features, top_k=len(utils.FEATURE_NAMES))
+        margins = model.predict(scaler.transform(self.features), output_margin=True)
+        dropout_margins = margins[:, list(label_encoder.classes_).index('Dropout')]
+
+        for explanation, row, margin in zip(explanations, self.features, dropout_margins):
+            factors = explanation['top_factors']
+            self.assertEqual(explanation['method'], 'tree_path')
+            self.assertAlmostEqual(
+                explanation['base_value'] + sum(factor['contribution'] for factor in factors), float(margin), places=4
+            )
+            contributions = [abs(factor['contribution']) for factor in factors]
+            self.assertEqual(contributions, sorted(contributions, reverse=True))
+            for factor in factors:
+                self.assertEqual(factor['value'], row[utils.FEATURE_NAMES.index(factor['feature'])])
+
+    def test_linear_contributions_add_up_to_the_decision_function(self):
+        _, scaler, _ = utils.get_models()
+        features_scaled = scaler.transform(self.features)
+        model = SGDClassifier(loss='log_loss', random_state=0).fit(features_scaled, np.arange(50) % 3)
+        method, contributions_for = utils._build_explainer(model, 0)
+        contributions, base_values = contributions_for(features_scaled)
+        self.assertEqual(method, 'linear')
+        np.testing.assert_allclose(
+            contributions.sum(axis=1) + base_values, model.decision_function(features_scaled)[:, 0], rtol=1e-6
+        )
+
+    def test_predict_explain(self):
+        self.addCleanup(history.buffer.discard)
+        self.addCleanup(drift.monitor.discard)
+        user = create_role_users()['Teacher']
+        payload = dict(next(iter_student_rows(1, seed=9)), explain=True)
+        response = api_client(user).post('/api/predict/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['explanation']['top_factors']), utils.EXPLANATION_TOP_K)
+
+
+class WhatIfTests(TestCase):
+    """What-if grids scored for one student."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = create_role_users()['Teacher']
+        cls.student = Student.objects.create(**next(iter_student_rows(1, seed=11)))
+
+    def test_scenario_grid(self):
+        base = utils.build_feature_vector(self.student.get_feature_dict())
+        axes = [
+            ('Curricular units 2nd sem (approved)', [0, 2, 4]),
+            ('Curricular units 2nd sem (grade)', [10.0, 15.0]),
+        ]
+        features, shape = utils.build_scenario_grid(base, axes)
+        self.assertEqual(shape, (3, 2))
+        self.assertEqual(features.shape, (6, len(utils.FEATURE_NAMES)))
+
+        approved = utils.FEATURE_NAMES.index('Curricular units 2nd sem (approved)')
+        second = utils.FEATURE_NAMES.index('Curricular units 2nd sem (grade)')
+        first = utils.FEATURE_NAMES.index('Curricular units 1st sem (grade)')
+        # Row-major: the last axis varies fastest
+        self.assertEqual(features[:, approved].tolist(), [0, 0, 2, 2, 4, 4])
+        self.assertEqual(features[:, second].tolist(), [10, 15] * 3)
+        np.testing.assert_array_equal(features[:, -1], features[:, second] - self.student.curricular_units_1st_sem_grade)
+        # Every other feature keeps the student's value
+        unchanged = [i for i in range(len(base) - 1) if i not in (approved, second)]
+        np.testing.assert_array_equal(features[:, unchanged], np.tile(np.asarray(base)[unchanged], (6, 1)))
+        self.assertEqual(features[0, first], self.student.curricular_units_1st_sem_grade)
+
+    def test_whatif_scores_every_scenario(self):
+        self.addCleanup(history.buffer.discard)
+        self.addCleanup(drift.monitor.discard)
+        response = api_client(self.teacher).post('/api/predict/whatif/', {
+            'student_id': self.student.pk,
+            'vary': [
+                {'feature': 'curricular_units_2nd_sem_approved', 'start': 0, 'stop': 6, 'step': 2},
+                {'feature': 'curricular_units_2nd_sem_grade', 'values': [8, 12, 16]},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['axes'][0]['values'], [0, 2, 4, 6])
+        self.assertEqual(data['scenario_count'], 12)
+        self.assertEqual(np.shape(data['dropout_probability']), (4, 3))
+        self.assertEqual(np.shape(data['predicted_class']), (4, 3))
+
+        # Each cell matches a single prediction of that scenario
+        for (i, approved), (j, grade) in [((0, 0), (0, 8)), ((2, 4), (1, 12)), ((3, 6), (2, 16))]:
+            scenario = dict(
+                self.student.get_feature_dict(),
+                **{'Curricular units 2nd sem (approved)': approved, 'Curricular units 2nd sem (grade)': grade},
+            )
+            single = utils.predict_student_status(scenario)
+            self.assertAlmostEqual(float(data['dropout_probability'][i][j]), single['dropout_probability'], places=6)
+            self.assertEqual(data['predicted_class'][i][j], single['predicted_class'])
+            for name, probabilities in data['probabilities'].items():
+                self.assertAlmostEqual(float(probabilities[i][j]), single['all_probabilities'][name], places=6)
+
+        baseline = utils.predict_student_status(self.student.get_feature_dict())
+        self.assertAlmostEqual(data['baseline']['dropout_probability'], baseline['dropout_probability'])
+
+    def test_whatif_rejects_repeated_features(self):
+        axis = {'feature': 'age_at_enrollment', 'values': [18, 30]}
+        response = api_client(self.teacher).post(
+            '/api/predict/whatif/', {'student_id': self.student.pk, 'vary': [axis, axis]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AtRiskTests(TestCase):
+    """The at-risk ranking of visible students."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_role_users()
+        rows = iter_student_rows(30, seed=12)
+        probabilities = [round(0.03 * i, 2) for i in range(25)] + [0.5, 0.5, None, None, 0.99]
+        cls.students = []
+        for i, (row, probability) in enumerate(zip(rows, probabilities)):
+            row['course'] = 9500 if i % 2 else 9119
+            cls.students.append(Student.objects.create(
+                user=cls.users['Student'] if i % 5 == 0 else None, last_dropout_probability=probability, **row
+            ))
+
+    def ranking(self, role, **params):
+        response = api_client(self.users[role]).get('/api/students/at-risk/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(record['id'], record['last_dropout_probability']) for record in response.data]
+
+    def expected(self, students):
+        scored = [student for student in students if student.last_dropout_probability is not None]
+        scored.sort(key=lambda student: (student.last_dropout_probability, student.pk), reverse=True)
+        return [(student.pk, student.last_dropout_probability) for student in scored]
+
+    def test_highest_probability_first(self):
+        self.assertEqual(self.ranking('Teacher'), self.expected(self.students)[:20])
+        self.assertEqual(self.ranking('Admin', limit=5), self.expected(self.students)[:5])
+        self.assertEqual(len(self.ranking('Teacher', limit=500)), 28)
+
+    def test_filters(self):
+        in_course = [student for student in self.students if student.course == 9500]
+        self.assertEqual(self.ranking('Teacher', course=9500, limit=100), self.expected(in_course))
+
+    def test_students_see_only_their_own(self):
+        own = [student for student in self.students if student.user_id == self.users['Student'].pk]
+        self.assertEqual(self.ranking('Student'), self.expected(own))
+
+    def test_limit_is_bounded(self):
+        client = api_client(self.users['Teacher'])
+        for limit in (0, 501, 'many'):
+            self.assertEqual(client.get('/api/students/at-risk/', {'limit': limit}).status_code, 400)
+
+
+class SimilarityTests(TestCase):
+    """Nearest-neighbour search over the student index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_students(300, seed=2)
+
+    def setUp(self):
+        index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        index_path = override_settings(SIMILARITY_INDEX_PATH=f'{index_dir}/similarity_index.npz')
+        index_path.enable()
+        self.addCleanup(index_path.disable)
+        self.addCleanup(setattr, similarity, '_index', None)
+        self.student = Student.objects.order_by('pk')[7]
+
+    def nearest(self, k):
+        """The ids and distances of the ``k`` closest stored students, by exact float64 distance."""
+        ids, vectors = map(np.concatenate, zip(*similarity.iter_student_vectors()))
+        differences = vectors.astype(np.float64) - similarity.student_vector(self.student).astype(np.float64)
+        distances = np.sqrt((differences ** 2).sum(axis=1))
+        order = [i for i in np.argsort(distances, kind='stable') if ids[i] != self.student.pk][:k]
+        return ids[order].tolist(), distances[order]
+
+    def test_matches_exact_nearest_neighbours(self):
+        matches = similarity.find_similar(self.student, 10)
+        ids, distances = self.nearest(10)
+        self.assertEqual([match.pk for match, _ in matches], ids)
+        np.testing.assert_allclose([distance for _, distance in matches], distances, rtol=1e-5)
+
+    def test_k_matches_after_deletes(self):
+        first = [match.pk for match, _ in similarity.find_similar(self.student, 10)]
+        Student.objects.filter(pk__in=first[:3]).delete()
+        self.assertEqual(len(similarity.get_index()), 297)
+
+        matches = similarity.find_similar(self.student, 10)
+        self.assertEqual([match.pk for match, _ in matches], self.nearest(10)[0])
+        self.assertFalse(set(first[:3]) & {match.pk for match, _ in matches})
+
+    def test_k_matches_after_archiving(self):
+        first = [match.pk for match, _ in similarity.find_similar(self.student, 10)]
+        Student.objects.filter(pk__in=first[:5]).update(term='2024-S1')
+        call_command('archive_students', term=['2024-S1'], stdout=io.StringIO())
+        self.assertEqual(len(similarity.get_index()), 295)
+
+        matches = similarity.find_similar(self.student, 10)
+        self.assertEqual([match.pk for match, _ in matches], self.nearest(10)[0])
+        self.assertFalse(set(first[:5]) & {match.pk for match, _ in matches})
+
+
+    def test_k_matches_after_deletes_in_another_process(self):
+        similarity.get_index()
+        ids = self.nearest(200)[0]
+        # A raw delete sends no signals, like one made by another worker
+        Student.objects.filter(pk__in=ids[:150])._raw_delete(connection.alias)
+
+        matches = similarity.find_similar(self.student, 10)
+        self.assertEqual([match.pk for match, _ in matches], ids[150:160])
+        self.assertEqual(len(similarity.get_index()), 150)
+
+
+class ActivateVersionTests(TestCase):
+    """Installing a trained version over the served model files."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.models_dir = self.root / 'models'
+        self.backups_dir = self.root / 'backups'
+        self.models_dir.mkdir()
+        for filename in training.ARTIFACT_FILES[:3]:
+            (self.models_dir / filename).write_text(f'served {filename}')
+
+    def make_version(self, name, with_metadata=True):
+        version_dir = self.root / name
+        version_dir.mkdir()
+        for filename in training.ARTIFACT_FILES[:3 + with_metadata]:
+            (version_dir / filename).write_text(f'{name} {filename}')
+        return version_dir
+
+    def served(self):
+        return {path.name: path.read_text() for path in self.models_dir.iterdir()}
+
+    def test_previous_model_is_backed_up_and_restorable(self):
+        original = self.served()
+        backup_dir = training.activate_version(self.make_version('v1'), self.models_dir, self.backups_dir)
+        self.assertEqual(self.served()['metadata.json'], 'v1 metadata.json')
+        self.assertEqual({path.name: path.read_text() for path in backup_dir.iterdir()}, original)
+
+        training.activate_version(backup_dir, self.models_dir, self.backups_dir)
+        # The restored model has no metadata.json, so v1's version must not linger
+        self.assertEqual(self.served(), original)
+
+    def test_failed_copy_leaves_served_model_untouched(self):
+        original = self.served()
+        copyfile = shutil.copyfile
+
+        def fail_on_scaler(source, target, **kwargs):
+            if Path(target).name == '.scaler.pkl.tmp':
+                raise OSError('disk full')
+            return copyfile(source, target, **kwargs)
+
+        with mock.patch('predictions.training.shutil.copyfile', fail_on_scaler):
+            with self.assertRaises(OSError):
+                training.activate_version(self.make_version('v1'), self.models_dir, self.backups_dir)
+        self.assertEqual(self.served(), original)
+
+
+class DriftTests(TestCase):
+    """Running feature statistics and the drift report."""
+
+    def setUp(self):
+        self.addCleanup(drift.monitor.discard)
+        self.rng = np.random.default_rng(13)
+
+    def assertMatchesOnePass(self, stats, rows):
+        self.assertEqual(stats.count, len(rows))
+        np.testing.assert_allclose(stats.mean, rows.mean(axis=0), rtol=1e-10)
+        np.testing.assert_allclose(stats.m2 / (stats.count - 1), rows.var(axis=0, ddof=1), rtol=1e-10)
+        # Underflow and overflow bins on either side of the fixed edges
+        edges = np.concatenate([[-np.inf], drift.HISTOGRAM_EDGES, [np.inf]])
+        for i in range(rows.shape[1]):
+            self.assertEqual(stats.histogram[i].tolist(), np.histogram(rows[:, i], edges)[0].tolist())
+
+    def test_batches_merge_like_one_pass(self):
+        rows = self.rng.normal(0.5, 2.0, size=(1000, 4))
+        stats, other = drift.FeatureStatistics(4), drift.FeatureStatistics(4)
+        for batch in np.split(rows[:600], [1, 50, 51, 400]):
+            stats.update(batch)
+        other.update(rows[600:])
+        stats.merge(other)
+        self.assertMatchesOnePass(stats, rows)
+
+    def test_stored_statistics_merge_with_pending_rows(self):
+        rows = self.rng.normal(size=(300, 3))
+        first, second = drift.FeatureStatistics(3), drift.FeatureStatistics(3)
+        first.update(rows[:120])
+        second.update(rows[120:200])
+        drift.save_statistics('fingerprint', first)
+        drift.save_statistics('fingerprint', second)
+        with override_settings(DRIFT_FLUSH_ROWS=10 ** 9, DRIFT_FLUSH_INTERVAL=3600):
+            drift.monitor.record('fingerprint', rows[200:])
+        self.assertMatchesOnePass(drift.load_statistics('fingerprint', 3), rows)
+
+    def test_report_flags_shifted_features(self):
+        _, scaler, _ = utils.get_models()
+        fingerprint = utils.scaler_fingerprint(scaler)
+        rows = self.rng.normal(size=(2000, len(utils.FEATURE_NAMES)))
+        rows[:, 3] += 1.0
+        rows[:, 5] *= 3.0
+        with override_settings(DRIFT_FLUSH_ROWS=10 ** 9, DRIFT_FLUSH_INTERVAL=3600):
+            drift.monitor.record(fingerprint, rows)
+
+        response = api_client(create_role_users()['Admin']).get('/api/monitoring/drift/')
+        self.assertEqual(response.status_code, 200)
+        report = response.data
+        self.assertEqual(report['count'], 2000)
+        self.assertEqual(report['drifting_features'], [utils.FEATURE_NAMES[3], utils.FEATURE_NAMES[5]])
+        shifted = report['features'][3]
+        self.assertAlmostEqual(shifted['mean_shift'], rows[:, 3].mean())
+        self.assertAlmostEqual(
+            shifted['live_mean'], scaler.mean_[3] + rows[:, 3].mean() * scaler.scale_[3], places=6
+        )
+        self.assertAlmostEqual(report['features'][5]['variance_ratio'], rows[:, 5].var(ddof=1))
+
+
+@override_settings(HISTORY_FLUSH_SIZE=10 ** 6, HISTORY_FLUSH_INTERVAL=3600)
+class HistoryTests(TestCase):
+    """The write-behind buffer behind PredictionLog."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = Student.objects.create(**next(iter_student_rows(1, seed=14)))
+        cls.rows = list(iter_student_rows(3, seed=15))
+
+    def setUp(self):
+        self.buffer = history.WriteBehindBuffer()
+        self.addCleanup(self.buffer.shutdown)
+        patcher = mock.patch.object(history, 'buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def log_predictions(self):
+        single = utils.predict_student_status(self.student.get_feature_dict(), monitor=False)
+        history.log_prediction(single, 2.5, student_id=self.student.pk)
+        batch = utils.predict_feature_matrix(utils.build_feature_matrix({
+            field: [row[field] for row in self.rows] for field in utils.FEATURE_FIELDS.values()
+        }), monitor=False)
+        history.log_batch(batch, 9.0, [self.student.pk, None, None])
+        return single, batch
+
+    def test_flush_writes_buffered_predictions(self):
+        single, batch = self.log_predictions()
+        self.assertFalse(PredictionLog.objects.exists())
+        self.assertEqual(self.buffer.flush(), 4)
+        self.assertEqual(self.buffer.flush(), 0)
+
+        logs = list(PredictionLog.objects.order_by('pk'))
+        self.assertEqual([log.source for log in logs], ['predict', 'upload', 'upload', 'upload'])
+        self.assertEqual([log.student_id for log in logs], [self.student.pk, self.student.pk, None, None])
+        self.assertEqual(logs[0].predicted_class, single['predicted_class'])
+        self.assertAlmostEqual(logs[0].dropout_probability, single['dropout_probability'])
+        self.assertEqual(logs[0].probabilities, single['all_probabilities'])
+        self.assertEqual([log.predicted_class for log in logs[1:]], batch['predicted_class'].tolist())
+        np.testing.assert_allclose([log.dropout_probability for log in logs[1:]], batch['dropout_probability'])
+        self.assertEqual([log.latency_ms for log in logs], [2.5, 3.0, 3.0, 3.0])
+        self.assertEqual({log.model_version for log in logs}, {utils.get_model_version()})
+
+    @override_settings(HISTORY_FLUSH_SIZE=3, BACKGROUND_TASKS_INLINE=True)
+    def test_full_buffer_is_flushed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.log_predictions()
+            self.assertFalse(PredictionLog.objects.exists())
+        self.assertEqual(PredictionLog.objects.count(), 4)
+
+    def test_failed_flush_keeps_entries(self):
+        self.log_predictions()
+        with mock.patch.object(PredictionLog.objects, 'bulk_create', side_effect=OperationalError('locked')):
+            with self.assertLogs('predictions.history', 'ERROR'):
+                self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.flush(), 4)
+        self.assertEqual(PredictionLog.objects.count(), 4)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """The admin changelist paginator when ids have gaps."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_students(20, seed=1)
+        # Leaves 8 rows below a highest id of 20
+        cls.kept = list(Student.objects.order_by('pk').values_list('pk', flat=True))[12:]
+        Student.objects.exclude(pk__in=cls.kept).delete()
+
+    def test_small_tables_are_counted_exactly(self):
+        self.assertEqual(EstimatedCountPaginator(Student.objects.order_by('-id'), 5).count, 8)
+
+    def test_pages_past_the_real_end_show_the_last_page(self):
+        with mock.patch('predictions.admin.ESTIMATED_COUNT_THRESHOLD', 5):
+            paginator = EstimatedCountPaginator(Student.objects.order_by('-id'), 3)
+            self.assertGreater(paginator.count, 8)
+            page = paginator.page(5)
+        self.assertEqual((paginator.count, paginator.num_pages, page.number), (8, 3, 3))
+        self.assertEqual([student.pk for student in page.object_list], self.kept[:2][::-1])
+        self.assertEqual(list(paginator.get_elided_page_range(5)), [1, 2, 3])
+
+    def test_changelist_past_the_real_end(self):
+        self.client.force_login(User.objects.create_superuser('root', password='unused-password'))
+        with mock.patch('predictions.admin.ESTIMATED_COUNT_THRESHOLD', 5), \
+                mock.patch.object(StudentAdmin, 'list_per_page', 3):
+            response = self.client.get('/admin/predictions/student/', {'p': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([student.pk for student in response.context['cl'].result_list], self.kept[:2][::-1])
+
+
+class RendererTests(TestCase):
+    """orjson and MessagePack renderers and parsers."""
+
+    def sample(self):
+        matrix = np.arange(6, dtype=np.float64).reshape(2, 3) / 4
+        return {
+            'probabilities': matrix,
+            'float32': np.array([0.5, 0.25], dtype=np.float32),
+            'counts': np.array([1, 2, 3], dtype=np.int64),
+            # Neither contiguous nor numeric, so orjson hands them to encode_fallback
+            'column': matrix[:, 1],
+            'classes': np.array(['Dropout', 'Graduate']),
+            'scalar': np.int64(7),
+            'created_at': datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+            'grade': decimal.Decimal('12.5'),
+            'label': gettext_lazy('Dropout'),
+            1: 'integer key',
+        }
+
+    def expected(self):
+        return {
+            'probabilities': [[0.0, 0.25, 0.5], [0.75, 1.0, 1.25]],
+            'float32': [0.5, 0.25],
+            'counts': [1, 2, 3],
+            'column': [0.25, 1.0],
+            'classes': ['Dropout', 'Graduate'],
+            'scalar': 7,
+            'created_at': '2026-01-02T03:04:05Z',
+            'grade': 12.5,
+            'label': 'Dropout',
+        }
+
+    @skipUnless(renderers.orjson, 'needs orjson')
+    def test_orjson_round_trip(self):
+        content = renderers.ORJSONRenderer().render(self.sample())
+        data = renderers.ORJSONParser().parse(io.BytesIO(content))
+        self.assertEqual(data, {**self.expected(), '1': 'integer key'})
+        self.assertIn(b'\n  ', renderers.ORJSONRenderer().render({'a': 1}, 'application/json; indent=2'))
+        with self.assertRaises(ParseError):
+            renderers.ORJSONParser().parse(io.BytesIO(b'{"a": '))
+
+    @skipUnless(renderers.msgpack, 'needs msgpack')
+    def test_msgpack_round_trip(self):
+        content = renderers.MessagePackRenderer().render(self.sample())
+        data = renderers.MessagePackParser().parse(io.BytesIO(content))
+        self.assertEqual(data, {**self.expected(), 1: 'integer key'})
+        with self.assertRaises(ParseError):
+            renderers.MessagePackParser().parse(io.BytesIO(b'\xc1'))
+
+    def test_encode_fallback(self):
+        self.assertEqual(renderers.encode_fallback(datetime.timedelta(minutes=1, milliseconds=500)), '60.5')
+        self.assertEqual(renderers.encode_fallback(datetime.date(2026, 1, 2)), '2026-01-02')
+        self.assertEqual(renderers.encode_fallback(b'bytes'), 'bytes')
+        self.assertEqual(renderers.encode_fallback(i for i in range(3)), (0, 1, 2))
+        self.assertEqual(renderers.encode_fallback(np.float32(0.5)), 0.5)
+        with self.assertRaises(TypeError):
+            renderers.encode_fallback(object())
+
+    @skipUnless(renderers.orjson and renderers.msgpack, 'needs orjson and msgpack')
+    def test_api_negotiation(self):
+        client = api_client(create_role_users()['Teacher'])
+        self.addCleanup(history.buffer.discard)
+        self.addCleanup(drift.monitor.discard)
+        payload = renderers.MessagePackRenderer().render(next(iter_student_rows(1, seed=16)))
+        response = client.post(
+            '/api/predict/', payload, content_type='application/msgpack', HTTP_ACCEPT='application/msgpack'
+        )
+        self.assertEqual((response.status_code, response['Content-Type']), (200, 'application/msgpack'))
+        data = renderers.MessagePackParser().parse(io.BytesIO(response.content))
+        self.assertIn(data['predicted_class'], ('Dropout', 'Enrolled', 'Graduate'))
+
+        response = client.post('/api/predict/', next(iter_student_rows(1, seed=16)), format='json')
+        self.assertEqual(response.json()['dropout_probability'], data['dropout_probability'])
+
+
+@override_settings(HEALTH_SELF_TEST_INTERVAL=3600)
+class ProbeTests(TestCase):
+    """/livez, /readyz and the startup warm-up."""
+
+    def setUp(self):
+        self.self_test = health.SelfTest()
+        patcher = mock.patch.object(health, 'self_test', self.self_test)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_livez(self):
+        response = self.client.get('/livez')
+        self.assertEqual((response.status_code, response.json()), (200, {'status': 'alive'}))
+        self.assertEqual(self.client.post('/livez').status_code, 405)
+
+    def test_readyz_when_ready(self):
+        utils.get_models()
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'ready')
+        self.assertEqual(body['model']['version'], utils.get_model_version())
+        self.assertTrue(body['model']['loaded'])
+        self.assertIsNone(body['model']['error'])
+        self.assertTrue(body['self_test']['ok'])
+        self.assertGreater(body['self_test']['latency_ms'], 0)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_readyz_when_the_self_test_fails(self):
+        with mock.patch.object(health, 'predict_feature_matrix', side_effect=FileNotFoundError('model.pkl missing')):
+            with self.assertLogs('predictions.health', 'WARNING'):
+                response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        body = response.json()
+        self.assertEqual(body['status'], 'unavailable')
+        self.assertEqual((body['self_test']['ok'], body['self_test']['error']), (False, 'model.pkl missing'))
+
+    def test_probe_does_not_wait_for_the_warm_up(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_run():
+            started.set()
+            release.wait(5)
+            health.SelfTest.run(self.self_test)
+
+        with mock.patch.object(self.self_test, 'run', slow_run):
+            thread = health.warm_up()
+            started.wait(5)
+            response = self.client.get('/readyz')
+            self.assertEqual(response.status_code, 503)
+            self.assertIsNone(response.json()['self_test'])
+            release.set()
+            thread.join(5)
+        self.assertEqual(self.client.get('/readyz').status_code, 200)
+
+    def test_health_check_needs_authentication(self):
+        self.assertEqual(self.client.get('/api/health/').status_code, 401)
+        response = api_client(create_role_users()['Student']).get('/api/health/')
+        self.assertEqual(response.data, {'status': 'healthy', 'ml_models_loaded': True})
+
+
+class ArchiveTests(TestCase):
+    """Moving a closed term into ArchivedStudent."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_role_users()
+        seed_students(6, seed=1)
+        cls.students = list(Student.objects.order_by('pk'))
+        for student in cls.students[:4]:
+            Student.objects.filter(pk=student.pk).update(term='2024-S1', outcome='Graduate')
+        for student in cls.students:
+            Notification.objects.create(user=cls.users['Teacher'], title='Alert', message='High risk', student=student)
+            PredictionLog.objects.create(
+                student=student, model_version='test', predicted_class='Dropout',
+                dropout_probability=0.9, latency_ms=1.0,
+            )
+
+    def test_related_rows_survive_archiving(self):
+        call_command('archive_students', term=['2024-S1'], chunk_size=3, stdout=io.StringIO())
+
+        archived = [student.pk for student in self.students[:4]]
+        self.assertEqual(sorted(ArchivedStudent.objects.values_list('pk', flat=True)), archived)
+        for model in (Notification, PredictionLog):
+            self.assertEqual(model.objects.count(), 6)
+            self.assertEqual(sorted(model.objects.filter(student=None).values_list('archived_student', flat=True)), archived)
+            self.assertEqual(model.objects.filter(archived_student=None).count(), 2)
+
+    def test_training_reads_archived_outcomes(self):
+        call_command('archive_students', term=['2024-S1'], stdout=io.StringIO())
+
+        ids = np.concatenate([ids for _, _, ids in training.iter_training_chunks(chunk_size=2)])
+        self.assertEqual(sorted(ids.tolist()), [student.pk for student in self.students[:4]])
+
+
+@override_settings(QUERY_BUDGET_MODE='raise', BACKGROUND_TASKS_INLINE=True)
+class QueryBudgetTests(QueryCountAssertions, TestCase):
+    """
+    Query-count regression tests, one per endpoint.
+
+    Requests authenticate with a JWT, as the frontend does, so the counts
+    include loading the user. QUERY_BUDGET_MODE='raise' additionally checks
+    every request against its view's declared budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_role_users()
+        seed_students(20, seed=1)
+        cls.student = Student.objects.order_by('pk').first()
+        cls.student.user = cls.users['Student']
+        cls.student.save()
+        ArchivedStudent.objects.bulk_create([
+            ArchivedStudent(id=100000 + i, term='2024-S1', user=cls.users['Student'],
+                            created_at=cls.student.created_at, updated_at=cls.student.updated_at, **{
+                field: getattr(cls.student, field) for field in STUDENT_FEATURE_FIELDS
+            })
+            for i in range(5)
+        ])
+        for user in cls.users.values():
+            Notification.objects.bulk_create([
+                Notification(user=user, title='Alert', message='High risk', student=cls.student)
+                for _ in range(5)
+            ])
+            SupportTicket.objects.bulk_create([
+                SupportTicket(user=user, subject='Help', message='Question') for _ in range(5)
+            ])
+
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+        index_path = override_settings(SIMILARITY_INDEX_PATH=f'{self.index_dir}/similarity_index.npz')
+        index_path.enable()
+        self.addCleanup(index_path.disable)
+
+    def tearDown(self):
+        similarity._index = None
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+        history.buffer.discard()
+        drift.monitor.discard()
+
+    def client_for(self, role):
+        return api_client(self.users[role])
+
+    def assertRequestQueries(self, limit, role, method, url, data=None, status_code=200, **kwargs):
+        """Make one request and check its status and query count."""
+        client = self.client_for(role)
+        with self.assertMaxQueries(limit):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = getattr(client, method)(url, data, **kwargs)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status_code, getattr(response, 'data', None))
+        return response
+
+    def prediction_payload(self, **extra):
+        return dict({field: getattr(self.student, field) for field in STUDENT_FEATURE_FIELDS}, **extra)
+
+    def test_student_list(self):
+        self.assertRequestQueries(4, 'Teacher', 'get', '/api/students/')
+        self.assertRequestQueries(4, 'Student', 'get', '/api/students/')
+
+    def test_student_list_does_not_grow_with_rows(self):
+        # The student sees their one record, the teacher a full page
+        counts = {}
+        for role in ('Student', 'Teacher'):
+            with self.assertMaxQueries(4) as recorder:
+                response = self.client_for(role).get('/api/students/')
+            counts[len(response.data['results'])] = recorder.count
+        self.assertEqual(counts[1], counts[20])
+
+    def test_student_create(self):
+        self.assertRequestQueries(4, 'Student', 'post', '/api/students/', self.prediction_payload(course=9119),
+                                  format='json', status_code=201)
+
+    def test_at_risk(self):
+        self.assertRequestQueries(3, 'Teacher', 'get', '/api/students/at-risk/', {'limit': 20})
+
+    def test_export(self):
+        self.assertRequestQueries(3, 'Teacher', 'get', '/api/students/export/')
+
+    def test_student_detail(self):
+        url = f'/api/students/{self.student.pk}/'
+        self.assertRequestQueries(3, 'Student', 'get', url)
+        self.assertRequestQueries(5, 'Teacher', 'patch', url, {'course': 9119}, format='json')
+        self.assertRequestQueries(7, 'Teacher', 'delete', url, status_code=204)
+
+    def test_similar_students(self):
+        url = f'/api/students/{self.student.pk}/similar/'
+        # Loading the index is a one-off per process
+        similarity.get_index()
+        self.assertRequestQueries(5, 'Teacher', 'get', url)
+
+    def test_predict(self):
+        self.assertRequestQueries(2, 'Teacher', 'post', '/api/predict/', self.prediction_payload(), format='json')
+        self.assertRequestQueries(4, 'Teacher', 'post', '/api/predict/', self.prediction_payload(save_record=True),
+                                  format='json')
+
+    def test_whatif(self):
+        self.assertRequestQueries(3, 'Teacher', 'post', '/api/predict/whatif/', {
+            'student_id': self.student.pk,
+            'vary': [{'feature': 'curricular_units_2nd_sem_grade', 'values': [10, 12, 14]}],
+        }, format='json')
+
+    def test_class_average(self):
+        self.assertRequestQueries(2, 'Student', 'get', '/api/class-average/')
+
+    def test_archive(self):
+        self.assertRequestQueries(4, 'Teacher', 'get', '/api/archive/students/')
+        self.assertRequestQueries(3, 'Student', 'get', '/api/archive/students/100000/')
+        self.assertRequestQueries(4, 'Teacher', 'get', '/api/archive/terms/')
+
+    def test_monitoring(self):
+        self.assertRequestQueries(3, 'Admin', 'get', '/api/monitoring/drift/')
+        self.assertRequestQueries(2, 'Admin', 'get', '/api/monitoring/admission/')
+        self.assertRequestQueries(2, 'Student', 'get', '/api/monitoring/admission/', status_code=403)
+
+    def test_health(self):
+        self.assertRequestQueries(1, 'Student', 'get', '/api/health/')
+        self.assertRequestQueries(0, 'Student', 'get', '/livez')
+        self.assertRequestQueries(0, 'Student', 'get', '/readyz')
+
+    def test_support_tickets(self):
+        ticket = SupportTicket.objects.filter(user=self.users['Student']).first()
+        self.assertRequestQueries(4, 'Student', 'get', '/api/support/')
+        self.assertRequestQueries(4, 'Admin', 'get', '/api/support/')
+        self.assertRequestQueries(3, 'Student', 'get', f'/api/support/{ticket.pk}/')
+        self.assertRequestQueries(2, 'Student', 'post', '/api/support/', {'subject': 'Help', 'message': 'Again'},
+                                  format='json', status_code=201)
+
+    def test_support_ticket_search(self):
+        student = self.users['Student']
+        best = SupportTicket.objects.create(user=student, subject='Password reset', message='Reset link expired')
+        other = SupportTicket.objects.create(user=student, subject='Grades', message='Please reset my password')
+        SupportTicket.objects.create(user=student, subject='Grades', message='Missing grade', status='Closed')
+        response = self.assertRequestQueries(4, 'Student', 'get', '/api/support/', {'q': 'password RESET!'})
+        self.assertEqual([ticket['id'] for ticket in response.data['results']], [best.pk, other.pk])
+        response = self.assertRequestQueries(4, 'Admin', 'get', '/api/support/', {'q': 'grade', 'status': 'Closed'})
+        self.assertEqual(response.data['count'], 1)
+
+        # The index follows updates, including queryset updates, and deletes
+        SupportTicket.objects.filter(pk=other.pk).update(message='Resolved')
+        best.delete()
+        response = self.client_for('Student').get('/api/support/', {'q': 'password'})
+        self.assertEqual(response.data['count'], 0)
+        self.assertEqual(self.client_for('Student').get('/api/support/', {'q': '"*'}).data['count'], 0)
+
+    def test_notifications(self):
+        notification = Notification.objects.filter(user=self.users['Student']).first()
+        self.assertRequestQueries(3, 'Student', 'get', '/api/notifications/')
+        self.assertRequestQueries(2, 'Student', 'get', '/api/notifications/unread_count/')
+        self.assertRequestQueries(4, 'Student', 'post', f'/api/notifications/{notification.pk}/mark_read/')
+        self.assertRequestQueries(3, 'Student', 'post', '/api/notifications/mark_all_read/')
+
+    def test_register(self):
+        self.assertRequestQueries(6, 'Student', 'post', '/api/register/', {
+            'username': 'new_student', 'password': 'a-Long-password-1', 'email': 'new@example.com',
+        }, format='json', status_code=201)
+
+    def upload(self, rows, seed):
+        """Upload ``rows`` new students; returns the number of queries."""
+        upload = SimpleUploadedFile('students.csv', _csv_payload(rows, seed), content_type='text/csv')
+        with self.assertMaxQueries(50, BatchUploadView.query_repeat_threshold) as recorder:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client_for('Teacher').post('/api/upload/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['inserted_count'], rows)
+        return recorder.count
+
+    def insert_statements(self, rows):
+        """INSERTs bulk_create needs for ``rows`` students; SQLite limits the parameters per statement."""
+        fields = [field for field in Student._meta.concrete_fields if not field.primary_key]
+        return math.ceil(rows / connection.ops.bulk_batch_size(fields, [None] * rows))
+
+    def test_upload(self):
+        # Inside the test transaction the insert's atomic block adds a SAVEPOINT and its RELEASE
+        self.assertLessEqual(self.upload(10, seed=3), 11)
+
+    def test_upload_does_not_grow_with_rows(self):
+        few, many = self.upload(10, seed=3), self.upload(200, seed=4)
+        self.assertEqual(many - few, self.insert_statements(200) - self.insert_statements(10))
+
+    def test_upload_queries_per_chunk(self):
+        one_chunk = self.upload(20, seed=5)
+        with mock.patch.object(BatchUploadView, 'save_chunk_size', 10):
+            two_chunks = self.upload(20, seed=6)
+        # Second live and archived hash lookups and savepoint, and each chunk inserts its own rows
+        self.assertEqual(two_chunks - one_chunk, 4 + 2 * self.insert_statements(10) - self.insert_statements(20))
+
+    def test_over_budget_raises(self):
+        with mock.patch.object(StudentListCreateView, 'query_budget', {'GET': 1}):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'budget 1'):
+                self.client_for('Teacher').get('/api/students/')
+
+    @override_settings(QUERY_BUDGET_MODE='log')
+    def test_over_budget_logs(self):
+        with mock.patch.object(StudentListCreateView, 'query_budget', {'GET': 1}):
+            with self.assertLogs('predictions.querybudget', 'WARNING') as logs:
+                response = self.client_for('Teacher').get('/api/students/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('student-list-create', logs.output[0])
+
+    @override_settings(QUERY_TIMING_HEADER=True)
+    def test_server_timing_header(self):
+        response = self.client_for('Teacher').get('/api/students/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="4 queries"$')
+
+    @override_settings(QUERY_TIMING_HEADER=True)
+    async def test_async_requests_are_counted(self):
+        # Runs in the event loop rather than being adapted through a thread
+        self.assertTrue(iscoroutinefunction(QueryBudgetMiddleware(self.async_client.handler.get_response_async)))
+        cache.clear()
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.users["Student"]).access_token}'}
+        response = await self.async_client.get('/api/notifications/unread_count/', headers=headers)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="2 queries"$')
+
+        # The unread count is cached by now, leaving the user lookup
+        with mock.patch.object(NotificationViewSet, 'query_budget', {'GET': 0}):
+            with self.assertRaisesMessage(QueryBudgetExceeded, '1 queries, budget 0'):
+                await self.async_client.get('/api/notifications/unread_count/', headers=headers)
+
+    @override_settings(NOTIFICATION_STREAM_POLL_INTERVAL=0)
+    async def test_event_stream_is_checked_when_it_opens(self):
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.users["Student"]).access_token}'}
+        response = await self.async_client.get('/api/notifications/stream/', headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        await response.streaming_content.aclose()
+
+        with mock.patch.object(notification_stream, 'query_budget', 0):
+            with self.assertRaisesMessage(QueryBudgetExceeded, '1 queries, budget 0'):
+                await self.async_client.get('/api/notifications/stream/', headers=headers)
+
+    def test_repeated_query_is_reported(self):
+        ids = list(Student.objects.values_list('pk', flat=True)[:5])
+        with self.assertRaisesMessage(AssertionError, '5 repeats of'):
+            with self.assertMaxQueries(10):
+                for pk in ids:
+                    Student.objects.get(pk=pk)
+
+    def test_in_lists_compare_equal(self):
+        self.assertEqual(
+            normalize_sql('SELECT 1 WHERE "id" IN (%s, %s, %s)'),
+            normalize_sql('SELECT 1 WHERE "id" IN (%s)'),
+        )
+
+
+class CompactLinearModelTests(TestCase):
+    """COMPACT_LINEAR_MODELS must score like the float64 path, within float32 rounding."""
+
+    def setUp(self):
+        self.addCleanup(utils.reload_models)
+        self.rows = list(iter_student_rows(200, seed=7))
+        self.features = utils.build_feature_matrix({
+            field: np.array([row[field] for row in self.rows], dtype=np.float64)
+            for field in utils.FEATURE_FIELDS.values()
+        })
+
+    def install_linear_model(self):
+        """Serve a logistic-loss SGDClassifier, as train_model writes, from a temporary models directory."""
+        models_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, models_dir, ignore_errors=True)
+        for name in ('scaler.pkl', 'label_encoder.pkl'):
+            shutil.copyfile(utils.ML_MODELS_DIR / name, models_dir / name)
+        _, scaler, _ = utils.get_models()
+        model = SGDClassifier(loss='log_loss', random_state=0)
+        model.fit(scaler.transform(self.features), np.arange(len(self.features)) % 3)
+        with open(models_dir / 'edupredict_model.pkl', 'wb') as f:
+            pickle.dump(model, f)
+        patcher = mock.patch.object(utils, 'ML_MODELS_DIR', models_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def score(self, compact):
+        with override_settings(COMPACT_LINEAR_MODELS=compact):
+            utils.reload_models()
+            matrix = utils.predict_feature_matrix(self.features, monitor=False)
+            singles = [
+                utils.predict_student_status(
+                    {name: row[field] for name, field in utils.FEATURE_FIELDS.items()}, explain=True, monitor=False
+                )
+                for row in self.rows[:20]
+            ]
+            dtype = utils.get_inference_dtype()
+        return matrix, singles, dtype
+
+    def test_parity_with_float64(self):
+        self.install_linear_model()
+        full, full_singles, full_dtype = self.score(False)
+        compact, compact_singles, compact_dtype = self.score(True)
+        self.assertEqual((full_dtype, compact_dtype), (np.float64, np.float32))
+        self.assertEqual(compact['probabilities'].dtype, np.float32)
+        np.testing.assert_allclose(compact['probabilities'], full['probabilities'], atol=1e-4)
+        np.testing.assert_array_equal(compact['predicted_class'], full['predicted_class'])
+
+        for single, full_single, probability in zip(compact_singles, full_singles, compact['dropout_probability']):
+            self.assertEqual(single['predicted_class'], full_single['predicted_class'])
+            self.assertAlmostEqual(single['dropout_probability'], full_single['dropout_probability'], delta=1e-4)
+            self.assertAlmostEqual(single['dropout_probability'], float(probability), delta=1e-6)
+            self.assertEqual(single['explanation']['method'], 'linear')
+            self.assertEqual(
+                [factor['feature'] for factor in single['explanation']['top_factors']],
+                [factor['feature'] for factor in full_single['explanation']['top_factors']],
+            )
+
+    def test_xgboost_model_is_unchanged(self):
+        full, _, _ = self.score(False)
+        compact, _, dtype = self.score(True)
+        self.assertEqual(dtype, np.float64)
+        np.testing.assert_array_equal(compact['probabilities'], full['probabilities'])
+
+    def test_linear_model_weights(self):
+        _, scaler, _ = utils.get_models()
+        features_scaled = scaler.transform(self.features)
+        outcomes = np.arange(len(features_scaled)) % 3
+        model = SGDClassifier(loss='log_loss', random_state=0).fit(features_scaled, outcomes)
+        expected = model.predict_proba(features_scaled)
+
+        utils._make_compact(model)
+        self.assertEqual(model.coef_.dtype, np.float32)
+        probabilities = model.predict_proba(features_scaled.astype(np.float32))
+        self.assertEqual(probabilities.dtype, np.float32)
+        np.testing.assert_allclose(probabilities, expected, atol=1e-4)
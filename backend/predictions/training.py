@@ -0,0 +1,228 @@
+"""
+Out-of-Core Model Training
+
+Retrains the dropout model from Student and ArchivedStudent rows with a
+recorded outcome without loading the tables into memory: rows are streamed
+in primary key order in fixed-size chunks, the StandardScaler is fitted
+incrementally with ``partial_fit`` in a first pass, and a logistic-loss
+SGDClassifier is trained with ``partial_fit`` over one or more further
+passes. The one-vs-rest binary problems are fitted in parallel across cores.
+
+Every run writes a new version directory holding the three pickles
+``load_models()`` expects plus ``metadata.json``. Activating a version first
+copies the served files to a directory under BACKUPS_DIR, so any earlier
+model, including one trained elsewhere, can be activated again. Students whose id is a
+multiple of VALIDATION_MODULUS are held out to report accuracy.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from .conditional import bump_data_version
+from .models import OUTCOME_CHOICES, ArchivedStudent, Student
+from .utils import FEATURE_FIELDS, FEATURE_NAMES, ML_MODELS_DIR, build_feature_matrix
+
+TRAINING_CHUNK_SIZE = 10000
+
+# Every tenth student (by id) is kept out of training for validation
+VALIDATION_MODULUS = 10
+
+VERSIONS_DIR = ML_MODELS_DIR / 'versions'
+
+# Served artifacts replaced by activate_version, one directory per activation
+BACKUPS_DIR = VERSIONS_DIR / 'backups'
+
+ARTIFACT_FILES = ('edupredict_model.pkl', 'scaler.pkl', 'label_encoder.pkl', 'metadata.json')
+
+
+class TrainingError(Exception):
+    """Raised when a model cannot be trained from the current data."""
+
+
+def iter_training_chunks(chunk_size=TRAINING_CHUNK_SIZE):
+    """
+    Yield (features, outcomes, ids) for students with a recorded outcome,
+    live ones first, then archived ones.
+
+    Reads ``chunk_size`` rows per query with keyset pagination on the
+    primary key, so memory does not grow with the tables. Archived students
+    keep their id, so ids stay unique across both.
+    """
+    fields = list(FEATURE_FIELDS.values())
+    for model in (Student, ArchivedStudent):
+        after_id = 0
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=after_id, outcome__isnull=False)
+                .order_by('pk')
+                .values_list('pk', 'outcome', *fields)[:chunk_size]
+            )
+            if not rows:
+                break
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            outcomes = np.array([row[1] for row in rows])
+            values = np.array([row[2:] for row in rows], dtype=np.float64)
+            columns = {field: values[:, i] for i, field in enumerate(fields)}
+            yield build_feature_matrix(columns), outcomes, ids
+            after_id = int(ids[-1])
+
+
+def _split(features, outcomes, ids):
+    validation = ids % VALIDATION_MODULUS == 0
+    return (features[~validation], outcomes[~validation]), (features[validation], outcomes[validation])
+
+
+def train_model(epochs=5, chunk_size=TRAINING_CHUNK_SIZE, alpha=1e-4, seed=0, n_jobs=-1, log=None):
+    """
+    Train a scaler and classifier from the live and archived students.
+
+    Args:
+        epochs: Passes of SGD over the training rows.
+        chunk_size: Rows read and fitted at a time.
+        alpha: L2 regularisation strength of the classifier.
+        seed: Seed for the classifier and per-chunk shuffling.
+        n_jobs: Cores used for the one-vs-rest fits (-1 for all).
+        log: Optional callable receiving progress messages.
+
+    Returns:
+        Tuple of (model, scaler, label_encoder, metadata dict).
+
+    Raises:
+        TrainingError: if there are no labelled students to train on.
+    """
+    log = log or (lambda message: None)
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+
+    label_encoder = LabelEncoder().fit([value for value, _ in OUTCOME_CHOICES])
+    classes = np.arange(len(label_encoder.classes_))
+
+    scaler = StandardScaler()
+    train_rows = validation_rows = 0
+    for features, outcomes, ids in iter_training_chunks(chunk_size):
+        (train_features, _), (validation_features, _) = _split(features, outcomes, ids)
+        if len(train_features):
+            scaler.partial_fit(train_features)
+        train_rows += len(train_features)
+        validation_rows += len(validation_features)
+    if not train_rows:
+        raise TrainingError('No students with a recorded outcome to train on.')
+    log(f'Fitted scaler on {train_rows} rows ({validation_rows} held out)')
+
+    model = SGDClassifier(loss='log_loss', alpha=alpha, random_state=seed, n_jobs=n_jobs)
+    fit_started = time.perf_counter()
+    for epoch in range(1, epochs + 1):
+        for features, outcomes, ids in iter_training_chunks(chunk_size):
+            (train_features, train_outcomes), _ = _split(features, outcomes, ids)
+            if not len(train_features):
+                continue
+            order = rng.permutation(len(train_features))
+            model.partial_fit(
+                scaler.transform(train_features[order]),
+                label_encoder.transform(train_outcomes[order]),
+                classes=classes,
+            )
+        log(f'Epoch {epoch}/{epochs} done')
+    fit_seconds = time.perf_counter() - fit_started
+
+    correct = 0
+    if validation_rows:
+        for features, outcomes, ids in iter_training_chunks(chunk_size):
+            _, (validation_features, validation_outcomes) = _split(features, outcomes, ids)
+            if len(validation_features):
+                predictions = model.predict(scaler.transform(validation_features))
+                correct += int((predictions == label_encoder.transform(validation_outcomes)).sum())
+
+    wall_seconds = time.perf_counter() - started
+    metadata = {
+        'trained_at': datetime.now(timezone.utc).isoformat(),
+        'estimator': 'SGDClassifier',
+        'params': {'loss': 'log_loss', 'alpha': alpha, 'epochs': epochs, 'chunk_size': chunk_size, 'seed': seed},
+        'feature_names': FEATURE_NAMES,
+        'classes': list(label_encoder.classes_),
+        'train_rows': train_rows,
+        'validation_rows': validation_rows,
+        'validation_accuracy': correct / validation_rows if validation_rows else None,
+        'fit_rows_per_sec': train_rows * epochs / fit_seconds if fit_seconds else None,
+        'wall_seconds': wall_seconds,
+    }
+    return model, scaler, label_encoder, metadata
+
+
+def _timestamp():
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+
+
+def save_artifacts(model, scaler, label_encoder, metadata, versions_dir=VERSIONS_DIR):
+    """
+    Write a new version directory named after the training time.
+
+    Returns:
+        Path of the version directory.
+    """
+    version = _timestamp()
+    metadata = dict(metadata, version=version)
+    version_dir = versions_dir / version
+    version_dir.mkdir(parents=True)
+
+    for filename, obj in (
+        ('edupredict_model.pkl', model),
+        ('scaler.pkl', scaler),
+        ('label_encoder.pkl', label_encoder),
+    ):
+        with open(version_dir / filename, 'wb') as f:
+            pickle.dump(obj, f)
+    with open(version_dir / 'metadata.json', 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return version_dir
+
+
+def activate_version(version_dir, models_dir=ML_MODELS_DIR, backups_dir=BACKUPS_DIR):
+    """
+    Copy a version's artifacts over the ones ``load_models()`` reads.
+
+    The served files are first copied to a new directory under
+    ``backups_dir``, which can itself be activated to roll back. Every new
+    file is then staged next to its target before any of them is swapped in
+    with ``os.replace``, so a failed copy leaves the served model untouched.
+    Running processes keep their loaded model until they restart.
+
+    Returns:
+        Path of the backup directory, or None if no model was installed.
+    """
+    backup_dir = None
+    current = [models_dir / filename for filename in ARTIFACT_FILES if (models_dir / filename).exists()]
+    if current:
+        backup_dir = backups_dir / _timestamp()
+        backup_dir.mkdir(parents=True)
+        for path in current:
+            shutil.copy2(path, backup_dir / path.name)
+
+    staged = []
+    try:
+        for filename in ARTIFACT_FILES:
+            source = version_dir / filename
+            if not source.exists():
+                continue
+            temp_path = models_dir / f'.{filename}.tmp'
+            staged.append((temp_path, models_dir / filename))
+            shutil.copyfile(source, temp_path)
+    except BaseException:
+        for temp_path, _ in staged:
+            temp_path.unlink(missing_ok=True)
+        raise
+    for temp_path, target in staged:
+        os.replace(temp_path, target)
+    if not (version_dir / 'metadata.json').exists():
+        # Otherwise the previous model's version would still be reported
+        (models_dir / 'metadata.json').unlink(missing_ok=True)
+    bump_data_version('models')
+    return backup_dir
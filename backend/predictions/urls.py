@@ -1,17 +1,28 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views, views_auth, views_support
+from . import views, views_archive, views_auth, views_support, views_stream
 
 router = DefaultRouter()
 router.register(r'support', views_support.SupportTicketViewSet, basename='support')
 router.register(r'notifications', views_support.NotificationViewSet, basename='notifications')
 
 urlpatterns = [
+    # Must precede the router, which would treat "stream" as a notification id
+    path('notifications/stream/', views_stream.notification_stream, name='notification-stream'),
     path('', include(router.urls)),
     path('predict/', views.PredictView.as_view(), name='predict'),
+    path('predict/whatif/', views.WhatIfView.as_view(), name='predict-whatif'),
     path('students/', views.StudentListCreateView.as_view(), name='student-list-create'),
+    path('students/at-risk/', views.AtRiskStudentsView.as_view(), name='student-at-risk'),
+    path('students/export/', views.StudentExportView.as_view(), name='student-export'),
     path('students/<int:pk>/', views.StudentDetailView.as_view(), name='student-detail'),
+    path('students/<int:pk>/similar/', views.SimilarStudentsView.as_view(), name='student-similar'),
+    path('archive/students/', views_archive.ArchivedStudentListView.as_view(), name='archived-student-list'),
+    path('archive/students/<int:pk>/', views_archive.ArchivedStudentDetailView.as_view(), name='archived-student-detail'),
+    path('archive/terms/', views_archive.ArchiveTermsView.as_view(), name='archive-terms'),
     path('class-average/', views.ClassAverageView.as_view(), name='class-average'),
+    path('monitoring/drift/', views.DriftReportView.as_view(), name='drift-report'),
+    path('monitoring/admission/', views.AdmissionMetricsView.as_view(), name='admission-metrics'),
     path('health/', views.health_check, name='health-check'),
     path('register/', views_auth.RegisterView.as_view(), name='register'),
     path('upload/', views.BatchUploadView.as_view(), name='batch-upload'),
@@ -5,11 +5,20 @@ This module handles loading of pre-trained ML models and provides
 the prediction interface for the API.
 """
 
+import hashlib
+import json
 import os
 import pickle
+import threading
+import time
 import numpy as np
 from pathlib import Path
 
+from django.conf import settings
+
+from .conditional import bump_data_version
+from .drift import monitor as drift_monitor
+
 # Path to the ML models directory
 ML_MODELS_DIR = Path(__file__).parent / 'ml_models'
 
@@ -17,6 +26,15 @@ ML_MODELS_DIR = Path(__file__).parent / 'ml_models'
 _model = None
 _scaler = None
 _label_encoder = None
+_explainer = None
+_scaler_fingerprint = None
+_model_version = None
+
+# Outcome of the last load attempt, kept in memory so health probes never touch the disk
+_model_state = {'loaded': False, 'loaded_at': None, 'error': None}
+
+# Per-thread raw and scaled feature rows reused by predict_student_status
+_row_buffers = threading.local()
 
 # Feature names in the exact order expected by the model
 FEATURE_NAMES = [
@@ -58,19 +76,106 @@ FEATURE_NAMES = [
     'Grade_Trend',  # Engineered feature: 2nd sem grade - 1st sem grade
 ]
 
+# Student model field holding each raw model feature (Grade_Trend is derived)
+FEATURE_FIELDS = {
+    'Marital status': 'marital_status',
+    'Application mode': 'application_mode',
+    'Application order': 'application_order',
+    'Course': 'course',
+    'Daytime/evening attendance': 'daytime_evening_attendance',
+    'Previous qualification': 'previous_qualification',
+    'Nacionality': 'nationality',
+    "Mother's qualification": 'mothers_qualification',
+    "Father's qualification": 'fathers_qualification',
+    "Mother's occupation": 'mothers_occupation',
+    "Father's occupation": 'fathers_occupation',
+    'Displaced': 'displaced',
+    'Educational special needs': 'educational_special_needs',
+    'Debtor': 'debtor',
+    'Tuition fees up to date': 'tuition_fees_up_to_date',
+    'Gender': 'gender',
+    'Scholarship holder': 'scholarship_holder',
+    'Age at enrollment': 'age_at_enrollment',
+    'International': 'international',
+    'Curricular units 1st sem (credited)': 'curricular_units_1st_sem_credited',
+    'Curricular units 1st sem (enrolled)': 'curricular_units_1st_sem_enrolled',
+    'Curricular units 1st sem (evaluations)': 'curricular_units_1st_sem_evaluations',
+    'Curricular units 1st sem (approved)': 'curricular_units_1st_sem_approved',
+    'Curricular units 1st sem (grade)': 'curricular_units_1st_sem_grade',
+    'Curricular units 1st sem (without evaluations)': 'curricular_units_1st_sem_without_evaluations',
+    'Curricular units 2nd sem (credited)': 'curricular_units_2nd_sem_credited',
+    'Curricular units 2nd sem (enrolled)': 'curricular_units_2nd_sem_enrolled',
+    'Curricular units 2nd sem (evaluations)': 'curricular_units_2nd_sem_evaluations',
+    'Curricular units 2nd sem (approved)': 'curricular_units_2nd_sem_approved',
+    'Curricular units 2nd sem (grade)': 'curricular_units_2nd_sem_grade',
+    'Curricular units 2nd sem (without evaluations)': 'curricular_units_2nd_sem_without_evaluations',
+    'Unemployment rate': 'unemployment_rate',
+    'Inflation rate': 'inflation_rate',
+    'GDP': 'gdp',
+}
+
+# Dropout probability above which a student is flagged as high risk
+HIGH_RISK_THRESHOLD = 0.7
+
+# Number of features reported by explanations
+EXPLANATION_TOP_K = 5
+
 
 def load_models():
     """
     Load the ML models from pickle files.
     Models are loaded only once and cached globally.
     """
-    global _model, _scaler, _label_encoder
+    try:
+        models = _load_artifacts()
+    except Exception as e:
+        _set_model_state(loaded=False, error=str(e))
+        raise
+    if not _model_state['loaded']:
+        _set_model_state(loaded=True, loaded_at=time.time(), error=None)
+    return models
+
+
+def _set_model_state(**state):
+    changed = state.get('loaded') != _model_state['loaded'] or state.get('error') != _model_state['error']
+    _model_state.update(state)
+    if changed:
+        # /api/health/ responses are validated against the 'models' data version
+        bump_data_version('models')
+
+
+def reload_models():
+    """
+    Drop the loaded models and read them again from ML_MODELS_DIR, e.g.
+    after ``activate_version``.
+    """
+    global _model, _scaler, _label_encoder, _explainer, _scaler_fingerprint, _model_version
+    _model = _scaler = _label_encoder = _explainer = _scaler_fingerprint = _model_version = None
+    _model_state.update(loaded=False, loaded_at=None)
+    return load_models()
+
+
+def get_model_state() -> dict:
+    """
+    In-memory state of the model, without loading it.
+    
+    Returns:
+        Dictionary with 'loaded', 'loaded_at' (epoch seconds), 'error' of the
+        last failed load and the model 'version'.
+    """
+    return dict(_model_state, version=_model_version)
+
+
+def _load_artifacts():
+    global _model, _scaler, _label_encoder, _explainer, _scaler_fingerprint, _model_version
     
     if _model is None:
         model_path = ML_MODELS_DIR / 'edupredict_model.pkl'
         if model_path.exists():
             with open(model_path, 'rb') as f:
                 _model = pickle.load(f)
+            if getattr(settings, 'COMPACT_LINEAR_MODELS', False):
+                _make_compact(_model)
         else:
             raise FileNotFoundError(f"Model file not found at {model_path}")
     
@@ -90,9 +195,129 @@ def load_models():
         else:
             raise FileNotFoundError(f"Label encoder file not found at {encoder_path}")
     
+    if _explainer is None:
+        _explainer = _build_explainer(_model, _get_dropout_index(_label_encoder))
+    
+    if _scaler_fingerprint is None:
+        _scaler_fingerprint = scaler_fingerprint(_scaler)
+    
+    if _model_version is None:
+        _model_version = _read_model_version()
+    
     return _model, _scaler, _label_encoder
 
 
+def get_inference_dtype():
+    """
+    dtype of the scaled features handed to the model: float32 for a linear
+    model whose weights COMPACT_LINEAR_MODELS converted, float64 otherwise.
+    
+    Raw features are always scaled in float64. XGBoost models are left as
+    they are: their trees are float32 already, and their split thresholds are
+    float32 values of scaled training rows, so scaling in float32 would move
+    inputs that sit on a threshold to the other side.
+    """
+    coef = getattr(_model, 'coef_', None)
+    return np.float32 if isinstance(coef, np.ndarray) and coef.dtype == np.float32 else np.float64
+
+
+def to_model_input(features_scaled: np.ndarray) -> np.ndarray:
+    """Scaled features in the inference dtype, without a copy when they already are."""
+    return features_scaled.astype(get_inference_dtype(), copy=False)
+
+
+def _make_compact(model):
+    """
+    Convert a linear model's weights to float32, in place, so it scores
+    float32 input in float32. Other estimators are left unchanged.
+    Takes effect for a loaded model after ``reload_models()``.
+    """
+    for attribute in ('coef_', 'intercept_'):
+        value = getattr(model, attribute, None)
+        if isinstance(value, np.ndarray) and value.dtype == np.float64:
+            setattr(model, attribute, value.astype(np.float32))
+
+
+def _read_model_version():
+    """
+    Version of the installed model: the one recorded by train_model in
+    metadata.json, or a hash of the model file for models trained elsewhere.
+    """
+    metadata_path = ML_MODELS_DIR / 'metadata.json'
+    if metadata_path.exists():
+        with open(metadata_path) as f:
+            version = json.load(f).get('version')
+        if version:
+            return version
+    with open(ML_MODELS_DIR / 'edupredict_model.pkl', 'rb') as f:
+        return 'sha1-' + hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def get_model_version() -> str:
+    """Version identifier of the loaded model, recorded with each logged prediction."""
+    if _model_version is None:
+        load_models()
+    return _model_version
+
+
+def _get_dropout_index(label_encoder):
+    class_names = list(label_encoder.classes_)
+    return class_names.index('Dropout') if 'Dropout' in class_names else 0
+
+
+def _build_explainer(model, dropout_idx):
+    """
+    Prepare a vectorized per-feature contribution function for the loaded estimator.
+    
+    Returns:
+        Tuple of (method name, function) where the function maps scaled
+        features of shape (n_rows, n_features) to (contributions, base values)
+        towards the Dropout class in log-odds, or None if the estimator type
+        is not supported.
+    """
+    if hasattr(model, 'get_booster'):
+        # Gradient boosted trees: per-tree path contributions (Saabas),
+        # computed natively by XGBoost for the whole matrix at once
+        import xgboost
+        booster = model.get_booster()
+        
+        def tree_path_contributions(features_scaled):
+            contributions = booster.predict(
+                xgboost.DMatrix(features_scaled), pred_contribs=True, approx_contribs=True
+            )
+            if contributions.ndim == 3:
+                contributions = contributions[:, dropout_idx, :]
+            return contributions[:, :-1], contributions[:, -1]
+        
+        return 'tree_path', tree_path_contributions
+    
+    if hasattr(model, 'coef_'):
+        # Linear models: coefficient x scaled value. StandardScaler centres the
+        # training data, so the background mean in scaled space is zero.
+        coef = np.atleast_2d(model.coef_)
+        intercept = np.atleast_1d(model.intercept_)
+        if coef.shape[0] == 1:
+            sign = -1.0 if dropout_idx == 0 else 1.0
+            weights, base_value = sign * coef[0], sign * intercept[0]
+        else:
+            weights, base_value = coef[dropout_idx], intercept[dropout_idx]
+        
+        def linear_contributions(features_scaled):
+            return features_scaled * weights, np.full(len(features_scaled), base_value)
+        
+        return 'linear', linear_contributions
+    
+    return None
+
+
+def scaler_fingerprint(scaler) -> str:
+    """Identify a fitted scaler, so data derived from an older one can be told apart."""
+    digest = hashlib.sha1()
+    for attribute in ('mean_', 'scale_'):
+        digest.update(np.ascontiguousarray(getattr(scaler, attribute, np.empty(0)), dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
 def get_models():
     """Get the loaded models, loading them if necessary."""
     global _model, _scaler, _label_encoder
@@ -101,19 +326,45 @@ def get_models():
     return _model, _scaler, _label_encoder
 
 
-def predict_student_status(data: dict) -> dict:
+def build_feature_vector(data: dict) -> list:
+    """
+    Build one row of model features, in FEATURE_NAMES order, from a
+    dictionary keyed by dataset feature name. Grade_Trend is computed here.
+    """
+    # Calculate the engineered feature: Grade_Trend
+    grade_1st_sem = data.get('Curricular units 1st sem (grade)', 0)
+    grade_2nd_sem = data.get('Curricular units 2nd sem (grade)', 0)
+    grade_trend = grade_2nd_sem - grade_1st_sem
+    
+    # Build the feature array in the correct order
+    features = []
+    for feature_name in FEATURE_NAMES[:-1]:  # All except Grade_Trend
+        value = data.get(feature_name, 0)
+        features.append(float(value) if value is not None else 0.0)
+    
+    # Add the engineered feature
+    features.append(grade_trend)
+    return features
+
+
+def predict_student_status(data: dict, explain: bool = False, monitor: bool = True) -> dict:
     """
     Predict student dropout status based on input features.
     
     Args:
         data: Dictionary containing the 36 raw feature values.
               Keys should match the feature names in the dataset.
+        explain: Also return the features contributing most to the
+                 dropout prediction.
+        monitor: Feed the features to the drift monitor. Turn off for
+                 synthetic inputs such as what-if scenarios.
     
     Returns:
         Dictionary with:
             - 'predicted_class': The predicted class name (Dropout/Enrolled/Graduate)
             - 'dropout_probability': Probability of dropout (float 0-1)
             - 'all_probabilities': Dict of all class probabilities
+            - 'explanation': Only when explain is set, see explain_feature_matrix
     """
     try:
         model, scaler, label_encoder = get_models()
@@ -124,29 +375,22 @@ def predict_student_status(data: dict) -> dict:
             'dropout_probability': None,
         }
     
-    # Calculate the engineered feature: Grade_Trend
-    grade_1st_sem = data.get('Curricular units 1st sem (grade)', 0)
-    grade_2nd_sem = data.get('Curricular units 2nd sem (grade)', 0)
-    grade_trend = grade_2nd_sem - grade_1st_sem
-    
-    # Build the feature array in the correct order
-    features = []
-    for feature_name in FEATURE_NAMES[:-1]:  # All except Grade_Trend
-        value = data.get(feature_name, 0)
-        features.append(float(value) if value is not None else 0.0)
-    
-    # Add the engineered feature
-    features.append(grade_trend)
+    features = build_feature_vector(data)
+    grade_trend = features[-1]
     
-    # Convert to numpy array and reshape for single prediction
-    features_array = np.array(features).reshape(1, -1)
+    # Fill this thread's preallocated rows instead of allocating new arrays
+    features_array, features_scaled = _get_row_buffers()
+    features_array[0] = features
     
-    # Scale the features
-    features_scaled = scaler.transform(features_array)
+    # Scale the features in place in the second row
+    np.copyto(features_scaled, features_array)
+    features_scaled = scaler.transform(features_scaled, copy=False)
+    if monitor:
+        drift_monitor.record(_scaler_fingerprint, features_scaled)
     
-    # Make prediction
-    prediction = model.predict(features_scaled)[0]
-    probabilities = model.predict_proba(features_scaled)[0]
+    # Make prediction; model.predict would run predict_proba a second time
+    probabilities = model.predict_proba(to_model_input(features_scaled))[0]
+    prediction = model.classes_[probabilities.argmax()]
     
     # Decode the prediction
     predicted_class = label_encoder.inverse_transform([prediction])[0]
@@ -159,15 +403,145 @@ def predict_student_status(data: dict) -> dict:
     dropout_idx = list(class_names).index('Dropout') if 'Dropout' in class_names else 0
     dropout_probability = float(probabilities[dropout_idx])
     
-    return {
+    result = {
         'predicted_class': predicted_class,
         'dropout_probability': dropout_probability,
         'all_probabilities': prob_dict,
         'grade_trend': grade_trend,
     }
+    if explain:
+        result['explanation'] = explain_feature_matrix(features_array)[0]
+    return result
+
 
+def _get_row_buffers():
+    """This thread's (raw, scaled) single-row float64 buffers."""
+    buffers = getattr(_row_buffers, 'buffers', None)
+    if buffers is None:
+        buffers = _row_buffers.buffers = (np.empty((1, len(FEATURE_NAMES))), np.empty((1, len(FEATURE_NAMES))))
+    return buffers
 
-def check_models_available() -> bool:
-    """Check if all required model files are present."""
-    required_files = ['edupredict_model.pkl', 'scaler.pkl', 'label_encoder.pkl']
-    return all((ML_MODELS_DIR / f).exists() for f in required_files)
+
+def build_feature_matrix(columns: dict) -> np.ndarray:
+    """
+    Assemble the model's feature matrix from whole columns.
+    
+    Args:
+        columns: Dictionary mapping Student field names to equal-length
+                 numeric arrays.
+    
+    Returns:
+        Array of shape (n_rows, len(FEATURE_NAMES)), including Grade_Trend.
+    """
+    first = np.asarray(columns['curricular_units_1st_sem_grade'], dtype=np.float64)
+    features = np.empty((len(first), len(FEATURE_NAMES)), dtype=np.float64)
+    for i, feature_name in enumerate(FEATURE_NAMES[:-1]):
+        features[:, i] = columns[FEATURE_FIELDS[feature_name]]
+    features[:, -1] = features[:, FEATURE_NAMES.index('Curricular units 2nd sem (grade)')] - first
+    return features
+
+
+def predict_feature_matrix(features: np.ndarray, monitor: bool = True) -> dict:
+    """
+    Score many students with one vectorized call.
+    
+    Args:
+        features: Array of shape (n_rows, len(FEATURE_NAMES)) as returned by
+                  build_feature_matrix.
+        monitor: Feed the rows to the drift monitor.
+    
+    Returns:
+        Dictionary with:
+            - 'predicted_class': Array of predicted class names
+            - 'dropout_probability': Array of dropout probabilities
+            - 'probabilities': Array of shape (n_rows, n_classes)
+            - 'class_names': Class names matching the probability columns
+    """
+    model, scaler, label_encoder = get_models()
+    
+    features_scaled = scaler.transform(features)
+    if monitor:
+        drift_monitor.record(_scaler_fingerprint, features_scaled)
+    probabilities = model.predict_proba(to_model_input(features_scaled))
+    predictions = model.classes_[probabilities.argmax(axis=1)]
+    
+    class_names = label_encoder.classes_
+    dropout_idx = list(class_names).index('Dropout') if 'Dropout' in class_names else 0
+    
+    return {
+        'predicted_class': label_encoder.inverse_transform(predictions),
+        'dropout_probability': probabilities[:, dropout_idx],
+        'probabilities': probabilities,
+        'class_names': class_names,
+    }
+
+
+def explain_feature_matrix(features: np.ndarray, top_k: int = EXPLANATION_TOP_K) -> list:
+    """
+    Explain the dropout probability of each row by its largest feature contributions.
+    
+    Contributions are in log-odds towards the Dropout class: positive values
+    raise the risk, negative values lower it. They are computed for all rows
+    in one vectorized call with the method cached for the loaded estimator.
+    
+    Args:
+        features: Array of shape (n_rows, len(FEATURE_NAMES)).
+        top_k: Number of features to report per row.
+    
+    Returns:
+        One dictionary per row with 'method', 'base_value' and 'top_factors'
+        (feature, raw value and contribution), or None per row if the
+        estimator type is not supported.
+    """
+    _, scaler, _ = get_models()
+    if _explainer is None:
+        return [None] * len(features)
+    
+    method, contributions_for = _explainer
+    contributions, base_values = contributions_for(to_model_input(scaler.transform(features)))
+    top_k = min(top_k, contributions.shape[1])
+    top = np.argsort(-np.abs(contributions), axis=1)[:, :top_k]
+    
+    return [
+        {
+            'method': method,
+            'base_value': float(base_values[i]),
+            'top_factors': [
+                {
+                    'feature': FEATURE_NAMES[j],
+                    'value': float(features[i, j]),
+                    'contribution': float(contributions[i, j]),
+                }
+                for j in top[i]
+            ],
+        }
+        for i in range(len(features))
+    ]
+
+
+def build_scenario_grid(base_features, axes) -> tuple:
+    """
+    Expand one student's features into a grid of what-if scenarios.
+    
+    Args:
+        base_features: One row of features in FEATURE_NAMES order, as
+                       returned by build_feature_vector.
+        axes: List of (feature name, values) pairs; every combination of
+              the values becomes one row.
+    
+    Returns:
+        Tuple of (features, shape): an array of shape (n_scenarios,
+        len(FEATURE_NAMES)) with Grade_Trend recomputed for every row, and
+        the grid shape to reshape per-row results into.
+    """
+    shape = tuple(len(values) for _, values in axes)
+    mesh = np.meshgrid(*[np.asarray(values, dtype=np.float64) for _, values in axes], indexing='ij')
+    
+    features = np.tile(np.asarray(base_features, dtype=np.float64), (int(np.prod(shape)), 1))
+    for (feature_name, _), grid_values in zip(axes, mesh):
+        features[:, FEATURE_NAMES.index(feature_name)] = grid_values.ravel()
+    
+    first = FEATURE_NAMES.index('Curricular units 1st sem (grade)')
+    second = FEATURE_NAMES.index('Curricular units 2nd sem (grade)')
+    features[:, -1] = features[:, second] - features[:, first]
+    return features, shape
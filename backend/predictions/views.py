@@ -1,18 +1,108 @@
+import time
+
+import numpy as np
 from rest_framework import status, generics, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
 from django.db.models import Avg
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
 
-from .models import Student
+from .models import ArchivedStudent, Student, STUDENT_FEATURE_FIELDS, compute_content_hash
 from .serializers import (
     StudentSerializer,
+    AtRiskStudentSerializer,
     StudentCreateSerializer,
     PredictionInputSerializer,
     PredictionOutputSerializer,
+    WhatIfSerializer,
+)
+from .utils import (
+    predict_student_status,
+    build_feature_matrix,
+    predict_feature_matrix,
+    build_feature_vector,
+    explain_feature_matrix,
+    build_scenario_grid,
+    get_models,
+    scaler_fingerprint,
+    FEATURE_FIELDS,
+    FEATURE_NAMES,
+    HIGH_RISK_THRESHOLD,
 )
-from .utils import predict_student_status, check_models_available
-from .permissions import IsAdminUser, IsTeacherOrAdmin, IsOwnerOrTeacherOrAdmin
+from .permissions import IsAdminUser, IsTeacherOrAdmin, IsOwnerOrTeacherOrAdmin, get_group_names
+from . import exporters, importers
+from .notifications import schedule_high_risk_fan_out
+from .similarity import find_similar
+from .drift import drift_report
+from .history import log_batch, log_prediction
+from .events import publish_batch_progress
+from .conditional import bump_data_version, conditional_on
+from .querybudget import query_budget
+from .health import readiness
+from .admission import (
+    BATCH, INTERACTIVE, Overloaded, PredictRateThrottle, UploadRateThrottle, admission_metrics, admit,
+)
+
+
+# Query parameters accepted by the student list and export endpoints
+STUDENT_FILTERS = {
+    'course': 'course',
+    'last_prediction': 'last_prediction',
+    'min_dropout_probability': 'last_dropout_probability__gte',
+    'max_dropout_probability': 'last_dropout_probability__lte',
+    'created_after': 'created_at__gte',
+    'created_before': 'created_at__lte',
+    'term': 'term',
+}
+
+
+def get_visible_students(user, model=Student):
+    """Admins and teachers see all student records (live or archived), everyone else only their own."""
+    if user.is_superuser or get_group_names(user) & {'Admin', 'Teacher'}:
+        return model.objects.all()
+    return model.objects.filter(user=user)
+
+
+def filter_students(queryset, params):
+    """Apply the STUDENT_FILTERS query parameters present in ``params``."""
+    lookups = {
+        lookup: params[param]
+        for param, lookup in STUDENT_FILTERS.items()
+        if params.get(param) not in (None, '')
+    }
+    try:
+        return queryset.filter(**lookups)
+    except (ValueError, DjangoValidationError):
+        raise ValidationError({'error': f'Invalid filter value in: {", ".join(sorted(lookups))}'})
+
+
+def get_limit_param(params, name, default, maximum):
+    """Read a positive integer query parameter bounded by ``maximum``."""
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= maximum:
+        raise ValidationError({'error': f'{name} must be between 1 and {maximum}'})
+    return limit
+
+
+def explain_requested(request, data=None):
+    """True if ``explain`` is set in the query string or the given request data."""
+    value = request.query_params.get('explain')
+    if value is None and data is not None:
+        value = data.get('explain')
+    return str(value).lower() in ('true', '1', 'yes')
 
 
 class PredictView(APIView):
@@ -21,6 +111,9 @@ class PredictView(APIView):
     Accepts JSON student data and returns dropout prediction.
     """
     permission_classes = [permissions.IsAuthenticated, IsTeacherOrAdmin]
+    throttle_classes = [PredictRateThrottle]
+    # User, groups, and the duplicate lookup and INSERT of save_record
+    query_budget = 4
     
     def post(self, request):
         serializer = PredictionInputSerializer(data=request.data)
@@ -28,23 +121,20 @@ class PredictView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if models are available
-        if not check_models_available():
-            return Response(
-                {'error': 'ML models not found. Please ensure model.pkl, scaler.pkl, and label_encoder.pkl are in the ml_models directory.'},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
-            )
-        
         # Convert to model format and predict
         model_data = serializer.to_model_format()
-        result = predict_student_status(model_data)
+        explain = serializer.validated_data.get('explain') or explain_requested(request)
+        with admit(INTERACTIVE):
+            started = time.perf_counter()
+            result = predict_student_status(model_data, explain=explain)
+            latency_ms = (time.perf_counter() - started) * 1000
         
         if 'error' in result:
             return Response({'error': result['error']}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         
         # Determine if intervention is needed
         dropout_prob = result['dropout_probability']
-        high_risk = dropout_prob > 0.7
+        high_risk = dropout_prob > HIGH_RISK_THRESHOLD
         
         response_data = {
             'predicted_class': result['predicted_class'],
@@ -55,27 +145,99 @@ class PredictView(APIView):
             'intervention_recommended': high_risk and result['predicted_class'] == 'Dropout',
             'saved_record_id': None,
         }
+        if explain:
+            response_data['explanation'] = result['explanation']
         
         # Optionally save the record
         if serializer.validated_data.get('save_record', False):
-            student_data = {k: v for k, v in serializer.validated_data.items() if k != 'save_record'}
-            student = Student.objects.create(
+            student_data = serializer.get_student_data()
+            student = Student(
                 user=request.user if request.user.is_authenticated else None,
                 last_prediction=result['predicted_class'],
                 last_dropout_probability=dropout_prob,
                 **student_data
             )
-            response_data['saved_record_id'] = student.id
+            # Saving the same student again points at the stored record
+            existing_id = (
+                Student.objects.filter(content_hash=student.get_content_hash()).values_list('pk', flat=True).first()
+            )
+            if existing_id is None:
+                student.save()
+                if high_risk:
+                    schedule_high_risk_fan_out([student.id])
+            response_data['saved_record_id'] = existing_id or student.id
         
+        log_prediction(result, latency_ms, user_id=request.user.id, student_id=response_data['saved_record_id'])
         return Response(response_data, status=status.HTTP_200_OK)
 
 
+class WhatIfView(APIView):
+    """
+    POST /api/predict/whatif/
+    Scores a grid of what-if scenarios for one student in a single model call.
+    
+    Body: {"student_id": 12} or {"student": {...prediction fields...}}, plus
+    "vary": [{"feature": "curricular_units_2nd_sem_approved", "start": 0, "stop": 8},
+             {"feature": "curricular_units_2nd_sem_grade", "values": [10, 12, 14]}]
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeacherOrAdmin]
+    throttle_classes = [PredictRateThrottle]
+    query_budget = 3
+    
+    def post(self, request):
+        serializer = WhatIfSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        if 'student_id' in data:
+            base = get_object_or_404(Student, pk=data['student_id']).get_feature_dict()
+        else:
+            base = serializer.fields['student'].to_model_format_from(data['student'])
+        
+        feature_names = {field: name for name, field in FEATURE_FIELDS.items()}
+        axes = [(feature_names[axis['feature']], axis['values']) for axis in data['vary']]
+        features, shape = build_scenario_grid(build_feature_vector(base), axes)
+        
+        try:
+            # Scenarios are hypothetical, so they are kept out of drift monitoring
+            with admit(INTERACTIVE):
+                result = predict_feature_matrix(features, monitor=False)
+                baseline = predict_student_status(base, monitor=False)
+        except FileNotFoundError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        return Response({
+            'axes': [{'feature': axis['feature'], 'values': axis['values']} for axis in data['vary']],
+            'scenario_count': len(features),
+            'baseline': {
+                'predicted_class': baseline['predicted_class'],
+                'dropout_probability': baseline['dropout_probability'],
+            },
+            # Probability arrays go to the renderer as-is; ORJSONRenderer writes them without Python floats
+            'dropout_probability': result['dropout_probability'].reshape(shape),
+            'predicted_class': result['predicted_class'].reshape(shape).tolist(),
+            'probabilities': {
+                name: np.ascontiguousarray(result['probabilities'][:, i]).reshape(shape)
+                for i, name in enumerate(result['class_names'])
+            },
+        }, status=status.HTTP_200_OK)
+
+
+@method_decorator(gzip_page, name='dispatch')
 class StudentListCreateView(generics.ListCreateAPIView):
     """
     GET /api/students/ - List student records
     POST /api/students/ - Create new student record
     """
     permission_classes = [permissions.IsAuthenticated]
+    # GET: user, groups, page count and page, whatever the page size;
+    # POST: user, groups, duplicate lookup and INSERT
+    query_budget = {'GET': 4, 'POST': 4}
+    
+    @method_decorator(conditional_on('students'))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -83,23 +245,74 @@ class StudentListCreateView(generics.ListCreateAPIView):
         return StudentSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        
-        # Admin sees all
-        if user.groups.filter(name='Admin').exists() or user.is_superuser:
-            return Student.objects.all()
-        
-        # Teacher sees all
-        if user.groups.filter(name='Teacher').exists():
-            return Student.objects.all()
-        
-        # Student sees only their own data
-        return Student.objects.filter(user=user)
+        return filter_students(get_visible_students(self.request.user), self.request.query_params)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
+@method_decorator(gzip_page, name='dispatch')
+class AtRiskStudentsView(generics.ListAPIView):
+    """
+    GET /api/students/at-risk/
+    The visible students with the highest predicted dropout probability.
+    
+    Query params: ``limit`` (default 20, at most 500) plus the STUDENT_FILTERS,
+    e.g. ``course``. Served from the student risk indexes, so the cost does
+    not grow with the size of the table.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = AtRiskStudentSerializer
+    pagination_class = None
+    query_budget = 3
+    default_limit = 20
+    max_limit = 500
+    
+    def get_queryset(self):
+        params = self.request.query_params
+        limit = get_limit_param(params, 'limit', self.default_limit, self.max_limit)
+        return (
+            filter_students(get_visible_students(self.request.user), params)
+            .filter(last_dropout_probability__isnull=False)
+            .order_by('-last_dropout_probability', '-id')[:limit]
+        )
+
+
+@method_decorator(gzip_page, name='dispatch')
+class StudentExportView(APIView):
+    """
+    GET /api/students/export/?file_format=csv|parquet|arrow
+    Streams every visible student record, honouring the list view filters.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    # Rows are read with one server-side cursor, see exporters.py
+    query_budget = 3
+
+    def get(self, request):
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in exporters.EXPORT_FORMATS:
+            return Response(
+                {'error': f'Unsupported format. Choose from: {", ".join(exporters.EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if file_format != 'csv' and not exporters.arrow_available():
+            return Response(
+                {'error': f'{file_format} export requires pyarrow to be installed on the server.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = filter_students(get_visible_students(request.user), request.query_params).order_by('pk')
+        if file_format == 'csv':
+            stream = exporters.iter_csv(queryset)
+        else:
+            stream = exporters.iter_arrow(queryset, file_format)
+
+        content_type, extension = exporters.EXPORT_FORMATS[file_format]
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="students.{extension}"'
+        return response
+
+
 class StudentDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     GET /api/students/<id>/ - Retrieve student record
@@ -109,17 +322,97 @@ class StudentDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrTeacherOrAdmin]
+    # PUT/PATCH look up duplicates before saving; DELETE also loads and deletes
+    # the student's notifications and unlinks its prediction history
+    query_budget = {'GET': 3, 'PUT': 5, 'PATCH': 5, 'DELETE': 7}
+
+
+class SimilarStudentsView(APIView):
+    """
+    GET /api/students/<id>/similar/?k=10
+    The ``k`` historical students nearest to this one in scaled feature
+    space, with their recorded outcomes. See similarity.py.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeacherOrAdmin]
+    # User, groups, the student, new students for the index and the neighbours. The
+    # first request of a process also loads the index, in keyset-paginated chunks
+    query_budget = 5
+    query_repeat_threshold = None
+    default_k = 10
+    max_k = 100
+    
+    def get(self, request, pk):
+        student = get_object_or_404(Student, pk=pk)
+        k = get_limit_param(request.query_params, 'k', self.default_k, self.max_k)
+        
+        try:
+            neighbours = find_similar(student, k)
+        except FileNotFoundError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        return Response({
+            'student': student.pk,
+            'k': k,
+            'results': [
+                {
+                    'id': neighbour.pk,
+                    'distance': distance,
+                    'course': neighbour.course,
+                    'outcome': neighbour.outcome,
+                    'last_prediction': neighbour.last_prediction,
+                    'last_dropout_probability': neighbour.last_dropout_probability,
+                }
+                for neighbour, distance in neighbours
+            ],
+        })
+
+
+class DriftReportView(APIView):
+    """
+    GET /api/monitoring/drift/
+    Live feature statistics compared with the training data the scaler was
+    fitted on. See drift.py.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    query_budget = 3
+    
+    def get(self, request):
+        try:
+            _, scaler, _ = get_models()
+        except FileNotFoundError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        return Response(drift_report(scaler, scaler_fingerprint(scaler), FEATURE_NAMES))
+
+
+class AdmissionMetricsView(APIView):
+    """
+    GET /api/monitoring/admission/
+    Inference slots, queue lengths and admission, rejection and throttling
+    counts of the process that serves the request. See admission.py.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    query_budget = 2
+    
+    def get(self, request):
+        return Response(admission_metrics())
 
 
 class ClassAverageView(APIView):
     """
     GET /api/class-average/
-    Returns class average grades for radar chart comparison.
+    Returns class average grades for radar chart comparison, optionally for
+    one ``term``.
     """
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 2
     
+    @method_decorator(conditional_on('students'))
     def get(self, request):
-        averages = Student.objects.aggregate(
+        queryset = Student.objects.all()
+        if request.query_params.get('term'):
+            queryset = queryset.filter(term=request.query_params['term'])
+        averages = queryset.aggregate(
             avg_1st_sem_grade=Avg('curricular_units_1st_sem_grade'),
             avg_2nd_sem_grade=Avg('curricular_units_2nd_sem_grade'),
             avg_1st_sem_approved=Avg('curricular_units_1st_sem_approved'),
@@ -140,97 +433,274 @@ class ClassAverageView(APIView):
         })
 
 
+def _readiness_key(request):
+    # The self-test result changes without a new model version
+    return str(readiness()[0])
+
+
+@query_budget(1)
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@conditional_on('models', vary_on=_readiness_key)
 def health_check(request):
     """Health check endpoint."""
-    models_available = check_models_available()
+    ready, _ = readiness()
     return Response({
         'status': 'healthy',
-        'ml_models_loaded': models_available,
+        'ml_models_loaded': ready,
     })
 
 
 from rest_framework.parsers import MultiPartParser, FormParser
 import csv
 import io
+import uuid
 
 class BatchUploadView(APIView):
     """
     POST /api/upload/
-    Upload a CSV file containing student data for batch processing.
+    Upload a CSV, Parquet or Arrow IPC file containing student data for batch processing.
+    
+    Rows are handled in chunks: each chunk's content hashes are looked up in
+    the live and archived students, rows the uploader already has are
+    skipped, and the rest are scored with one model call and saved with
+    bulk_create. Uploading the same file twice therefore inserts nothing the
+    second time, even after its term was archived. content_hash is unique,
+    so of two uploads of one file running at once only one inserts each row.
+    
+    An optional ``term`` form field is stored on every inserted row.
     """
     parser_classes = (MultiPartParser, FormParser)
     permission_classes = [permissions.IsAuthenticated, IsTeacherOrAdmin]
+    throttle_classes = [UploadRateThrottle]
+    # The query count grows with the number of chunks (one hash lookup and one
+    # INSERT each), so there is no fixed budget; repeats are only suspicious
+    # beyond one per chunk of a very large file
+    query_repeat_threshold = 100
+    save_chunk_size = 1000
+    # Upper bound on high-risk rows explained when explain=true
+    max_explanations = 200
 
     def post(self, request, *args, **kwargs):
         file_obj = request.FILES.get('file')
         if not file_obj:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data.get('term') or '') > Student._meta.get_field('term').max_length:
+            return Response({'error': 'term is too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if importers.is_columnar_upload(file_obj.name):
+            return self.process_columnar(request, file_obj)
 
         if not file_obj.name.endswith('.csv'):
-            return Response({'error': 'File must be a CSV'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'error': 'File must be a CSV, Parquet or Arrow IPC file'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             decoded_file = file_obj.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
+            reader = csv.DictReader(io.StringIO(decoded_file))
             
-            check_models_available() # Ensure models are loaded
+            report = self.new_report(request, total=decoded_file.count('\n') - 1)
+            chunk = []
+            for row_number, row in enumerate(reader, start=1):
+                if None in row:
+                    report['failed'] += 1
+                    report['errors'].append(f"Row {row_number}: more values than header columns")
+                    continue
+                
+                # Headers are expected to match the JSON field names of /api/predict/
+                data = {}
+                for k, v in row.items():
+                    if v is None or v.strip() == '':
+                        continue
+                    try:
+                        data[k] = float(v)  # Most fields are numbers
+                    except ValueError:
+                        data[k] = v
+
+                serializer = PredictionInputSerializer(data=data)
+                if serializer.is_valid():
+                    chunk.append(serializer.get_student_data())
+                else:
+                    report['failed'] += 1
+                    report['errors'].append(f"Row {row_number}: {serializer.errors}")
+
+                if len(chunk) == self.save_chunk_size:
+                    self.save_chunk(request, importers.rows_to_columns(chunk), report)
+                    publish_batch_progress(request.user.id, report['job_id'], row_number, report['total'])
+                    chunk = []
+            self.save_chunk(request, importers.rows_to_columns(chunk), report)
             
-            processed_count = 0
-            high_risk_count = 0
-            errors = []
-
-            for row in reader:
-                try:
-                    # Clean and validate row data
-                    # Map CSV headers to model fields if necessary, assuming matching headers for now
-                    # We utilize the Serializer to validate and transform data
-                    
-                    # Convert keys to lowercase/underscore if needed, or assume correct headers
-                    # For mapped fields, we might need a mapping strategy. 
-                    # Here we assume the CSV headers MATCH the JSON field names expected by serializer.
-                    
-                    # Basic type conversion for serializer
-                    data = {}
-                    for k, v in row.items():
-                        if v.strip() == '': continue
-                        try:
-                            data[k] = float(v) # Most fields are numbers
-                        except ValueError:
-                            data[k] = v
-
-                    serializer = PredictionInputSerializer(data=data)
-                    if serializer.is_valid():
-                        model_data = serializer.to_model_format()
-                        result = predict_student_status(model_data)
-                        
-                        dropout_prob = result['dropout_probability']
-                        if dropout_prob > 0.7:
-                            high_risk_count += 1
-                        
-                        # Save Student Record
-                        student_data = serializer.validated_data
-                        Student.objects.create(
-                            user=request.user,
-                            last_prediction=result['predicted_class'],
-                            last_dropout_probability=dropout_prob,
-                            **student_data
-                        )
-                        processed_count += 1
-                    else:
-                        errors.append(f"Row {processed_count + 1}: {serializer.errors}")
-
-                except Exception as e:
-                    errors.append(f"Row {processed_count + 1}: {str(e)}")
-
-            return Response({
-                'message': 'Batch processing completed',
-                'processed_count': processed_count,
-                'high_risk_count': high_risk_count,
-                'errors': errors[:10] # Limit error response
-            }, status=status.HTTP_201_CREATED)
+            return self.finish(request, report)
 
+        except FileNotFoundError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Overloaded:
+            # Handled by DRF, which adds Retry-After
+            raise
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def process_columnar(self, request, file_obj):
+        """Score a Parquet/Arrow upload column-wise, one model call per chunk."""
+        try:
+            table = importers.read_table(file_obj, file_obj.name)
+            columns = importers.table_to_columns(table)
+        except importers.ColumnarImportError as e:
+            return Response({'error': 'Invalid file', 'errors': e.errors[:10]}, status=status.HTTP_400_BAD_REQUEST)
+
+        if table.num_rows == 0:
+            return Response({'error': 'File contains no rows'}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = self.new_report(request, total=table.num_rows)
+        try:
+            for start in range(0, table.num_rows, self.save_chunk_size):
+                chunk = {field: column[start:start + self.save_chunk_size] for field, column in columns.items()}
+                self.save_chunk(request, chunk, report)
+                publish_batch_progress(request.user.id, report['job_id'], min(start + self.save_chunk_size, table.num_rows), report['total'])
+        except FileNotFoundError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return self.finish(request, report)
+
+    def new_report(self, request, total):
+        return {
+            'job_id': uuid.uuid4().hex,
+            'total': total,
+            'inserted': 0,
+            'skipped_duplicate': 0,
+            'failed': 0,
+            'errors': [],
+            'high_risk_ids': [],
+            'explain': explain_requested(request, request.data),
+            'explain_rows': [],
+            'term': request.data.get('term') or None,
+            # Hashes already handled in this upload, to skip repeated lines
+            'seen': set(),
+        }
+
+    def save_chunk(self, request, columns, report):
+        """
+        Insert the rows of ``columns`` (a 1-D array per Student feature field)
+        that are not already stored for this user, scoring them with one
+        model call.
+        """
+        count = len(columns[STUDENT_FEATURE_FIELDS[0]])
+        if not count:
+            return
+        values = np.column_stack([columns[field] for field in STUDENT_FEATURE_FIELDS]).astype(np.float64)
+        hashes = [compute_content_hash(row, request.user.id) for row in values.tolist()]
+        existing = set()
+        for model in (Student, ArchivedStudent):
+            existing.update(model.objects.filter(content_hash__in=set(hashes)).values_list('content_hash', flat=True))
+        keep = np.zeros(count, dtype=bool)
+        new_hashes = []
+        for i, content_hash in enumerate(hashes):
+            if content_hash in existing or content_hash in report['seen']:
+                report['skipped_duplicate'] += 1
+                continue
+            report['seen'].add(content_hash)
+            keep[i] = True
+            new_hashes.append(content_hash)
+        if not new_hashes:
+            return
+
+        columns = {field: column[keep] for field, column in columns.items()}
+        features = build_feature_matrix(columns)
+        # One slot per chunk, so waiting single predictions get in between chunks
+        with admit(BATCH):
+            started = time.perf_counter()
+            result = predict_feature_matrix(features)
+            latency_ms = (time.perf_counter() - started) * 1000
+
+        dropout_probs = result['dropout_probability'].tolist()
+        predicted = result['predicted_class'].tolist()
+        # Row objects are only built here, for bulk_create
+        rows = zip(*(columns[field].tolist() for field in STUDENT_FEATURE_FIELDS))
+        students = [
+            Student(
+                user=request.user,
+                term=report['term'],
+                content_hash=content_hash,
+                last_prediction=predicted_class,
+                last_dropout_probability=probability,
+                **dict(zip(STUDENT_FEATURE_FIELDS, row))
+            )
+            for row, content_hash, predicted_class, probability in zip(rows, new_hashes, predicted, dropout_probs)
+        ]
+        inserted = self.insert_students(students)
+        if not inserted.all():
+            report['skipped_duplicate'] += int((~inserted).sum())
+            students = [student for student, ok in zip(students, inserted) if ok]
+            features = features[inserted]
+            result = dict(result, **{
+                key: result[key][inserted] for key in ('predicted_class', 'dropout_probability', 'probabilities')
+            })
+        if not students:
+            return
+        bump_data_version('students')
+        log_batch(result, latency_ms, [student.id for student in students], user_id=request.user.id)
+        report['inserted'] += len(students)
+
+        for i, student in enumerate(students):
+            if student.last_dropout_probability > HIGH_RISK_THRESHOLD:
+                report['high_risk_ids'].append(student.id)
+                if report['explain'] and len(report['explain_rows']) < self.max_explanations:
+                    report['explain_rows'].append((student.id, features[i]))
+
+    def insert_students(self, students):
+        """
+        bulk_create ``students``, leaving out rows that another upload stored
+        after this one looked the hashes up.
+
+        Returns:
+            Boolean array marking the rows inserted.
+        """
+        inserted = np.ones(len(students), dtype=bool)
+        while True:
+            try:
+                with transaction.atomic():
+                    Student.objects.bulk_create(
+                        [student for student, ok in zip(students, inserted) if ok], batch_size=self.save_chunk_size
+                    )
+                return inserted
+            except IntegrityError:
+                hashes = [student.content_hash for student in students]
+                stored = set(Student.objects.filter(content_hash__in=hashes).values_list('content_hash', flat=True))
+                taken = np.array([content_hash in stored for content_hash in hashes]) & inserted
+                if not taken.any():
+                    raise
+                inserted &= ~taken
+                for student in students:
+                    # Batches written before the failure were rolled back
+                    student.pk = None
+                    student._state.adding = True
+
+    def finish(self, request, report):
+        schedule_high_risk_fan_out(report['high_risk_ids'])
+        publish_batch_progress(request.user.id, report['job_id'], report['total'], report['total'], state='completed')
+
+        response_data = {
+            'message': 'Batch processing completed',
+            'job_id': report['job_id'],
+            'processed_count': report['inserted'],
+            'inserted_count': report['inserted'],
+            'skipped_duplicate_count': report['skipped_duplicate'],
+            'failed_count': report['failed'],
+            'high_risk_count': len(report['high_risk_ids']),
+            'errors': report['errors'][:10],  # Limit error response
+        }
+        if report['explain']:
+            # Explain all collected high-risk rows in one vectorized call
+            explain_rows = report['explain_rows']
+            ids = [student_id for student_id, _ in explain_rows]
+            features = np.array([row for _, row in explain_rows]).reshape(len(explain_rows), len(FEATURE_NAMES))
+            response_data['explanations'] = self.format_explanations(ids, features)
+        return Response(response_data, status=status.HTTP_201_CREATED)
+
+    def format_explanations(self, student_ids, features):
+        if not student_ids:
+            return []
+        with admit(BATCH):
+            explanations = explain_feature_matrix(features)
+        return [
+            {'student_id': student_id, **(explanation or {})}
+            for student_id, explanation in zip(student_ids, explanations)
+        ]
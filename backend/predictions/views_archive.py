@@ -0,0 +1,51 @@
+from rest_framework import generics, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .archive import term_counts
+from .models import ArchivedStudent
+from .permissions import IsOwnerOrTeacherOrAdmin, IsTeacherOrAdmin
+from .serializers import ArchivedStudentSerializer
+from .views import filter_students, get_visible_students
+
+
+class ArchivedStudentListView(generics.ListAPIView):
+    """
+    GET /api/archive/students/
+    Student records of archived terms, newest first. Accepts the same filters
+    as /api/students/, e.g. ``term`` and ``course``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ArchivedStudentSerializer
+    query_budget = 4
+    
+    def get_queryset(self):
+        return filter_students(
+            get_visible_students(self.request.user, ArchivedStudent), self.request.query_params
+        ).order_by('-id')
+
+
+class ArchivedStudentDetailView(generics.RetrieveAPIView):
+    """
+    GET /api/archive/students/<id>/ - One archived student record, by its original id
+    """
+    queryset = ArchivedStudent.objects.all()
+    serializer_class = ArchivedStudentSerializer
+    permission_classes = [permissions.IsAuthenticated, IsOwnerOrTeacherOrAdmin]
+    query_budget = 3
+
+
+class ArchiveTermsView(APIView):
+    """
+    GET /api/archive/terms/
+    Active and archived student counts per term.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeacherOrAdmin]
+    # One grouped count per table
+    query_budget = 4
+    
+    def get(self, request):
+        return Response([
+            {'term': term, **counts}
+            for term, counts in sorted(term_counts().items(), key=lambda item: item[0] or '')
+        ])
@@ -7,6 +7,7 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = [permissions.AllowAny]
     serializer_class = UserSerializer
+    query_budget = 6
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
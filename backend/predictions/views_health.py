@@ -0,0 +1,30 @@
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+from .health import readiness
+from .querybudget import query_budget
+
+
+@query_budget(0)
+@never_cache
+@require_safe
+def livez(request):
+    """
+    GET /livez
+    Liveness probe: no authentication, no database or model access.
+    """
+    return JsonResponse({'status': 'alive'})
+
+
+@query_budget(0)
+@never_cache
+@require_safe
+def readyz(request):
+    """
+    GET /readyz
+    Readiness probe: 200 when the model is loaded and its last self-test
+    passed, 503 otherwise. No authentication.
+    """
+    ready, details = readiness()
+    return JsonResponse(details, status=200 if ready else 503)
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .events import bridge, hub, polling_bridge_enabled, redeem_stream_ticket
+from .notifications import get_unread_count
+from .querybudget import query_budget
+
+# Seconds between keep-alive comments, so proxies do not close idle streams
+HEARTBEAT_INTERVAL = 20
+
+
+def _authenticate(request):
+    """
+    Resolve the user from a Bearer token, a ``?ticket=`` stream ticket
+    (EventSource cannot send headers, see events.py) or the session.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    if header:
+        try:
+            return authenticator.get_user(authenticator.get_validated_token(authenticator.get_raw_token(header)))
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            return None
+    if request.GET.get('ticket'):
+        user_id = redeem_stream_ticket(request.GET['ticket'])
+        return User.objects.filter(pk=user_id, is_active=True).first() if user_id else None
+    user = request.user
+    return user if user.is_authenticated else None
+
+
+def format_event(event):
+    lines = []
+    if 'id' in event:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {json.dumps(event['data'])}")
+    return '\n'.join(lines) + '\n\n'
+
+
+async def _event_stream(user_id, unread_count):
+    queue = hub.subscribe(user_id)
+    if polling_bridge_enabled():
+        bridge.ensure_running()
+    try:
+        yield 'retry: 5000\n\n'
+        yield format_event({'event': 'unread_count', 'data': {'unread_count': unread_count}})
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(user_id, queue)
+
+
+@query_budget(2)
+async def notification_stream(request):
+    """
+    GET /api/notifications/stream/
+    Server-sent events for new notifications and batch upload progress.
+    Requires an ASGI server (see edu_predict/asgi.py).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'Event streams are only available when the API is served over ASGI.'},
+            status=501
+        )
+
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    unread_count = await sync_to_async(get_unread_count)(user.id)
+    response = StreamingHttpResponse(_event_stream(user.id, unread_count), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,19 +1,58 @@
 from rest_framework import generics, permissions, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.response import Response
 from .models import SupportTicket, Notification
 from .serializers_support import SupportTicketSerializer, NotificationSerializer
-from .permissions import IsOwnerOrTeacherOrAdmin
+from .permissions import IsOwnerOrTeacherOrAdmin, get_group_names
+from .events import STREAM_TICKET_MAX_AGE, issue_stream_ticket
+from .notifications import get_unread_count, mark_read
+from .search import search_tickets
+
+# Query parameters accepted by the ticket list
+TICKET_FILTERS = {
+    'status': 'status',
+    'created_after': 'created_at__gte',
+    'created_before': 'created_at__lte',
+}
+
 
 class SupportTicketViewSet(viewsets.ModelViewSet):
+    """
+    Support tickets; admins see every ticket, other users their own.
+    
+    The list accepts ``q`` (full-text search over subject and message, best
+    matches first, see search.py) and the TICKET_FILTERS, e.g.
+    ``?q=password reset&status=Open&created_after=2026-01-01``.
+    """
     serializer_class = SupportTicketSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'GET': 4, 'POST': 2, 'PUT': 4, 'PATCH': 4, 'DELETE': 4}
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_superuser or user.groups.filter(name='Admin').exists():
-            return SupportTicket.objects.all()
-        return SupportTicket.objects.filter(user=user)
+        if user.is_superuser or 'Admin' in get_group_names(user):
+            queryset = SupportTicket.objects.all()
+        else:
+            queryset = SupportTicket.objects.filter(user=user)
+        if self.action == 'list':
+            queryset = self.filter_list(queryset, self.request.query_params)
+        return queryset
+
+    def filter_list(self, queryset, params):
+        lookups = {
+            lookup: params[param]
+            for param, lookup in TICKET_FILTERS.items()
+            if params.get(param) not in (None, '')
+        }
+        try:
+            queryset = queryset.filter(**lookups)
+        except (ValueError, DjangoValidationError):
+            raise ValidationError({'error': f'Invalid filter value in: {", ".join(sorted(lookups))}'})
+        if params.get('q', '').strip():
+            queryset = search_tickets(queryset, params['q'].strip())
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -21,6 +60,7 @@ class SupportTicketViewSet(viewsets.ModelViewSet):
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'GET': 3, 'POST': 4}
 
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user)
@@ -28,11 +68,19 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        mark_read(self.get_queryset().filter(pk=notification.pk))
         return Response({'status': 'marked as read'})
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        self.get_queryset().update(is_read=True)
+        mark_read(self.get_queryset())
         return Response({'status': 'all marked as read'})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread_count': get_unread_count(request.user.id)})
+
+    @action(detail=False, methods=['post'], url_path='stream-ticket')
+    def stream_ticket(self, request):
+        # Opens /api/notifications/stream/?ticket=... once; the access token stays out of URLs
+        return Response({'ticket': issue_stream_ticket(request.user.id), 'expires_in': STREAM_TICKET_MAX_AGE})
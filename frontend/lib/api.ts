@@ -248,6 +248,10 @@ export const notificationApi = {
     markAllRead: async (): Promise<void> => {
         await api.post('/notifications/mark_all_read/');
     },
+    getUnreadCount: async (): Promise<number> => {
+        const response = await api.get('/notifications/unread_count/');
+        return response.data.unread_count;
+    },
 };
 
 